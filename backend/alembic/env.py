@@ -9,7 +9,7 @@ from app.core.config import settings
 from app.core.database import Base
 
 # Import all models so they are registered with Base.metadata
-from app.models import Job, PipelineLog, User  # noqa: F401
+from app.models import Job, PipelineLog, TranslationMemory, User  # noqa: F401
 
 config = context.config
 config.set_main_option("sqlalchemy.url", settings.database_url)
@@ -0,0 +1,35 @@
+"""Add queue bookkeeping columns to jobs table.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column("jobs", sa.Column("claimed_by", sa.String(100), nullable=True))
+    op.add_column(
+        "jobs", sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_jobs_status_created_at", "jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_created_at", table_name="jobs")
+    op.drop_column("jobs", "claimed_at")
+    op.drop_column("jobs", "claimed_by")
+    op.drop_column("jobs", "attempts")
@@ -0,0 +1,25 @@
+"""Add page column to pipeline_logs for multi-page (chapter) jobs.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("pipeline_logs", sa.Column("page", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("pipeline_logs", "page")
@@ -0,0 +1,53 @@
+"""Add translation_memory table and cache savings columns on pipeline_logs.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "translation_memory",
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("source_text", sa.String(), nullable=False),
+        sa.Column("translated_text", sa.String(), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("prompt_version", sa.String(length=20), nullable=False),
+        sa.Column("tokens", sa.Integer(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "last_used_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.add_column("pipeline_logs", sa.Column("tokens_saved", sa.Integer(), nullable=True))
+    op.add_column(
+        "pipeline_logs",
+        sa.Column("saved_krw", sa.Float(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("pipeline_logs", "saved_krw")
+    op.drop_column("pipeline_logs", "tokens_saved")
+    op.drop_table("translation_memory")
@@ -0,0 +1,34 @@
+"""Add whole-page result cache columns to jobs table.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.add_column("jobs", sa.Column("pipeline_version", sa.String(100), nullable=True))
+    op.add_column(
+        "jobs", sa.Column("result_job_id", postgresql.UUID(as_uuid=True), nullable=True)
+    )
+    op.create_index("ix_jobs_content_hash", "jobs", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_content_hash", table_name="jobs")
+    op.drop_column("jobs", "result_job_id")
+    op.drop_column("jobs", "pipeline_version")
+    op.drop_column("jobs", "content_hash")
@@ -1,19 +1,41 @@
 import json
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Path
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.job import JobStatusResponse, PipelineLogResponse
-from app.services.job_service import get_job, get_job_logs
+from app.models.job import JobStatus
+from app.schemas.job import JobStatusResponse, PipelineLogResponse, QueueStatusResponse
+from app.services.admission import pipeline_admission
+from app.services.job_service import count_jobs_by_status, get_job, get_job_logs
 from app.utils.security import get_job_result_path
 
 router = APIRouter()
 
 
+@router.get("/queue", response_model=QueueStatusResponse)
+async def get_queue_status(db: AsyncSession = Depends(get_db)):
+    """Gauges for in-flight and queued pipeline jobs."""
+    if settings.job_queue_enabled:
+        return QueueStatusResponse(
+            mode="queue",
+            in_flight=await count_jobs_by_status(db, JobStatus.PROCESSING),
+            queued=await count_jobs_by_status(db, JobStatus.PENDING),
+            max_in_flight=settings.worker_concurrency,
+            max_queued=settings.max_queued_pipelines,
+        )
+    return QueueStatusResponse(
+        mode="in_process",
+        in_flight=pipeline_admission.in_flight,
+        queued=pipeline_admission.queued,
+        max_in_flight=pipeline_admission.max_in_flight,
+        max_queued=pipeline_admission.max_queued,
+    )
+
+
 @router.get("/jobs/{job_id}", response_model=JobStatusResponse)
 async def get_job_status(
     job_id: uuid.UUID,
@@ -34,16 +56,25 @@ async def get_job_status(
         warnings=json.loads(job.warnings_json) if job.warnings_json else [],
         current_stage=job.current_stage,
         created_at=job.created_at,
+        result_job_id=job.result_job_id,
     )
 
 
+async def _resolve_result_job_id(db: AsyncSession, job_id: uuid.UUID) -> uuid.UUID:
+    """Result-cache hits serve the files of the job they point at."""
+    job = await get_job(db, job_id)
+    if job is not None and job.result_job_id is not None:
+        return job.result_job_id
+    return job_id
+
+
 @router.get("/jobs/{job_id}/result")
-async def get_job_result(job_id: uuid.UUID):
+async def get_job_result(job_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
     """Download the translated image result."""
     # Use secure path validation to prevent path traversal
     result_path = get_job_result_path(
         settings.result_dir,
-        job_id,
+        await _resolve_result_job_id(db, job_id),
         original=False,
         check_exists=True,
     )
@@ -56,12 +87,12 @@ async def get_job_result(job_id: uuid.UUID):
 
 
 @router.get("/jobs/{job_id}/original")
-async def get_job_original(job_id: uuid.UUID):
+async def get_job_original(job_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
     """Download the original uploaded image."""
     # Use secure path validation to prevent path traversal
     original_path = get_job_result_path(
         settings.result_dir,
-        job_id,
+        await _resolve_result_job_id(db, job_id),
         original=True,
         check_exists=True,
     )
@@ -73,6 +104,42 @@ async def get_job_original(job_id: uuid.UUID):
     )
 
 
+@router.get("/jobs/{job_id}/pages/{page}/result")
+async def get_job_page_result(job_id: uuid.UUID, page: int = Path(..., ge=1)):
+    """Download the translated image for one page of a chapter job."""
+    result_path = get_job_result_path(
+        settings.result_dir,
+        job_id,
+        original=False,
+        check_exists=True,
+        page=page,
+    )
+
+    return FileResponse(
+        result_path,
+        media_type="image/png",
+        filename=f"translated_{job_id}_p{page:03d}.png",
+    )
+
+
+@router.get("/jobs/{job_id}/pages/{page}/original")
+async def get_job_page_original(job_id: uuid.UUID, page: int = Path(..., ge=1)):
+    """Download the original image for one page of a chapter job."""
+    original_path = get_job_result_path(
+        settings.result_dir,
+        job_id,
+        original=True,
+        check_exists=True,
+        page=page,
+    )
+
+    return FileResponse(
+        original_path,
+        media_type="image/png",
+        filename=f"original_{job_id}_p{page:03d}.png",
+    )
+
+
 @router.get("/jobs/{job_id}/logs", response_model=list[PipelineLogResponse])
 async def get_job_pipeline_logs(
     job_id: uuid.UUID,
@@ -87,9 +154,12 @@ async def get_job_pipeline_logs(
     return [
         PipelineLogResponse(
             stage=log.stage,
+            page=log.page,
             duration_ms=log.duration_ms,
             cost_krw=log.cost_krw,
             tokens_used=log.tokens_used,
+            tokens_saved=log.tokens_saved,
+            saved_krw=log.saved_krw or 0.0,
             success=log.success,
             failure_type=log.failure_type,
         )
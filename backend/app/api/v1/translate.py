@@ -1,48 +1,54 @@
-import json as json_module
+import asyncio
+import hashlib
 import os
 import re
 import uuid
+import zipfile
 
 import cv2
-import numpy as np
 import structlog
 from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Request, UploadFile
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import async_session_factory, get_db
+from app.core.database import get_db
 from app.middleware.rate_limit import limiter
-from app.models.job import Job, JobStatus
+from app.utils.archive import (
+    SUPPORTED_ARCHIVE_EXTENSIONS,
+    iter_archive_pages,
+    list_archive_pages,
+    open_archive,
+)
 from app.utils.file_validation import validate_upload
-from app.pipeline.balloon_parser import BalloonParser
-from app.pipeline.base import PipelineContext
-from app.pipeline.detector import TextDetector
-from app.pipeline.inpainter import Inpainter
-from app.pipeline.ocr_engine import OcrEngine
-from app.pipeline.orchestrator import PipelineOrchestrator
-from app.pipeline.postprocessor import Postprocessor
-from app.pipeline.preprocessor import Preprocessor
-from app.pipeline.translation_mapper import TranslationMapper
-from app.pipeline.translation_prep import TranslationPrep
-from app.pipeline.translator import Translator
-from app.pipeline.typesetter import Typesetter
+from app.models.job import JobStatus
 from app.schemas.job import JobCreateResponse
-from app.services.circuit_breaker import CircuitBreaker
-from app.services.cost_tracker import CostTracker
-from app.services.job_service import create_job, update_job_status
+from app.services.admission import estimate_retry_after_s, pipeline_admission
+from app.services.job_service import (
+    count_jobs_by_status,
+    create_cached_job,
+    create_job,
+    get_recent_job_duration_ms,
+)
+from app.services.pipeline_runner import (
+    pipeline_version,
+    run_admitted_chapter_pipeline,
+    run_admitted_pipeline,
+)
+from app.services.result_cache import find_cached_result
+from app.utils.security import get_job_result_path
 
 logger = structlog.get_logger()
 
 router = APIRouter()
 
-# Shared circuit breaker instances
-openai_circuit_breaker = CircuitBreaker("openai", failure_threshold=5, recovery_timeout_s=60)
 
+async def _read_with_limit(file: UploadFile, max_bytes: int) -> tuple[bytes, str]:
+    """Read uploaded file in chunks, raising 413 if limit exceeded.
 
-async def _read_with_limit(file: UploadFile, max_bytes: int) -> bytes:
-    """Read uploaded file in chunks, raising 413 if limit exceeded."""
+    Returns the bytes and their SHA-256 hex digest, computed while streaming.
+    """
     chunks: list[bytes] = []
+    digest = hashlib.sha256()
     total = 0
     while True:
         chunk = await file.read(64 * 1024)  # 64KB chunks
@@ -54,8 +60,42 @@ async def _read_with_limit(file: UploadFile, max_bytes: int) -> bytes:
                 status_code=413,
                 detail=f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB",
             )
+        digest.update(chunk)
         chunks.append(chunk)
-    return b"".join(chunks)
+    return b"".join(chunks), digest.hexdigest()
+
+
+async def _admit_job(db: AsyncSession) -> None:
+    """Reserve pipeline capacity for a new job or raise 503 with Retry-After.
+
+    With the job queue on, the limit is the number of PENDING jobs in the
+    database; otherwise it is this process's ``pipeline_admission``.
+    """
+    if settings.job_queue_enabled:
+        queue_depth = await count_jobs_by_status(db, JobStatus.PENDING)
+        if queue_depth < settings.max_queued_pipelines:
+            return
+        concurrency = settings.worker_concurrency
+    else:
+        if pipeline_admission.reserve():
+            return
+        queue_depth = pipeline_admission.queued
+        concurrency = pipeline_admission.max_in_flight
+
+    retry_after = estimate_retry_after_s(
+        queue_depth, concurrency, await get_recent_job_duration_ms(db)
+    )
+    logger.warning(
+        "translate.admission_rejected",
+        queue_depth=queue_depth,
+        in_flight=pipeline_admission.in_flight,
+        retry_after_s=retry_after,
+    )
+    raise HTTPException(
+        status_code=503,
+        detail="Server is busy. Please retry later.",
+        headers={"Retry-After": str(retry_after)},
+    )
 
 
 @router.post("/translate", response_model=JobCreateResponse)
@@ -76,7 +116,7 @@ async def translate_image(
     )
 
     # Read file with size limit
-    image_bytes = await _read_with_limit(file, settings.max_upload_size_bytes)
+    image_bytes, content_hash = await _read_with_limit(file, settings.max_upload_size_bytes)
 
     # Comprehensive validation: magic numbers, decode, dimensions
     # This validates actual file content, not client-provided Content-Type
@@ -86,84 +126,149 @@ async def translate_image(
         max_dimension=settings.max_image_dimension,
     )
 
-    # Create job
-    job = await create_job(db, original_filename=file.filename)
+    # Identical upload already translated by this pipeline version: reuse it
+    version = pipeline_version()
+    if settings.result_cache_enabled:
+        cached = await find_cached_result(db, content_hash, version)
+        if cached is not None:
+            job = await create_cached_job(db, cached, original_filename=file.filename)
+            logger.info(
+                "translate.result_cache_hit",
+                job_id=str(job.id),
+                result_job_id=str(cached.id),
+            )
+            return JobCreateResponse(job_id=job.id)
+
+    # Backpressure: 503 + Retry-After when pipelines and queue are full
+    await _admit_job(db)
 
-    # Store original image for result viewer
-    os.makedirs(settings.result_dir, exist_ok=True)
-    original_path = os.path.join(settings.result_dir, f"{job.id}_original.png")
-    cv2.imwrite(original_path, image)
+    try:
+        # Create job
+        job = await create_job(
+            db,
+            original_filename=file.filename,
+            content_hash=content_hash,
+            pipeline_version=version,
+        )
 
-    # Run pipeline in background
-    background_tasks.add_task(run_pipeline, job.id, image)
+        # Store original image for result viewer
+        os.makedirs(settings.result_dir, exist_ok=True)
+        original_path = os.path.join(settings.result_dir, f"{job.id}_original.png")
+        cv2.imwrite(original_path, image)
+    except Exception:
+        if not settings.job_queue_enabled:
+            pipeline_admission.cancel_reservation()
+        raise
 
-    return JobCreateResponse(job_id=job.id)
+    if settings.job_queue_enabled:
+        # Job stays PENDING; a worker process claims it from the jobs table
+        logger.info("translate.job_enqueued", job_id=str(job.id))
+    else:
+        # Run pipeline in background once a pipeline slot is free
+        background_tasks.add_task(run_admitted_pipeline, job.id, image)
 
+    return JobCreateResponse(job_id=job.id)
 
-async def run_pipeline(job_id: uuid.UUID, image: np.ndarray) -> None:
-    """Execute the full translation pipeline in the background."""
-    async with async_session_factory() as db:
-        try:
-            await update_job_status(db, job_id, JobStatus.PROCESSING)
-            await db.commit()
 
-            cost_tracker = CostTracker(
-                job_id, db, max_cost_krw=settings.max_cost_per_page_krw
-            )
+def _store_chapter_pages(
+    job_id: uuid.UUID,
+    archive: zipfile.ZipFile,
+    pages: list[zipfile.ZipInfo],
+) -> None:
+    """Validate and store each archive page as ``{job_id}_pNNN_original.png``.
 
-            stages = [
-                Preprocessor(),
-                TextDetector(),
-                BalloonParser(),
-                OcrEngine(),
-                TranslationPrep(),
-                Translator(circuit_breaker=openai_circuit_breaker),
-                TranslationMapper(),
-                Inpainter(),
-                Typesetter(),
-                Postprocessor(),
-            ]
-
-            orchestrator = PipelineOrchestrator(stages, cost_tracker)
-            ctx = PipelineContext(job_id=job_id, original_image=image)
-            ctx = await orchestrator.run(ctx)
-
-            # Save result image
-            result_bytes = ctx.metadata.get("result_bytes")
-            if result_bytes:
-                result_path = os.path.join(settings.result_dir, f"{job_id}.png")
-                with open(result_path, "wb") as f:
-                    f.write(result_bytes)
-
-            # Collect warnings from pipeline
-            warnings = ctx.metadata.get("warnings", [])
-
-            # Determine outcome based on translation results
-            total_regions = len(ctx.regions) if ctx.regions else 0
-            mapped_translations = len(ctx.translations) if ctx.translations else 0
-
-            if total_regions > 0 and mapped_translations == 0:
-                await update_job_status(
-                    db,
-                    job_id,
-                    JobStatus.FAILED,
-                    error_message="Translation failed: no text regions were successfully translated.",
+    Pages are decoded one at a time so the whole chapter is never held in
+    memory. On any failure, pages already written are removed.
+    """
+    os.makedirs(settings.result_dir, exist_ok=True)
+    written: list[str] = []
+    try:
+        page_iter = iter_archive_pages(archive, pages, settings.max_upload_size_bytes)
+        for page, (name, page_bytes) in enumerate(page_iter, start=1):
+            try:
+                image, _ = validate_upload(
+                    page_bytes, max_dimension=settings.max_image_dimension
                 )
-            else:
-                await update_job_status(db, job_id, JobStatus.COMPLETED)
-
-            # Persist warnings
-            if warnings:
-                result = await db.execute(select(Job).where(Job.id == job_id))
-                job = result.scalar_one()
-                job.warnings_json = json_module.dumps(warnings, ensure_ascii=False)
-
-            await db.commit()
-            logger.info("pipeline.job_completed", job_id=str(job_id))
-
-        except Exception as e:
-            logger.error("pipeline.job_failed", job_id=str(job_id), error=str(e))
-            await update_job_status(
-                db, job_id, JobStatus.FAILED, error_message=str(e)[:500]
+            except HTTPException as e:
+                raise HTTPException(
+                    status_code=e.status_code, detail=f"Page '{name}': {e.detail}"
+                )
+            original_path = get_job_result_path(
+                settings.result_dir, job_id, original=True, check_exists=False, page=page
             )
-            await db.commit()
+            cv2.imwrite(str(original_path), image)
+            written.append(str(original_path))
+    except Exception:
+        for path in written:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+
+@router.post("/translate/chapter", response_model=JobCreateResponse)
+@limiter.limit("10/hour")
+async def translate_chapter(
+    request: Request,  # Required for rate limiter
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """Upload a chapter archive (CBZ/ZIP) for translation as one multi-page job."""
+    safe_name = re.sub(r"[^\w\-.]", "_", file.filename or "unnamed")
+    logger.info("translate.chapter_upload_received", filename=safe_name)
+
+    extension = os.path.splitext(safe_name)[1].lower().lstrip(".")
+    if extension not in SUPPORTED_ARCHIVE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported archive type. "
+            f"Allowed: {', '.join(sorted(SUPPORTED_ARCHIVE_EXTENSIONS))}",
+        )
+
+    # The upload is spooled to disk by Starlette; check size without reading it
+    file.file.seek(0, os.SEEK_END)
+    archive_size = file.file.tell()
+    file.file.seek(0)
+    if archive_size > settings.max_archive_size_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Archive too large. "
+            f"Maximum size: {settings.max_archive_size_bytes // (1024 * 1024)}MB",
+        )
+
+    archive = open_archive(file.file)
+    pages = list_archive_pages(archive)
+    if not pages:
+        raise HTTPException(status_code=400, detail="Archive contains no images")
+    if len(pages) > settings.max_archive_pages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many pages. Maximum: {settings.max_archive_pages}",
+        )
+
+    await _admit_job(db)
+
+    try:
+        job = await create_job(
+            db, page_count=len(pages), original_filename=file.filename
+        )
+        await asyncio.get_event_loop().run_in_executor(
+            None, _store_chapter_pages, job.id, archive, pages
+        )
+    except Exception:
+        if not settings.job_queue_enabled:
+            pipeline_admission.cancel_reservation()
+        raise
+    finally:
+        archive.close()
+
+    logger.info("translate.chapter_stored", job_id=str(job.id), pages=len(pages))
+
+    if settings.job_queue_enabled:
+        logger.info("translate.job_enqueued", job_id=str(job.id))
+    else:
+        background_tasks.add_task(run_admitted_chapter_pipeline, job.id, len(pages))
+
+    return JobCreateResponse(job_id=job.id)
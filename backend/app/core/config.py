@@ -14,6 +14,25 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4o-mini"
     openai_timeout_s: int = 30
     openai_max_retries: int = 2
+    # Shared client: one connection pool, paced below the account's rate limits
+    openai_max_connections: int = 20
+    openai_max_keepalive_connections: int = 10
+    openai_keepalive_expiry_s: float = 60.0
+    openai_rpm_limit: int = 500  # requests per minute
+    openai_tpm_limit: int = 200_000  # tokens per minute (prompt estimate + reply)
+    openai_max_concurrency: int = 8  # calls in flight; halved on 429, regrown per success
+    # Dense pages are translated as concurrent requests of at most this many source tokens
+    translation_chunk_max_tokens: int = 1500
+    translation_streaming: bool = True  # stream completions, lay out entries as they arrive
+    # Hedging: re-send a call still running past this percentile of recent latency
+    openai_hedging: bool = False
+    openai_hedge_percentile: float = 95.0
+    openai_hedge_max_rate: float = 0.05  # share of calls that may be hedged
+    openai_hedge_min_samples: int = 20  # latencies needed before hedging starts
+
+    # Translation memory (reuse earlier translations of identical lines)
+    translation_memory_enabled: bool = True
+    translation_memory_lru_size: int = 10000  # in-process entries in front of the table
 
     # Google Vision (backup OCR)
     google_application_credentials: str = ""
@@ -37,21 +56,75 @@ class Settings(BaseSettings):
     max_upload_size_bytes: int = 20 * 1024 * 1024  # 20 MB
     max_image_dimension: int = 10000
 
+    # Chapter (CBZ/ZIP) uploads
+    max_archive_size_bytes: int = 200 * 1024 * 1024  # 200 MB
+    max_archive_pages: int = 200
+    chapter_page_concurrency: int = 4  # pages of one job processed at once
+    # Pages translated together in one OpenAI request
+    chapter_translation_batching: bool = True
+    chapter_batch_max_tokens: int = 4000  # estimated source-text tokens per request
+    chapter_batch_max_pages: int = 4  # also bounded by chapter_page_concurrency
+    chapter_batch_max_wait_ms: float = 1000.0  # how long a page waits for others to join
+
     # Fonts
     font_path: str = "/app/fonts/NotoSansKR-Regular.ttf"
     font_download_url: str = (
         "https://github.com/google/fonts/raw/main/ofl/notosanskr/NotoSansKR%5Bwght%5D.ttf"
     )
     ensure_font_on_startup: bool = True
+    font_cache_size: int = 64  # loaded (font, size) pairs kept per process; preload uses 49
+    preload_glyph_metrics: bool = True  # measure Hangul/ASCII advances for all sizes at startup
 
     # Result storage
     result_dir: str = "/tmp/results"
     result_ttl_hours: int = 24
     cleanup_interval_minutes: int = 60
+    # Reuse results of identical uploads (same content hash and pipeline version)
+    result_cache_enabled: bool = True
+    result_cache_min_remaining_minutes: int = 30  # skip entries about to be cleaned up
+
+    # Webtoon strips (height >= width * aspect): kept at working width, detected in bands
+    webtoon_mode: bool = True
+    webtoon_min_aspect: float = 3.0
+    webtoon_slice_height: int = 2048
+    webtoon_slice_overlap: int = 256  # rows shared by neighbouring bands
+
+    # Working resolution: detection runs on a downscaled copy, the rest at native size
+    detection_max_side: int = 1024  # longest side (webtoons: width) of the detection image
+    max_image_pixels: int = 40_000_000  # larger uploads are downscaled to this
+
+    # Panels (XY-cut on gutters): reading order per panel, panels cleaned in parallel
+    panel_segmentation: bool = True
+    panel_threads: int = 4
+
+    # OCR
+    ocr_batch_recognition: bool = True  # recognizer-only on detector crops, batched per page
+    ocr_rec_batch_size: int = 16  # lines per recognizer inference
+
+    # Inpainting: flat/smooth balloon backgrounds skip LaMa
+    inpaint_fast_path: bool = True
 
     # Model preloading
     preload_models: bool = True
 
+    # Shared model server (python -m app.model_server); empty = load models in-process
+    model_server_socket: str = ""
+    model_server_max_batch_size: int = 8
+    model_server_max_wait_ms: float = 10.0  # how long a batch waits to fill up
+    model_server_timeout_s: float = 120.0
+
+    # Job queue (jobs table polled by app.worker instead of in-process BackgroundTasks)
+    job_queue_enabled: bool = False
+    worker_concurrency: int = 2
+    worker_poll_interval_s: float = 1.0
+    job_claim_timeout_s: int = 900  # PROCESSING jobs older than this are requeued
+    job_max_attempts: int = 3
+
+    # Admission control (/translate answers 503 + Retry-After past these limits)
+    max_concurrent_pipelines: int = 2  # in-process pipelines when the queue is off
+    max_queued_pipelines: int = 20  # admitted jobs waiting for a pipeline slot
+    default_job_duration_s: int = 30  # Retry-After basis before any stage history exists
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
     # Validators
@@ -1,6 +1,7 @@
 import asyncio
 import os
 import time
+import uuid
 from contextlib import asynccontextmanager
 
 import structlog
@@ -11,9 +12,11 @@ from slowapi.errors import RateLimitExceeded
 
 from app.api.v1.router import api_router
 from app.core.config import settings
-from app.core.database import engine
+from app.core.database import async_session_factory, engine
 from app.middleware.rate_limit import limiter
 from app.middleware.security_headers import SecurityHeadersMiddleware
+from app.services.job_service import evict_result_cache
+from app.services.openai_client import close_openai_client
 
 structlog.configure(
     wrapper_class=structlog.make_filtering_bound_logger(
@@ -60,6 +63,16 @@ def _preload_ocr() -> None:
         logger.error("startup.ocr_preload_failed", error=str(e))
 
 
+def _preload_font_metrics() -> None:
+    try:
+        from app.pipeline.typesetter import preload_font_metrics
+
+        sizes = preload_font_metrics()
+        logger.info("startup.glyph_metrics_ready", sizes=sizes, font_path=settings.font_path)
+    except Exception as e:
+        logger.error("startup.glyph_metrics_failed", error=str(e))
+
+
 def _preload_lama() -> None:
     try:
         from app.pipeline.inpainter import get_shared_lama
@@ -79,6 +92,7 @@ async def _cleanup_old_results() -> None:
 
     cutoff = time.time() - (settings.result_ttl_hours * 3600)
     removed = 0
+    removed_job_ids: set[uuid.UUID] = set()
     for filename in os.listdir(result_dir):
         filepath = os.path.join(result_dir, filename)
         if os.path.isfile(filepath) and os.path.getmtime(filepath) < cutoff:
@@ -87,10 +101,21 @@ async def _cleanup_old_results() -> None:
                 removed += 1
             except OSError as e:
                 logger.warning("cleanup.remove_failed", file=filepath, error=str(e))
+                continue
+            try:
+                removed_job_ids.add(uuid.UUID(filename[:36]))
+            except ValueError:
+                pass
 
     if removed > 0:
         logger.info("cleanup.completed", removed_count=removed)
 
+    # Result cache entries live exactly as long as their files
+    if removed_job_ids:
+        async with async_session_factory() as db:
+            await evict_result_cache(db, list(removed_job_ids))
+            await db.commit()
+
 
 async def _cleanup_loop() -> None:
     """Periodically remove result files older than TTL."""
@@ -136,6 +161,8 @@ async def lifespan(app: FastAPI):
     try:
         await _ensure_font()
         logger.info("startup.font_ready")
+        if settings.preload_glyph_metrics:
+            await asyncio.get_event_loop().run_in_executor(None, _preload_font_metrics)
     except Exception as e:
         logger.error("startup.font_check_failed", error=str(e))
         startup_errors.append(f"Font: {str(e)}")
@@ -180,6 +207,7 @@ async def lifespan(app: FastAPI):
         await cleanup_task
     except asyncio.CancelledError:
         pass
+    await close_openai_client()
     await engine.dispose()
     logger.info("shutdown.completed")
 
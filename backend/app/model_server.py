@@ -0,0 +1,319 @@
+"""Local model server shared by API and worker processes.
+
+Holds one copy of PaddleOCR and LaMa and serves them over a Unix socket, so
+extra uvicorn/worker processes do not each load their own models. Requests
+from concurrent jobs are grouped into batches: a batch is dispatched when it
+reaches ``MODEL_SERVER_MAX_BATCH_SIZE`` items or when the oldest request has
+waited ``MODEL_SERVER_MAX_WAIT_MS``. Each model runs on its own thread, so
+OCR and inpainting proceed in parallel while each model sees one batch at a time.
+
+Usage:
+    python -m app.model_server --socket /run/model-server/models.sock
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+from app.utils.ipc import ProtocolError, read_message, write_message
+
+structlog.configure(
+    wrapper_class=structlog.make_filtering_bound_logger(
+        logging.getLevelName(settings.log_level.upper())
+    ),
+)
+logger = structlog.get_logger()
+
+
+class DynamicBatcher:
+    """Collects single requests into batches for one model.
+
+    ``handler`` takes a list of items and returns one result per item; it runs
+    on a single-thread executor because the models are not thread-safe.
+    Batchers over the same model must share one ``executor``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[list[Any]], list[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        executor: ThreadPoolExecutor | None = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue: asyncio.Queue[tuple[Any, asyncio.Future]] = asyncio.Queue()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"model-{name}"
+        )
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Pick up anything else that is already waiting, up to the limit
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Requests whose client went away are dropped before inference
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.handler, [item for item, _ in batch]
+                )
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name} handler returned {len(results)} results "
+                        f"for {len(batch)} items"
+                    )
+            except Exception as e:
+                logger.error("model_server.batch_failed", model=self.name, error=str(e))
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+            logger.debug(
+                "model_server.batch_done",
+                model=self.name,
+                batch_size=len(batch),
+                duration_ms=int((time.monotonic() - start) * 1000),
+            )
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Convert PaddleOCR output (tuples, numpy scalars/arrays) to JSON types."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+def make_ocr_handler(ocr) -> Callable[[list[Any]], list[Any]]:
+    def handle(items: list[tuple[np.ndarray, bool]]) -> list[Any]:
+        # PaddleOCR's full det+rec call takes one image; the batch still
+        # runs back-to-back on the model thread without per-request dispatch
+        return [_to_jsonable(ocr.ocr(image, cls=cls)) for image, cls in items]
+
+    return handle
+
+
+def make_recognize_handler(ocr) -> Callable[[list[Any]], list[Any]]:
+    from app.pipeline.ocr_engine import recognize_lines
+
+    def handle(items: list[tuple[list[np.ndarray], list[bool]]]) -> list[Any]:
+        # Lines from every request in the batch go through one recognizer call
+        lines = [line for item_lines, _ in items for line in item_lines]
+        needs_cls = [flag for _, flags in items for flag in flags]
+        recognized = recognize_lines(ocr, lines, needs_cls)
+        results, offset = [], 0
+        for item_lines, _ in items:
+            results.append(recognized[offset:offset + len(item_lines)])
+            offset += len(item_lines)
+        return results
+
+    return handle
+
+
+def make_lama_handler(lama) -> Callable[[list[Any]], list[Any]]:
+    from PIL import Image
+
+    def handle(items: list[tuple[np.ndarray, np.ndarray]]) -> list[np.ndarray]:
+        # Pages differ in size, so each pair is inpainted on its own
+        return [
+            np.asarray(lama(Image.fromarray(image), Image.fromarray(mask)))
+            for image, mask in items
+        ]
+
+    return handle
+
+
+class ModelServer:
+    """Unix-socket front end dispatching requests to per-model batchers."""
+
+    def __init__(self, socket_path: str, batchers: dict[str, DynamicBatcher]):
+        self.socket_path = socket_path
+        self.batchers = batchers
+        self._server: asyncio.AbstractServer | None = None
+
+    async def _dispatch(self, header: dict, arrays: list[np.ndarray]) -> tuple[dict, list]:
+        op = header.get("op")
+        if op == "ping":
+            return {"ok": True, "models": sorted(self.batchers)}, []
+        if op == "ocr":
+            result = await self.batchers["ocr"].submit((arrays[0], bool(header.get("cls", True))))
+            return {"ok": True, "result": result}, []
+        if op == "recognize":
+            needs_cls = [bool(flag) for flag in header.get("cls", [])]
+            if len(needs_cls) != len(arrays):
+                raise ValueError("recognize: one cls flag per line is required")
+            result = await self.batchers["recognize"].submit((arrays, needs_cls))
+            return {"ok": True, "result": result}, []
+        if op == "inpaint":
+            result = await self.batchers["lama"].submit((arrays[0], arrays[1]))
+            return {"ok": True}, [result]
+        return {"ok": False, "error": f"Unknown op: {op}"}, []
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    header, arrays = await read_message(reader)
+                except ProtocolError:
+                    break
+                try:
+                    response, out_arrays = await self._dispatch(header, arrays)
+                except Exception as e:
+                    response, out_arrays = {"ok": False, "error": str(e)[:500]}, []
+                await write_message(writer, response, out_arrays)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # stale socket from a previous run
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        for batcher in self.batchers.values():
+            batcher.start()
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        logger.info("model_server.listening", socket=self.socket_path, models=sorted(self.batchers))
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def _load_models() -> dict[str, Callable[[list[Any]], list[Any]]]:
+    from app.pipeline.inpainter import create_lama_model
+    from app.pipeline.ocr_engine import create_ocr_model
+
+    handlers = {}
+    try:
+        ocr = create_ocr_model()
+        handlers["ocr"] = make_ocr_handler(ocr)
+        handlers["recognize"] = make_recognize_handler(ocr)
+        logger.info("model_server.model_ready", model="ocr")
+    except Exception as e:
+        logger.error("model_server.model_load_failed", model="ocr", error=str(e))
+    try:
+        handlers["lama"] = make_lama_handler(create_lama_model())
+        logger.info("model_server.model_ready", model="lama")
+    except Exception as e:
+        logger.error("model_server.model_load_failed", model="lama", error=str(e))
+    return handlers
+
+
+# Batchers backed by the same model instance share its thread
+_MODEL_OF_OP = {"ocr": "ocr", "recognize": "ocr", "lama": "lama"}
+
+
+async def _main(socket_path: str) -> None:
+    loop = asyncio.get_event_loop()
+    handlers = await loop.run_in_executor(None, _load_models)
+    executors = {
+        model: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"model-{model}")
+        for model in set(_MODEL_OF_OP.values())
+    }
+    batchers = {
+        name: DynamicBatcher(
+            name,
+            handler,
+            max_batch_size=settings.model_server_max_batch_size,
+            max_wait_ms=settings.model_server_max_wait_ms,
+            executor=executors[_MODEL_OF_OP[name]],
+        )
+        for name, handler in handlers.items()
+    }
+    server = ModelServer(socket_path, batchers)
+
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await server.start()
+    try:
+        await stopping.wait()
+    finally:
+        logger.info("model_server.stopping")
+        await server.stop()
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve OCR and LaMa models over a Unix socket.")
+    parser.add_argument(
+        "--socket",
+        default=settings.model_server_socket or "/tmp/model-server.sock",
+        help="Unix socket path (default: MODEL_SERVER_SOCKET)",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from app.models.job import Job, JobStatus
 from app.models.pipeline_log import PipelineLog
+from app.models.translation_memory import TranslationMemory
 from app.models.user import User
 
-__all__ = ["Job", "JobStatus", "PipelineLog", "User"]
+__all__ = ["Job", "JobStatus", "PipelineLog", "TranslationMemory", "User"]
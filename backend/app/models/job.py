@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, Float, Integer, String, func
+from sqlalchemy import DateTime, Enum, Float, Index, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -18,6 +18,7 @@ class JobStatus(str, enum.Enum):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_created_at", "status", "created_at"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -35,6 +36,20 @@ class Job(Base):
     warnings_json: Mapped[str | None] = mapped_column(String, nullable=True)
     current_stage: Mapped[str | None] = mapped_column(String(50), nullable=True)
     original_filename: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # Queue bookkeeping for app.worker; claimed_at is refreshed by the
+    # worker's heartbeat while the job runs
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    claimed_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    claimed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Whole-page result cache: uploads with the same hash and pipeline version
+    # reuse this job's result; cache-hit jobs point at it via result_job_id
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    pipeline_version: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    result_job_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -18,9 +18,13 @@ class PipelineLog(Base):
         UUID(as_uuid=True), ForeignKey("jobs.id"), index=True
     )
     stage: Mapped[str] = mapped_column(String(50))
+    page: Mapped[int | None] = mapped_column(Integer, nullable=True)  # chapter jobs only
     duration_ms: Mapped[int] = mapped_column(Integer, default=0)
     cost_krw: Mapped[float] = mapped_column(Float, default=0.0)
     tokens_used: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Spend avoided by caches (e.g. translation memory hits)
+    tokens_saved: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    saved_krw: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
     success: Mapped[bool] = mapped_column(Boolean, default=True)
     failure_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
     details: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class TranslationMemory(Base):
+    """Previously translated source lines, reused across jobs.
+
+    ``key`` is a SHA-256 over the model, prompt version and normalised
+    source text, so changing either invalidates old entries.
+    """
+
+    __tablename__ = "translation_memory"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    source_text: Mapped[str] = mapped_column(String)
+    translated_text: Mapped[str] = mapped_column(String)
+    model: Mapped[str] = mapped_column(String(100))
+    prompt_version: Mapped[str] = mapped_column(String(20))
+    tokens: Mapped[int] = mapped_column(Integer, default=0)  # estimated per-entry tokens
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
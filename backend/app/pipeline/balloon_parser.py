@@ -4,18 +4,43 @@ import cv2
 import numpy as np
 import structlog
 
-from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.base import Balloon, PipelineContext, PipelineStage
+from app.pipeline.pyramid import box_to_full, detection_scale
+from app.pipeline.regions import NO_BALLOON
 
 logger = structlog.get_logger()
 
+# Pixels at least this bright count as balloon background
+BALLOON_THRESHOLD = 230
+# Balloons smaller than this (filled interior, full-resolution px) are ignored
+MIN_BALLOON_AREA = 500
+
+
+def fill_holes(binary: np.ndarray) -> np.ndarray:
+    """Fill dark areas fully enclosed by white (the text inside a balloon)."""
+    h, w = binary.shape
+    # Flood the outside from a 1px dark border; what it cannot reach is a hole
+    outside = np.zeros((h + 2, w + 2), np.uint8)
+    outside[1:-1, 1:-1] = binary
+    flood_mask = np.zeros((h + 4, w + 4), np.uint8)
+    cv2.floodFill(outside, flood_mask, (0, 0), 255)
+    holes = cv2.bitwise_not(outside[1:-1, 1:-1])
+    return cv2.bitwise_or(binary, holes)
+
 
 class BalloonParser(PipelineStage):
     """GAP-A: Find speech bubble boundaries around detected text regions.
 
-    Refines bounding boxes by finding the enclosing speech bubble contour.
+    Refines bounding boxes by finding the enclosing speech bubble. Balloons
+    are the connected components of the hole-filled bright mask, so each
+    region's balloon is one label lookup at its centre. Labelling runs on
+    the detection-resolution image; balloon boxes and masks are scaled back
+    to ``preprocessed_image`` coordinates.
     """
 
     name = "balloon_parser"
+    reads = frozenset({"preprocessed_image", "derived.detect_gray", "regions"})
+    writes = frozenset({"regions", "balloons"})
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         if ctx.preprocessed_image is None or not ctx.regions:
@@ -25,52 +50,61 @@ class BalloonParser(PipelineStage):
             None, self._parse_balloons, ctx
         )
 
-        matched = sum(1 for r in ctx.regions if r.balloon_bbox is not None)
+        matched = int(np.count_nonzero(ctx.regions.in_balloon()))
         logger.info(
             "balloon_parser.matched",
             total_regions=len(ctx.regions),
             matched_balloons=matched,
+            balloons=len(ctx.balloons),
             job_id=str(ctx.job_id),
         )
         return ctx
 
     def _parse_balloons(self, ctx: PipelineContext) -> None:
-        gray = cv2.cvtColor(ctx.preprocessed_image, cv2.COLOR_BGR2GRAY)
+        shape = ctx.preprocessed_image.shape
+        scale = detection_scale(shape)
+        gray = ctx.derived("detect_gray")
 
         # Threshold to find white/light speech bubbles
-        _, binary = cv2.threshold(gray, 230, 255, cv2.THRESH_BINARY)
+        _, binary = cv2.threshold(gray, BALLOON_THRESHOLD, 255, cv2.THRESH_BINARY)
 
         # Close small gaps in bubble boundaries
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
         closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=2)
 
-        contours, _ = cv2.findContours(
-            closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(
+            fill_holes(closed), connectivity=8, ltype=cv2.CV_32S
+        )
+
+        h, w = labels.shape
+        regions = ctx.regions
+        bboxes = regions.bboxes
+        # Region centres at detection resolution
+        centers_x = np.clip(((bboxes[:, 0] + bboxes[:, 2]) / 2 * scale).astype(np.intp), 0, w - 1)
+        centers_y = np.clip(((bboxes[:, 1] + bboxes[:, 3]) / 2 * scale).astype(np.intp), 0, h - 1)
+        region_labels = labels[centers_y, centers_x]
+        matched = (region_labels > 0) & (
+            stats[region_labels, cv2.CC_STAT_AREA] > MIN_BALLOON_AREA * scale * scale
         )
 
-        # Filter contours by minimum area
-        min_area = 500
-        balloon_contours = [
-            c for c in contours if cv2.contourArea(c) > min_area
-        ]
-
-        for region in ctx.regions:
-            rx1, ry1, rx2, ry2 = region.bbox
-            center_x = (rx1 + rx2) // 2
-            center_y = (ry1 + ry2) // 2
-
-            best_contour = None
-            best_area = float("inf")
-
-            for contour in balloon_contours:
-                # Check if region center is inside this contour
-                if cv2.pointPolygonTest(contour, (center_x, center_y), False) >= 0:
-                    area = cv2.contourArea(contour)
-                    # Pick the smallest contour that contains the region
-                    if area < best_area:
-                        best_area = area
-                        best_contour = contour
-
-            if best_contour is not None:
-                bx, by, bw, bh = cv2.boundingRect(best_contour)
-                region.balloon_bbox = (bx, by, bx + bw, by + bh)
+        # One balloon per label, numbered in reading order of first use
+        used, first = np.unique(region_labels[matched], return_index=True)
+        used = used[np.argsort(first)]
+        ctx.balloons = []
+        for label in used.tolist():
+            bx, by, bw, bh, _ = (int(v) for v in stats[label])
+            mask = (labels[by:by + bh, bx:bx + bw] == label).astype(np.uint8) * 255
+            bbox = box_to_full((bx, by, bx + bw, by + bh), scale, shape)
+            if scale < 1.0:
+                size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+                mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+            ctx.balloons.append(
+                Balloon(id=len(ctx.balloons), bbox=bbox, area=cv2.countNonZero(mask), mask=mask)
+            )
+
+        balloon_of_label = np.full(len(stats), NO_BALLOON, dtype=np.int32)
+        balloon_of_label[used] = np.arange(len(used))
+        regions.balloon_ids[:] = np.where(matched, balloon_of_label[region_labels], NO_BALLOON)
+        if ctx.balloons:
+            balloon_bboxes = np.array([b.bbox for b in ctx.balloons], dtype=np.int32)
+            regions.balloon_bboxes[matched] = balloon_bboxes[regions.balloon_ids[matched]]
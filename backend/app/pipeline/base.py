@@ -1,10 +1,53 @@
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from uuid import UUID
 
+import cv2
 import numpy as np
 
-from app.schemas.pipeline import DetectedRegion, MappedTranslation, OcrResult
+from app.pipeline.pyramid import detection_scale, downscale
+from app.pipeline.regions import MappedTranslation, OcrResult, RegionTable
+
+# Full-frame buffers the orchestrator may release after their last reader
+IMAGE_FIELDS = frozenset(
+    {"original_image", "preprocessed_image", "inpainted_image", "result_image"}
+)
+
+
+def _detect_gray(ctx: "PipelineContext", img: np.ndarray) -> np.ndarray:
+    return downscale(ctx.derived("gray"), detection_scale(img.shape))
+
+
+# Views available from PipelineContext.derived(): name -> fn(ctx, preprocessed_image)
+DERIVED_VIEWS = {
+    "gray": lambda ctx, img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY),
+    "rgb": lambda ctx, img: cv2.cvtColor(img, cv2.COLOR_BGR2RGB),
+    # Grayscale at detection resolution (see app.pipeline.pyramid)
+    "detect_gray": _detect_gray,
+}
+
+
+@dataclass
+class Balloon:
+    """A speech balloon found by BalloonParser.
+
+    ``mask`` is the balloon interior (text holes filled) cropped to ``bbox``,
+    255 inside and 0 outside.
+    """
+
+    id: int
+    bbox: tuple[int, int, int, int]  # (x1, y1, x2, y2)
+    area: int  # interior pixels
+    mask: np.ndarray
+
+
+@dataclass
+class Panel:
+    """A comic panel found by PanelSegmenter; ``id`` is its reading position."""
+
+    id: int
+    bbox: tuple[int, int, int, int]  # (x1, y1, x2, y2)
 
 
 @dataclass
@@ -12,7 +55,13 @@ class PipelineContext:
     """Mutable context object passed through all pipeline stages.
 
     Each stage reads what it needs and writes its outputs.
-    The orchestrator passes this through stages sequentially.
+    The orchestrator shares one context between all stages; stages whose
+    declared inputs are ready may run concurrently.
+
+    Colour-converted and downscaled views of ``preprocessed_image`` come
+    from ``derived()``, which computes each once per image; stages that use
+    one declare it as ``"derived.<name>"`` in ``reads`` so it can be released
+    after its last use.
     """
 
     job_id: UUID
@@ -24,9 +73,13 @@ class PipelineContext:
     result_image: np.ndarray | None = None
 
     # Pipeline intermediate data
-    regions: list[DetectedRegion] = field(default_factory=list)
+    regions: RegionTable = field(default_factory=RegionTable)
     ocr_results: list[OcrResult] = field(default_factory=list)
     translations: list[MappedTranslation] = field(default_factory=list)
+    # Balloons enclosing at least one region, indexed by the regions' balloon_id
+    balloons: list[Balloon] = field(default_factory=list)
+    # Panels in reading order, indexed by the regions' panel_id
+    panels: list[Panel] = field(default_factory=list)
 
     # Translation prompt (built by translation_prep, consumed by translator)
     translation_prompt: str = ""
@@ -34,11 +87,46 @@ class PipelineContext:
     # Metadata bag for per-stage costs, timings, and intermediate results
     metadata: dict = field(default_factory=dict)
 
+    # derived() cache: name -> (source image, converted image)
+    _derived: dict = field(default_factory=dict, repr=False)
+    _derived_lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def derived(self, name: str) -> np.ndarray:
+        """``preprocessed_image`` as the view ``name`` (see ``DERIVED_VIEWS``)."""
+        img = self.preprocessed_image
+        if img is None:
+            raise ValueError("No preprocessed image")
+        with self._derived_lock:
+            cached = self._derived.get(name)
+            if cached is None or cached[0] is not img:
+                cached = (img, DERIVED_VIEWS[name](self, img))
+                self._derived[name] = cached
+            return cached[1]
+
+    def release(self, field_name: str) -> None:
+        """Drop a buffer no remaining stage reads, so it can be freed."""
+        if field_name.startswith("derived."):
+            with self._derived_lock:
+                self._derived.pop(field_name.removeprefix("derived."), None)
+        elif field_name in IMAGE_FIELDS:
+            setattr(self, field_name, None)
+            if field_name == "preprocessed_image":
+                with self._derived_lock:
+                    self._derived.clear()
+
 
 class PipelineStage(ABC):
-    """Abstract base class for all pipeline stages."""
+    """Abstract base class for all pipeline stages.
+
+    ``reads`` and ``writes`` name the ``PipelineContext`` fields a stage
+    consumes and produces. Metadata entries are named ``"metadata.<key>"``.
+    Append-only metadata such as ``warnings`` is not declared. A stage that
+    declares neither is treated as a barrier and runs on its own.
+    """
 
     name: str = "unnamed"
+    reads: frozenset[str] = frozenset()
+    writes: frozenset[str] = frozenset()
 
     @abstractmethod
     async def process(self, ctx: PipelineContext) -> PipelineContext:
@@ -0,0 +1,189 @@
+"""Chapter-level translation batching.
+
+A chapter job runs one pipeline per page, and each page's Translator would
+send its own request, repeating the system prompt and paying a full round
+trip per page. With a ``ChapterBatcher`` the translators of concurrently
+running pages hand their entries over instead: entries from several pages
+are packed into one request, keyed by page and region id, and each page
+gets back its own translations and its share of the tokens.
+
+A request is sent once it holds ``max_tokens`` of estimated entry text or
+``max_pages`` pages, or once its first page has waited ``max_wait_ms``.
+Capping the size keeps a failed or unparsable request from taking more
+than a few pages with it.
+"""
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import structlog
+
+from app.pipeline.translation_prep import CHAPTER_PROMPT_TEMPLATE, SYSTEM_PROMPT, response_id
+from app.services.cost_tracker import estimate_tokens
+
+logger = structlog.get_logger()
+
+# (system prompt, user prompt, job id for logs) -> chat completion
+CompleteFn = Callable[[str, str, str], Awaitable[Any]]
+
+
+@dataclass
+class BatchResult:
+    """One page's part of a batched request."""
+
+    translations: list[dict]
+    input_tokens: int
+    output_tokens: int
+    pages: int  # pages that shared the request
+    parse_error: bool = False
+    # The page's entries the response left out (all of them on a parse error)
+    missing: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class _PageRequest:
+    entries: list[dict]
+    tokens: int
+    future: asyncio.Future
+
+
+def split_tokens(total: int, weights: list[int]) -> list[int]:
+    """Split ``total`` into integer shares proportional to ``weights``."""
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    shares = [total * w // weight_sum for w in weights]
+    shares[0] += total - sum(shares)
+    return shares
+
+
+class ChapterBatcher:
+    """Packs the translation entries of a chapter's pages into shared requests.
+
+    ``complete`` sends one JSON-mode request (``Translator.complete``), so
+    batched calls go through the same circuit breaker, rate limiter and
+    retries as single pages.
+    """
+
+    def __init__(
+        self,
+        complete: CompleteFn,
+        max_tokens: int,
+        max_pages: int,
+        max_wait_ms: float,
+        job_id: str = "",
+    ):
+        self.complete = complete
+        self.max_tokens = max(1, max_tokens)
+        self.max_pages = max(1, max_pages)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self.job_id = job_id
+        self._pending: list[_PageRequest] = []
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def translate(self, entries: list[dict]) -> BatchResult:
+        """Queue one page's ``{"id", "text"}`` entries and wait for their translations."""
+        loop = asyncio.get_running_loop()
+        request = _PageRequest(
+            entries=entries,
+            tokens=sum(estimate_tokens(e["text"]) for e in entries),
+            future=loop.create_future(),
+        )
+        # A page that would overflow the open batch starts the next one
+        if self._pending and self._pending_tokens + request.tokens > self.max_tokens:
+            self._flush()
+        self._pending.append(request)
+        self._pending_tokens += request.tokens
+        if len(self._pending) >= self.max_pages or self._pending_tokens >= self.max_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush)
+        return await request.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [r for r in self._pending if not r.future.done()]
+        self._pending = []
+        self._pending_tokens = 0
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[_PageRequest]) -> None:
+        entries = [
+            {"page": page, "id": e["id"], "text": e["text"]}
+            for page, request in enumerate(batch)
+            for e in request.entries
+        ]
+        user_prompt = CHAPTER_PROMPT_TEMPLATE.format(
+            entries_json=json.dumps(entries, ensure_ascii=False, indent=2)
+        )
+        logger.info(
+            "chapter_batcher.sending",
+            pages=len(batch),
+            entry_count=len(entries),
+            job_id=self.job_id,
+        )
+        try:
+            response = await self.complete(SYSTEM_PROMPT, user_prompt, self.job_id)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        per_page: list[list[dict]] = [[] for _ in batch]
+        parse_error = False
+        raw_content = response.choices[0].message.content
+        try:
+            items = json.loads(raw_content).get("translations", [])
+        except (json.JSONDecodeError, AttributeError):
+            logger.error(
+                "chapter_batcher.json_parse_error",
+                content=raw_content[:200],
+                job_id=self.job_id,
+            )
+            items = []
+            parse_error = True
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            page = response_id(item.get("page"))
+            region_id = response_id(item.get("id"))
+            if page is not None and 0 <= page < len(batch) and region_id is not None:
+                per_page[page].append({"id": region_id, "text": item.get("text", "")})
+
+        weights = [request.tokens for request in batch]
+        input_shares = split_tokens(response.usage.prompt_tokens, weights)
+        output_shares = split_tokens(response.usage.completion_tokens, weights)
+        for request, translations, input_tokens, output_tokens in zip(
+            batch, per_page, input_shares, output_shares
+        ):
+            returned = {t["id"] for t in translations}
+            missing = [e for e in request.entries if e["id"] not in returned]
+            if missing and not parse_error:
+                logger.warning(
+                    "chapter_batcher.entries_missing",
+                    missing=len(missing),
+                    entry_count=len(request.entries),
+                    job_id=self.job_id,
+                )
+            if not request.future.done():
+                request.future.set_result(
+                    BatchResult(
+                        translations=translations,
+                        input_tokens=input_tokens,
+                        output_tokens=output_tokens,
+                        pages=len(batch),
+                        parse_error=parse_error,
+                        missing=missing,
+                    )
+                )
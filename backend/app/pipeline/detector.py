@@ -1,18 +1,71 @@
 import asyncio
+import json
 
 import cv2
 import numpy as np
 import structlog
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
-from app.schemas.pipeline import DetectedRegion
+from app.pipeline.pyramid import boxes_to_full, detection_scale
+from app.pipeline.regions import RegionTable, reading_order
+from app.pipeline.webtoon import is_webtoon, merge_slice_boxes, plan_slices
 
 logger = structlog.get_logger()
 
-# Minimum area for a text region (filters out noise)
+# Minimum area for a text region at full resolution (filters out noise)
 MIN_REGION_AREA = 200
 # Minimum aspect ratio height/width to filter horizontal lines
 MIN_ASPECT_RATIO = 0.1
+# Boxes overlapping by more than this IoU are merged
+MERGE_IOU = 0.2
+# ... as is a box with at least this fraction of its area inside another
+MERGE_CONTAINMENT = 0.7
+
+
+def merge_boxes(
+    boxes: np.ndarray, iou: float = MERGE_IOU, containment: float = MERGE_CONTAINMENT
+) -> np.ndarray:
+    """Replace each group of overlapping or nested boxes by their union.
+
+    Overlap is computed for all pairs at once; groups are the connected
+    components of the overlap graph (min-label propagation). A union can
+    overlap a box its members did not, so this repeats until stable.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    while len(boxes) > 1:
+        x1, y1, x2, y2 = boxes.T
+        area = (x2 - x1) * (y2 - y1)
+        iw = np.minimum(x2[:, None], x2) - np.maximum(x1[:, None], x1)
+        ih = np.minimum(y2[:, None], y2) - np.maximum(y1[:, None], y1)
+        inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+        union = area[:, None] + area - inter
+        overlap = (inter > iou * union) | (inter >= containment * np.minimum(area[:, None], area))
+        overlap &= inter > 0
+        np.fill_diagonal(overlap, False)
+        if not overlap.any():
+            break
+
+        n = len(boxes)
+        labels = np.arange(n)
+        while True:
+            linked = np.where(overlap, labels, n).min(axis=1)
+            updated = np.minimum(labels, linked)
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        _, group = np.unique(labels, return_inverse=True)
+
+        merged = np.empty((group.max() + 1, 4), dtype=np.int64)
+        merged[:, :2] = np.iinfo(np.int64).max
+        merged[:, 2:] = np.iinfo(np.int64).min
+        np.minimum.at(merged[:, 0], group, x1)
+        np.minimum.at(merged[:, 1], group, y1)
+        np.maximum.at(merged[:, 2], group, x2)
+        np.maximum.at(merged[:, 3], group, y2)
+        boxes = merged
+    return boxes
 
 
 class TextDetector(PipelineStage):
@@ -20,28 +73,61 @@ class TextDetector(PipelineStage):
 
     Uses OpenCV-based contour detection as the primary method.
     CRAFT can be added as an enhancement in Phase 2.
+
+    Runs on the detection-resolution image; boxes are scaled back to
+    ``preprocessed_image`` coordinates.
     """
 
     name = "detector"
+    reads = frozenset({"preprocessed_image", "derived.detect_gray"})
+    writes = frozenset({"regions"})
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         if ctx.preprocessed_image is None:
             raise ValueError("No preprocessed image")
 
-        regions = await asyncio.get_event_loop().run_in_executor(
-            None, self._detect, ctx.preprocessed_image
-        )
+        shape = ctx.preprocessed_image.shape
+        scale = detection_scale(shape)
+        min_area = MIN_REGION_AREA * scale * scale
+        webtoon = is_webtoon(shape)
+
+        loop = asyncio.get_event_loop()
+        gray = await loop.run_in_executor(None, ctx.derived, "detect_gray")
+        if webtoon:
+            # Overlapping bands are detected in parallel (OpenCV releases the GIL)
+            slices = plan_slices(
+                gray.shape[0],
+                max(1, round(settings.webtoon_slice_height * scale)),
+                round(settings.webtoon_slice_overlap * scale),
+            )
+            per_slice = await asyncio.gather(
+                *(
+                    loop.run_in_executor(None, self._find_boxes, gray[y0:y1], min_area)
+                    for y0, y1 in slices
+                )
+            )
+            candidates = merge_slice_boxes([b.tolist() for b in per_slice], slices)
+            ctx.metadata["detector_details"] = json.dumps({"webtoon_slices": len(slices)})
+        else:
+            candidates = await loop.run_in_executor(None, self._find_boxes, gray, min_area)
 
+        boxes = merge_boxes(candidates)
+        regions = self._to_regions(boxes_to_full(boxes, scale, shape), webtoon=webtoon)
         ctx.regions = regions
         logger.info(
             "detector.found_regions",
             count=len(regions),
+            merged=len(candidates) - len(boxes),
+            detection_scale=round(scale, 3),
             job_id=str(ctx.job_id),
         )
         return ctx
 
-    def _detect(self, img: np.ndarray) -> list[DetectedRegion]:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def _detect(self, gray: np.ndarray) -> RegionTable:
+        return self._to_regions(merge_boxes(self._find_boxes(gray)))
+
+    def _find_boxes(self, gray: np.ndarray, min_area: float = MIN_REGION_AREA) -> np.ndarray:
+        """Candidate text boxes as an ``(N, 4)`` array of ``(x1, y1, x2, y2)``."""
         h, w = gray.shape[:2]
 
         # Adaptive threshold to handle varying backgrounds
@@ -65,35 +151,24 @@ class TextDetector(PipelineStage):
         contours, _ = cv2.findContours(
             merged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
+        if not contours:
+            return np.empty((0, 4), dtype=np.int64)
+        rects = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64)
+        x, y, bw, bh = rects.T
+
+        # Filter out too small or too thin regions
+        keep = bw * bh >= min_area
+        keep &= ~(
+            (bh < MIN_ASPECT_RATIO * np.maximum(bw, 1))
+            & (bw < MIN_ASPECT_RATIO * np.maximum(bh, 1))
+        )
+        # Filter out regions that span the entire image (likely borders)
+        keep &= ~((bw > w * 0.9) & (bh > h * 0.9))
 
-        regions = []
-        for contour in contours:
-            x, y, cw, ch = cv2.boundingRect(contour)
-            area = cw * ch
-
-            # Filter out too small or too thin regions
-            if area < MIN_REGION_AREA:
-                continue
-            if ch / max(cw, 1) < MIN_ASPECT_RATIO and cw / max(ch, 1) < MIN_ASPECT_RATIO:
-                continue
-            # Filter out regions that span the entire image (likely borders)
-            if cw > w * 0.9 and ch > h * 0.9:
-                continue
-
-            regions.append(
-                DetectedRegion(
-                    id=len(regions),
-                    bbox=(x, y, x + cw, y + ch),
-                    region_type="dialogue",
-                    confidence=0.8,
-                    reading_order=0,
-                )
-            )
-
-        # Sort by reading order: right-to-left, top-to-bottom (RTL manga)
-        regions.sort(key=lambda r: (-r.bbox[0], r.bbox[1]))
-        for idx, region in enumerate(regions):
-            region.reading_order = idx
-            region.id = idx
+        return np.stack([x, y, x + bw, y + bh], axis=1)[keep]
 
-        return regions
+    def _to_regions(self, boxes: np.ndarray, webtoon: bool = False) -> RegionTable:
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        return RegionTable.from_boxes(
+            boxes[reading_order(boxes, webtoon=webtoon)], region_type="dialogue", confidence=0.8
+        )
@@ -0,0 +1,157 @@
+"""Process-wide cache of loaded fonts and their glyph advance widths.
+
+Parsing a TTF is far more expensive than drawing with it, and a page renders
+dozens of balloons at a handful of sizes, so fonts are kept in a bounded LRU
+keyed by ``(path, size)``. Each entry carries a table of per-character
+advance widths; layout sums those instead of asking FreeType to measure
+every candidate line (each ``getlength`` call costs tens of microseconds).
+
+Korean fonts draw every Hangul syllable on the same em-square, so the table
+measures a sample of syllables and, when they agree, answers for the whole
+U+AC00-U+D7A3 block from that one value. ASCII, jamo and common punctuation
+are measured up front; anything else is learned on first use.
+"""
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import structlog
+from PIL import ImageFont
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+HANGUL_FIRST = "\uac00"
+HANGUL_LAST = "\ud7a3"
+# Simple, wide and dense syllables; a font with proportional Hangul differs here
+HANGUL_SAMPLE = "가각갉괜궯뀀똠뭐뷁쌍왜의짧췌퀭톺퓔흙힣"
+
+PRELOAD_CHARSET = (
+    "".join(chr(c) for c in range(0x20, 0x7F))  # ASCII
+    + "".join(chr(c) for c in range(0x3131, 0x318F))  # compatibility jamo (ㅋㅋ, ㅠㅠ)
+    + "…·‘’“”「」『』、。！？〜～ー―♡♥★☆"
+)
+
+
+class GlyphMetrics:
+    """Advance widths of single characters for one font at one size.
+
+    Summing advances ignores kerning between pairs, which is below a pixel
+    at balloon sizes and the same for every candidate line.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont | ImageFont.ImageFont):
+        self.font = font
+        self._advances: dict[str, float] = {}
+        self._lock = threading.Lock()
+        sample = {font.getlength(char) for char in HANGUL_SAMPLE}
+        self.hangul_advance: float | None = sample.pop() if len(sample) == 1 else None
+
+    def preload(self, chars: Iterable[str]) -> None:
+        for char in chars:
+            self.advance(char)
+
+    def advance(self, char: str) -> float:
+        width = self._advances.get(char)
+        if width is None:
+            if self.hangul_advance is not None and HANGUL_FIRST <= char <= HANGUL_LAST:
+                return self.hangul_advance
+            with self._lock:
+                width = self.font.getlength(char)
+            self._advances[char] = width
+        return width
+
+    def advances(self, text: str) -> list[float]:
+        return [self.advance(char) for char in text]
+
+    def measure(self, text: str) -> float:
+        return sum(self.advances(text))
+
+    def __len__(self) -> int:
+        return len(self._advances)
+
+
+class FontCache:
+    """Thread-safe LRU of ``(path, size) -> (font, glyph metrics)``.
+
+    Missing files and load errors return ``None`` and are not cached, so a
+    font downloaded after startup is picked up on the next call.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[
+            tuple[str, int], tuple[ImageFont.FreeTypeFont, GlyphMetrics]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(
+        self, path: str, size: int
+    ) -> tuple[ImageFont.FreeTypeFont, GlyphMetrics] | None:
+        key = (path, size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        if not os.path.exists(path):
+            return None
+        try:
+            font = ImageFont.truetype(path, size)
+            metrics = GlyphMetrics(font)
+        except Exception as e:
+            logger.warning("font_cache.load_failed", font_path=path, size=size, error=str(e))
+            return None
+
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the first copy
+            entry = self._entries.setdefault(key, (font, metrics))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_font(self, path: str, size: int) -> ImageFont.FreeTypeFont | None:
+        entry = self._entry(path, size)
+        return entry[0] if entry else None
+
+    def get_metrics(self, path: str, size: int) -> GlyphMetrics | None:
+        entry = self._entry(path, size)
+        return entry[1] if entry else None
+
+    def preload(self, path: str, sizes: Iterable[int], chars: str = PRELOAD_CHARSET) -> int:
+        """Load ``path`` at each size and fill its glyph table; returns sizes loaded."""
+        loaded = 0
+        for size in sizes:
+            metrics = self.get_metrics(path, size)
+            if metrics is None:
+                break
+            metrics.preload(chars)
+            loaded += 1
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@functools.lru_cache(maxsize=64)
+def fallback_metrics(size: int) -> GlyphMetrics:
+    """Pillow's built-in font at ``size``, for when the configured font is missing."""
+    return GlyphMetrics(ImageFont.load_default(size))
+
+
+font_cache = FontCache(settings.font_cache_size)
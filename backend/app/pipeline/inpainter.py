@@ -1,34 +1,80 @@
 import asyncio
+import json
 
 import cv2
 import numpy as np
 import structlog
 from PIL import Image
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.panel_segmenter import get_panel_pool
+from app.pipeline.regions import RegionTable
 
 logger = structlog.get_logger()
 
 MASK_PADDING = 5
 
+# LaMa's downsampling factor; crop sides are rounded up to a multiple of it
+LAMA_STRIDE = 8
+# Surrounding image given to LaMa around each masked cluster (px)
+CROP_CONTEXT = 32
+# Masks closer than this are inpainted in the same crop (px)
+CLUSTER_GAP = 24
+# Merge two crops when their union is at most this much larger than both
+MERGE_AREA_SLACK = 1.3
+
+# Background check on the ring of pixels around each region's mask
+RING_WIDTH = 6
+MIN_RING_PIXELS = 50
+# Flat (e.g. plain white balloon): fill with the ring's median colour
+FLAT_MAX_STD = 6.0
+FLAT_MAX_EDGE_DENSITY = 0.01
+# Smooth (gradients, light screentone): cv2.inpaint; anything busier goes to LaMa
+SMOOTH_MAX_STD = 20.0
+SMOOTH_MAX_EDGE_DENSITY = 0.05
+TELEA_RADIUS = 3
+
+PATH_FILL = "fill"
+PATH_TELEA = "telea"
+PATH_LAMA = "lama"
+
 # Module-level singleton for model preloading
 _shared_lama_instance = None
 
 
+def create_lama_model():
+    """Load a SimpleLama instance in this process."""
+    from simple_lama_inpainting import SimpleLama
+
+    return SimpleLama()
+
+
 def get_shared_lama():
-    """Get or create the shared SimpleLama instance."""
+    """Get or create the shared SimpleLama instance.
+
+    When ``MODEL_SERVER_SOCKET`` is set, this is a proxy to the model server.
+    """
     global _shared_lama_instance
     if _shared_lama_instance is None:
-        from simple_lama_inpainting import SimpleLama
+        if settings.model_server_socket:
+            from app.services.model_client import RemoteLama, get_model_client
 
-        _shared_lama_instance = SimpleLama()
+            _shared_lama_instance = RemoteLama(get_model_client())
+        else:
+            _shared_lama_instance = create_lama_model()
     return _shared_lama_instance
 
 
 class Inpainter(PipelineStage):
-    """STAGE 4-remove: Remove original text using LaMa inpainting."""
+    """STAGE 4-remove: Remove original text using LaMa inpainting.
+
+    LaMa runs on padded crops around clusters of text, not the whole page.
+    """
 
     name = "inpainter"
+    reads = frozenset({"preprocessed_image", "derived.gray", "regions"})
+    writes = frozenset({"inpainted_image"})
 
     def __init__(self):
         self._lama = None
@@ -44,47 +90,273 @@ class Inpainter(PipelineStage):
             ctx.inpainted_image = ctx.preprocessed_image
             return ctx
 
-        ctx.inpainted_image = await asyncio.get_event_loop().run_in_executor(
-            None, self._inpaint, ctx.preprocessed_image, ctx.regions
+        loop = asyncio.get_event_loop()
+        gray = None
+        if settings.inpaint_fast_path:
+            gray = await loop.run_in_executor(None, ctx.derived, "gray")
+        ctx.inpainted_image, stats = await loop.run_in_executor(
+            None, self._inpaint, ctx.preprocessed_image, ctx.regions, gray
         )
+        ctx.metadata["inpainter_details"] = json.dumps(stats)
 
         logger.info(
             "inpainter.completed",
             regions_inpainted=len(ctx.regions),
             job_id=str(ctx.job_id),
+            **stats,
         )
         return ctx
 
-    def _inpaint(self, img: np.ndarray, regions) -> np.ndarray:
+    def _inpaint(
+        self, img: np.ndarray, regions: RegionTable, gray: np.ndarray | None = None
+    ) -> tuple[np.ndarray, dict]:
         h, w = img.shape[:2]
+        boxes = _padded_boxes(regions.bboxes, w, h)
+        text_mask = _fill_boxes((h, w), boxes)
+        result = img.copy()
 
-        # Create mask: white (255) where text should be removed
-        mask = np.zeros((h, w), dtype=np.uint8)
-        for region in regions:
-            x1, y1, x2, y2 = region.bbox
-            # Add padding around text region for cleaner inpainting
-            x1 = max(0, x1 - MASK_PADDING)
-            y1 = max(0, y1 - MASK_PADDING)
-            x2 = min(w, x2 + MASK_PADDING)
-            y2 = min(h, y2 + MASK_PADDING)
-            mask[y1:y2, x1:x2] = 255
-
-        # Convert to PIL for simple-lama
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(img_rgb)
-        mask_pil = Image.fromarray(mask)
-
-        try:
-            lama = self._get_lama()
-            result_pil = lama(img_pil, mask_pil)
-            result = cv2.cvtColor(np.array(result_pil), cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            logger.warning(
-                "inpainter.lama_failed_using_simple_fill",
-                error=str(e),
-            )
+        paths = {PATH_FILL: 0, PATH_TELEA: 0, PATH_LAMA: 0}
+        use_lama = np.ones(len(boxes), dtype=bool)
+        if settings.inpaint_fast_path:
+            if gray is None:
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+            def clean(rows: np.ndarray) -> list[str]:
+                return _fast_path(result, img, gray, text_mask, boxes[rows])
+
+            # Panels are independent work units; OpenCV releases the GIL.
+            # Each box reads its ring from img and writes only its own
+            # pixels, so groups whose rings overlap do not race on result.
+            groups = regions.panel_groups()
+            if len(groups) > 1 and settings.panel_threads > 1:
+                chosen = list(get_panel_pool().map(clean, groups))
+            else:
+                chosen = [clean(rows) for rows in groups]
+            for rows, group_paths in zip(groups, chosen):
+                for path in group_paths:
+                    paths[path] += 1
+                use_lama[rows] = np.array(group_paths) == PATH_LAMA
+        else:
+            paths[PATH_LAMA] = len(boxes)
+
+        mask = _fill_boxes((h, w), boxes[use_lama])
+        crops = plan_crops(mask)
+
+        lama_failed = False
+        for box in crops:
+            x1, y1, x2, y2 = box
+            crop_mask = mask[y1:y2, x1:x2]
+            if not lama_failed:
+                try:
+                    # Context comes from result, where fast-path regions are already clean
+                    patch = self._inpaint_crop(result[y1:y2, x1:x2], crop_mask)
+                    region = result[y1:y2, x1:x2]
+                    # Paste back only masked pixels; LaMa also alters the context
+                    region[crop_mask == 255] = patch[crop_mask == 255]
+                    continue
+                except Exception as e:
+                    logger.warning(
+                        "inpainter.lama_failed_using_simple_fill",
+                        error=str(e),
+                    )
+                    lama_failed = True
             # Fallback: simple white fill
-            result = img.copy()
-            result[mask == 255] = 255
+            result[y1:y2, x1:x2][crop_mask == 255] = 255
+
+        stats = {
+            "fill_regions": paths[PATH_FILL],
+            "telea_regions": paths[PATH_TELEA],
+            "lama_regions": paths[PATH_LAMA],
+            "lama_crops": len(crops),
+            "masked_fraction": round(float(np.count_nonzero(text_mask)) / (h * w), 4),
+            "lama_area_fraction": round(
+                sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in crops) / (h * w), 4
+            ),
+        }
+        return result, stats
+
+    def _inpaint_crop(self, crop: np.ndarray, crop_mask: np.ndarray) -> np.ndarray:
+        """Run LaMa on one crop, padded to the model stride, and return it unpadded."""
+        ch, cw = crop.shape[:2]
+        pad_b = -ch % LAMA_STRIDE
+        pad_r = -cw % LAMA_STRIDE
+        if pad_b or pad_r:
+            crop = cv2.copyMakeBorder(crop, 0, pad_b, 0, pad_r, cv2.BORDER_REFLECT)
+            crop_mask = cv2.copyMakeBorder(
+                crop_mask, 0, pad_b, 0, pad_r, cv2.BORDER_CONSTANT, value=0
+            )
+
+        crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        result_pil = self._get_lama()(Image.fromarray(crop_rgb), Image.fromarray(crop_mask))
+        # SimpleLama returns its own stride-padded size; crop back to the input.
+        # The BGR view is only read for masked pixels, so no converted copy is made.
+        return np.asarray(result_pil)[:ch, :cw, ::-1]
+
+
+def _padded_boxes(bboxes: np.ndarray, w: int, h: int) -> np.ndarray:
+    # Add padding around text regions for cleaner inpainting
+    pad = np.array([-MASK_PADDING, -MASK_PADDING, MASK_PADDING, MASK_PADDING])
+    return np.clip(np.asarray(bboxes).reshape(-1, 4) + pad, 0, [w, h, w, h])
+
+
+def _fill_boxes(shape: tuple[int, int], boxes: np.ndarray) -> np.ndarray:
+    mask = np.zeros(shape, dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes.tolist():
+        mask[y1:y2, x1:x2] = 255
+    return mask
+
+
+def build_text_mask(shape: tuple[int, int], bboxes: np.ndarray) -> np.ndarray:
+    """Mask that is 255 over every (padded) region bbox."""
+    h, w = shape
+    return _fill_boxes((h, w), _padded_boxes(bboxes, w, h))
+
+
+def _ring(box: tuple[int, int, int, int], shape: tuple[int, int]) -> tuple[int, int, int, int]:
+    x1, y1, x2, y2 = box
+    h, w = shape
+    return (
+        max(0, x1 - RING_WIDTH),
+        max(0, y1 - RING_WIDTH),
+        min(w, x2 + RING_WIDTH),
+        min(h, y2 + RING_WIDTH),
+    )
+
+
+def _fast_path(
+    result: np.ndarray,
+    img: np.ndarray,
+    gray: np.ndarray,
+    text_mask: np.ndarray,
+    boxes: np.ndarray,
+) -> list[str]:
+    """Clean each box with a flat fill or cv2.inpaint where possible; returns each box's path."""
+    paths = []
+    for box in boxes.tolist():
+        path = classify_background(gray, text_mask, box)
+        if path == PATH_FILL:
+            _fill_flat(result, img, text_mask, box)
+        elif path == PATH_TELEA:
+            _fill_telea(result, img, text_mask, box)
+        paths.append(path)
+    return paths
+
+
+def classify_background(
+    gray: np.ndarray, text_mask: np.ndarray, box: tuple[int, int, int, int]
+) -> str:
+    """Pick the cheapest inpainting path that will look right for one region.
+
+    Looks at the ring of unmasked pixels around ``box``: its intensity
+    spread and the share of Canny edge pixels in it.
+    """
+    rx1, ry1, rx2, ry2 = _ring(box, gray.shape)
+    ring_gray = gray[ry1:ry2, rx1:rx2]
+    ring = text_mask[ry1:ry2, rx1:rx2] == 0
+    if np.count_nonzero(ring) < MIN_RING_PIXELS:
+        return PATH_LAMA
+
+    values = ring_gray[ring]
+    std = float(values.std())
+    edge_density = float(np.count_nonzero(cv2.Canny(ring_gray, 50, 150)[ring])) / values.size
+
+    if std <= FLAT_MAX_STD and edge_density <= FLAT_MAX_EDGE_DENSITY:
+        return PATH_FILL
+    if std <= SMOOTH_MAX_STD and edge_density <= SMOOTH_MAX_EDGE_DENSITY:
+        return PATH_TELEA
+    return PATH_LAMA
+
+
+def _fill_flat(
+    result: np.ndarray,
+    img: np.ndarray,
+    text_mask: np.ndarray,
+    box: tuple[int, int, int, int],
+) -> None:
+    rx1, ry1, rx2, ry2 = _ring(box, text_mask.shape)
+    ring = text_mask[ry1:ry2, rx1:rx2] == 0
+    colour = np.median(img[ry1:ry2, rx1:rx2][ring], axis=0)
+    x1, y1, x2, y2 = box
+    result[y1:y2, x1:x2] = colour.astype(np.uint8)
+
+
+def _fill_telea(
+    result: np.ndarray,
+    img: np.ndarray,
+    text_mask: np.ndarray,
+    box: tuple[int, int, int, int],
+) -> None:
+    rx1, ry1, rx2, ry2 = _ring(box, text_mask.shape)
+    # Every text pixel in the ring is unknown, so a neighbour's text cannot bleed in
+    crop_mask = text_mask[ry1:ry2, rx1:rx2]
+    filled = cv2.inpaint(img[ry1:ry2, rx1:rx2], crop_mask, TELEA_RADIUS, cv2.INPAINT_TELEA)
+    # Write back only this box: other boxes in the ring may be cleaned
+    # concurrently by another panel group
+    x1, y1, x2, y2 = box
+    result[y1:y2, x1:x2] = filled[y1 - ry1:y2 - ry1, x1 - rx1:x2 - rx1]
+
+
+def _area(box: tuple[int, int, int, int]) -> int:
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def _union(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _align_span(start: int, end: int, limit: int) -> tuple[int, int]:
+    """Grow [start, end) to a multiple of LAMA_STRIDE while staying inside [0, limit)."""
+    target = min(-(-(end - start) // LAMA_STRIDE) * LAMA_STRIDE, limit)
+    end = min(limit, start + target)
+    start = max(0, end - target)
+    return start, end
+
+
+def plan_crops(mask: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """Group the mask into clusters and return one padded crop box per LaMa pass.
+
+    Masks closer than CLUSTER_GAP share a cluster. Each cluster gets
+    CROP_CONTEXT pixels of surrounding image, and crops are merged when the
+    merged box is not much larger than the two separately, so many small
+    balloons cost one forward pass instead of several.
+    """
+    if not mask.any():
+        return []
+    h, w = mask.shape
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (CLUSTER_GAP, CLUSTER_GAP))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(
+        cv2.dilate(mask, kernel), connectivity=8
+    )
+
+    boxes = []
+    for label in range(1, count):
+        x, y, bw, bh = stats[label, :4]
+        boxes.append(
+            (
+                max(0, x - CROP_CONTEXT),
+                max(0, y - CROP_CONTEXT),
+                min(w, x + bw + CROP_CONTEXT),
+                min(h, y + bh + CROP_CONTEXT),
+            )
+        )
+
+    merged = True
+    while merged and len(boxes) > 1:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                union = _union(boxes[i], boxes[j])
+                if _area(union) <= MERGE_AREA_SLACK * (_area(boxes[i]) + _area(boxes[j])):
+                    boxes[i] = union
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
 
-        return result
+    aligned = []
+    for x1, y1, x2, y2 in boxes:
+        x1, x2 = _align_span(x1, x2, w)
+        y1, y2 = _align_span(y1, y2, h)
+        aligned.append((x1, y1, x2, y2))
+    return aligned
@@ -1,35 +1,165 @@
 import asyncio
 
+import cv2
 import numpy as np
 import structlog
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
-from app.schemas.pipeline import OcrResult
+from app.pipeline.regions import OcrResult, RegionTable
 
 logger = structlog.get_logger()
 
 # Minimum confidence to accept OCR result
 MIN_CONFIDENCE = 0.3
 
+# Input height of PaddleOCR's recognizer (rec_image_shape 3,48,320)
+REC_IMAGE_HEIGHT = 48
+
+# Lines with height/width at or above this are vertical columns; PaddleOCR
+# rotates these by 90 degrees before recognition (get_rotate_crop_image)
+VERTICAL_LINE_RATIO = 1.5
+
+# Gaps narrower than this fraction of the widest line are inside a line
+LINE_GAP_FRACTION = 0.25
+
+LINE_PADDING = 2
+
 # Module-level singleton for model preloading
 _shared_ocr_instance = None
 
 
+def create_ocr_model():
+    """Load a PaddleOCR instance in this process."""
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(
+        use_angle_cls=True,
+        lang="japan",
+        use_gpu=False,
+        show_log=False,
+        rec_batch_num=settings.ocr_rec_batch_size,
+    )
+
+
 def get_shared_ocr():
-    """Get or create the shared PaddleOCR instance."""
+    """Get or create the shared PaddleOCR instance.
+
+    When ``MODEL_SERVER_SOCKET`` is set, this is a proxy to the model server.
+    """
     global _shared_ocr_instance
     if _shared_ocr_instance is None:
-        from paddleocr import PaddleOCR
+        if settings.model_server_socket:
+            from app.services.model_client import RemoteOcr, get_model_client
 
-        _shared_ocr_instance = PaddleOCR(
-            use_angle_cls=True,
-            lang="japan",
-            use_gpu=False,
-            show_log=False,
-        )
+            _shared_ocr_instance = RemoteOcr(get_model_client())
+        else:
+            _shared_ocr_instance = create_ocr_model()
     return _shared_ocr_instance
 
 
+def supports_batch_recognition(ocr) -> bool:
+    """Whether ``ocr`` exposes the recognizer without the detection chain."""
+    return hasattr(ocr, "recognize") or hasattr(ocr, "text_recognizer")
+
+
+def recognize_lines(
+    ocr, lines: list[np.ndarray], needs_cls: list[bool]
+) -> list[tuple[str, float]]:
+    """Run angle classification (where flagged) and batched recognition.
+
+    ``ocr`` is a PaddleOCR instance or a model-server proxy with ``recognize``.
+    """
+    if hasattr(ocr, "recognize"):
+        return ocr.recognize(lines, needs_cls)
+    if not lines:
+        return []
+
+    lines = list(lines)
+    cls_indices = [i for i, flag in enumerate(needs_cls) if flag]
+    classifier = getattr(ocr, "text_classifier", None)
+    if cls_indices and classifier is not None:
+        # Flips lines detected as upside down; returns them in input order
+        fixed, _, _ = classifier([lines[i] for i in cls_indices])
+        for i, line in zip(cls_indices, fixed):
+            lines[i] = line
+
+    rec_res, _ = ocr.text_recognizer(lines)
+    return [(str(text), float(score)) for text, score in rec_res]
+
+
+def _ink_runs(profile: np.ndarray) -> list[tuple[int, int]]:
+    """Return [start, end) runs where ``profile`` is non-zero, merging small gaps."""
+    ink = np.concatenate(([False], profile > 0, [False]))
+    edges = np.flatnonzero(ink[1:] != ink[:-1])
+    runs = list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+    if len(runs) < 2:
+        return runs
+
+    # Radicals and punctuation leave small gaps inside one line
+    min_gap = LINE_GAP_FRACTION * max(end - start for start, end in runs)
+    merged = [runs[0]]
+    for start, end in runs[1:]:
+        if start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _normalize_line(line: np.ndarray) -> np.ndarray:
+    h, w = line.shape[:2]
+    width = max(1, round(w * REC_IMAGE_HEIGHT / h))
+    interpolation = cv2.INTER_AREA if h > REC_IMAGE_HEIGHT else cv2.INTER_LINEAR
+    return cv2.resize(line, (width, REC_IMAGE_HEIGHT), interpolation=interpolation)
+
+
+def split_text_lines(crop: np.ndarray) -> list[tuple[np.ndarray, bool]]:
+    """Split a text region crop into single lines for the recognizer.
+
+    Vertical text is split into columns (right to left) and each column is
+    rotated so it reads horizontally; otherwise the crop is split into rows.
+    Lines are resized to the recognizer's input height. Returns
+    (line image, rotated) pairs; rotated lines may be upside down and need
+    angle classification.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    ink = binary > 0
+    if not ink.any():
+        return []
+
+    def trimmed(x1: int, x2: int, y1: int, y2: int, axis: int) -> tuple[int, int, int, int]:
+        # Trim the cross axis of one line to its ink extent
+        if axis == 0:
+            rows = np.flatnonzero(ink[y1:y2, x1:x2].any(axis=1))
+            return x1, x2, y1 + rows[0], y1 + rows[-1] + 1
+        cols = np.flatnonzero(ink[y1:y2, x1:x2].any(axis=0))
+        return x1 + cols[0], x1 + cols[-1] + 1, y1, y2
+
+    h, w = ink.shape
+    columns = [trimmed(x1, x2, 0, h, 0) for x1, x2 in _ink_runs(ink.sum(axis=0))]
+    ratios = [(y2 - y1) / max(1, x2 - x1) for x1, x2, y1, y2 in columns]
+    vertical = bool(ratios) and float(np.mean(ratios)) >= VERTICAL_LINE_RATIO
+
+    if vertical:
+        boxes = columns[::-1]  # Japanese columns read right to left
+    else:
+        boxes = [trimmed(0, w, y1, y2, 1) for y1, y2 in _ink_runs(ink.sum(axis=1))]
+
+    lines = []
+    for x1, x2, y1, y2 in boxes:
+        x1, y1 = max(0, x1 - LINE_PADDING), max(0, y1 - LINE_PADDING)
+        x2, y2 = min(w, x2 + LINE_PADDING), min(h, y2 + LINE_PADDING)
+        line = crop[y1:y2, x1:x2]
+        if line.ndim == 2:
+            line = cv2.cvtColor(line, cv2.COLOR_GRAY2BGR)
+        if vertical:
+            line = np.rot90(line)
+        lines.append((_normalize_line(np.ascontiguousarray(line)), vertical))
+    return lines
+
+
 class OcrEngine(PipelineStage):
     """STAGE 2: OCR using PaddleOCR.
 
@@ -37,6 +167,8 @@ class OcrEngine(PipelineStage):
     """
 
     name = "ocr_engine"
+    reads = frozenset({"preprocessed_image", "regions"})
+    writes = frozenset({"ocr_results"})
 
     def __init__(self):
         self._ocr = None
@@ -64,23 +196,79 @@ class OcrEngine(PipelineStage):
         )
         return ctx
 
-    def _run_ocr(self, img: np.ndarray, regions) -> list[OcrResult]:
+    def _run_ocr(self, img: np.ndarray, regions: RegionTable) -> list[OcrResult]:
         ocr = self._get_ocr()
+        if settings.ocr_batch_recognition and supports_batch_recognition(ocr):
+            try:
+                return self._run_batched(ocr, img, regions)
+            except Exception as e:
+                logger.warning("ocr_engine.batch_recognition_failed", error=str(e))
+
+        return self._run_per_region(ocr, img, regions)
+
+    @staticmethod
+    def _clip_bbox(img: np.ndarray, bbox) -> tuple[int, int, int, int] | None:
+        x1, y1, x2, y2 = bbox
+        h, w = img.shape[:2]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        if x2 - x1 < 5 or y2 - y1 < 5:
+            return None
+        return x1, y1, x2, y2
+
+    def _run_batched(self, ocr, img: np.ndarray, regions: RegionTable) -> list[OcrResult]:
+        """Recognition-only path: every line of the page in one batched call."""
+        lines: list[np.ndarray] = []
+        needs_cls: list[bool] = []
+        owners: list[int] = []
+        for idx, region_bbox in enumerate(regions.bboxes.tolist()):
+            bbox = self._clip_bbox(img, region_bbox)
+            if bbox is None:
+                continue
+            x1, y1, x2, y2 = bbox
+            for line, rotated in split_text_lines(img[y1:y2, x1:x2]):
+                lines.append(line)
+                needs_cls.append(rotated)
+                owners.append(idx)
+
+        recognized = recognize_lines(ocr, lines, needs_cls)
+
+        texts: list[list[str]] = [[] for _ in range(len(regions))]
+        confidences: list[list[float]] = [[] for _ in range(len(regions))]
+        for idx, (text, conf) in zip(owners, recognized):
+            if text and conf >= MIN_CONFIDENCE:
+                texts[idx].append(text)
+                confidences[idx].append(conf)
+
+        logger.debug(
+            "ocr_engine.batch_recognized",
+            lines=len(lines),
+            classified=sum(needs_cls),
+        )
+        return [
+            OcrResult(
+                region_id=region_id,
+                text="\n".join(texts[idx]),
+                confidence=float(np.mean(confidences[idx])) if confidences[idx] else 0.0,
+                language="ja",
+            )
+            for idx, region_id in enumerate(regions.ids.tolist())
+        ]
+
+    def _run_per_region(self, ocr, img: np.ndarray, regions: RegionTable) -> list[OcrResult]:
+        """Full det+cls+rec chain on each region crop."""
         results = []
 
-        for region in regions:
-            x1, y1, x2, y2 = region.bbox
+        for region_id, region_bbox in zip(regions.ids.tolist(), regions.bboxes.tolist()):
             # Ensure valid crop coordinates
-            h, w = img.shape[:2]
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(w, x2), min(h, y2)
-
-            if x2 - x1 < 5 or y2 - y1 < 5:
+            bbox = self._clip_bbox(img, region_bbox)
+            if bbox is None:
                 results.append(
-                    OcrResult(region_id=region.id, text="", confidence=0.0)
+                    OcrResult(region_id=region_id, text="", confidence=0.0)
                 )
                 continue
 
+            x1, y1, x2, y2 = bbox
             cropped = img[y1:y2, x1:x2]
 
             try:
@@ -88,11 +276,11 @@ class OcrEngine(PipelineStage):
             except Exception as e:
                 logger.warning(
                     "ocr_engine.ocr_failed",
-                    region_id=region.id,
+                    region_id=region_id,
                     error=str(e),
                 )
                 results.append(
-                    OcrResult(region_id=region.id, text="", confidence=0.0)
+                    OcrResult(region_id=region_id, text="", confidence=0.0)
                 )
                 continue
 
@@ -115,7 +303,7 @@ class OcrEngine(PipelineStage):
 
             results.append(
                 OcrResult(
-                    region_id=region.id,
+                    region_id=region_id,
                     text=full_text,
                     confidence=avg_confidence,
                     language="ja",
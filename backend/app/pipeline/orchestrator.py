@@ -1,71 +1,154 @@
+import asyncio
 import time
 
 import structlog
 from sqlalchemy import select
 
 from app.models.job import Job
-from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.base import IMAGE_FIELDS, PipelineContext, PipelineStage
 from app.services.cost_tracker import CostTracker
 
 logger = structlog.get_logger()
 
 
 class PipelineOrchestrator:
-    """Runs pipeline stages sequentially with timing, cost tracking, and error handling."""
-
-    def __init__(self, stages: list[PipelineStage], cost_tracker: CostTracker):
+    """Runs pipeline stages as a dependency graph with timing, cost tracking, and error handling.
+
+    Dependencies are derived from each stage's declared ``reads``/``writes``,
+    using the list order to resolve conflicts, so the output matches a
+    sequential run while independent stages (e.g. inpainting and the
+    OpenAI round trip) overlap. Image buffers and derived views are released
+    as soon as every stage that reads them has finished.
+    """
+
+    def __init__(
+        self,
+        stages: list[PipelineStage],
+        cost_tracker: CostTracker,
+        report_progress: bool = True,
+        release_buffers: bool = True,
+    ):
         self.stages = stages
         self.cost_tracker = cost_tracker
+        # Chapter pages share one job row; they report progress per page instead
+        self.report_progress = report_progress
+        self.release_buffers = release_buffers
+        # AsyncSession does not allow concurrent operations
+        self._db_lock = asyncio.Lock()
+
+    def build_dependencies(self) -> list[set[int]]:
+        """Return, for each stage, the indices of earlier stages it must wait for.
+
+        A stage waits for the last earlier writer of every field it reads or
+        writes, and for every earlier reader of a field it overwrites.
+        """
+        dependencies: list[set[int]] = []
+        last_writer: dict[str, int] = {}
+        readers_since_write: dict[str, list[int]] = {}
+        barrier: int | None = None
+
+        for idx, stage in enumerate(self.stages):
+            if not stage.reads and not stage.writes:
+                # Undeclared stage: wait for everything before, block everything after
+                dependencies.append(set(range(idx)))
+                barrier = idx
+                last_writer.clear()
+                readers_since_write.clear()
+                continue
+
+            deps: set[int] = set() if barrier is None else {barrier}
+            for field_name in stage.reads | stage.writes:
+                if field_name in last_writer:
+                    deps.add(last_writer[field_name])
+            for field_name in stage.writes:
+                deps.update(readers_since_write.get(field_name, []))
+
+            for field_name in stage.reads:
+                readers_since_write.setdefault(field_name, []).append(idx)
+            for field_name in stage.writes:
+                last_writer[field_name] = idx
+                readers_since_write[field_name] = []
+
+            deps.discard(idx)
+            dependencies.append(deps)
+
+        return dependencies
+
+    def buffer_readers(self) -> dict[str, set[int]]:
+        """Return, for each releasable buffer, the indices of stages that read it.
+
+        Undeclared (barrier) stages may read anything, so they count as
+        readers of every buffer. Buffers no stage reads are pipeline outputs
+        and are never released.
+        """
+        buffers = set(IMAGE_FIELDS)
+        for stage in self.stages:
+            buffers.update(f for f in stage.reads if f.startswith("derived."))
+
+        barriers = {
+            idx for idx, stage in enumerate(self.stages) if not stage.reads and not stage.writes
+        }
+        readers: dict[str, set[int]] = {}
+        for buffer in buffers:
+            reading = {idx for idx, stage in enumerate(self.stages) if buffer in stage.reads}
+            if reading:
+                readers[buffer] = reading | barriers
+        return readers
 
     async def _update_current_stage(self, stage_name: str) -> None:
         """Update the job's current_stage in the database for progress tracking."""
         try:
-            result = await self.cost_tracker.db.execute(
-                select(Job).where(Job.id == self.cost_tracker.job_id)
-            )
-            job = result.scalar_one()
-            job.current_stage = stage_name
-            await self.cost_tracker.db.flush()
+            async with self._db_lock:
+                result = await self.cost_tracker.db.execute(
+                    select(Job).where(Job.id == self.cost_tracker.job_id)
+                )
+                job = result.scalar_one()
+                job.current_stage = stage_name
+                await self.cost_tracker.db.flush()
         except Exception as e:
             logger.warning("orchestrator.stage_update_failed", error=str(e))
 
-    async def run(self, ctx: PipelineContext) -> PipelineContext:
-        total_start = time.monotonic()
-
-        for stage in self.stages:
-            stage_start = time.monotonic()
+    async def _run_stage(self, stage: PipelineStage, ctx: PipelineContext) -> None:
+        stage_start = time.monotonic()
 
-            # Update current stage for progress reporting
+        # Update current stage for progress reporting
+        if self.report_progress:
             await self._update_current_stage(stage.name)
 
-            logger.info(
-                "pipeline.stage.start",
-                stage=stage.name,
-                job_id=str(ctx.job_id),
-            )
+        logger.info(
+            "pipeline.stage.start",
+            stage=stage.name,
+            job_id=str(ctx.job_id),
+        )
 
-            try:
-                ctx = await stage.process(ctx)
-                duration_ms = int((time.monotonic() - stage_start) * 1000)
-                cost = ctx.metadata.get(f"{stage.name}_cost_krw", 0.0)
-                tokens = ctx.metadata.get(f"{stage.name}_tokens", None)
+        try:
+            # Stages share one context, so the returned object is ctx itself
+            await stage.process(ctx)
+            duration_ms = int((time.monotonic() - stage_start) * 1000)
+            cost = ctx.metadata.get(f"{stage.name}_cost_krw", 0.0)
+            tokens = ctx.metadata.get(f"{stage.name}_tokens", None)
 
+            async with self._db_lock:
                 await self.cost_tracker.record_stage(
                     stage=stage.name,
                     duration_ms=duration_ms,
                     cost_krw=cost,
                     tokens=tokens,
+                    details=ctx.metadata.get(f"{stage.name}_details"),
+                    saved_krw=ctx.metadata.get(f"{stage.name}_saved_krw", 0.0),
+                    tokens_saved=ctx.metadata.get(f"{stage.name}_tokens_saved"),
                 )
-                logger.info(
-                    "pipeline.stage.complete",
-                    stage=stage.name,
-                    duration_ms=duration_ms,
-                    cost_krw=cost,
-                    job_id=str(ctx.job_id),
-                )
+            logger.info(
+                "pipeline.stage.complete",
+                stage=stage.name,
+                duration_ms=duration_ms,
+                cost_krw=cost,
+                job_id=str(ctx.job_id),
+            )
 
-            except Exception as e:
-                duration_ms = int((time.monotonic() - stage_start) * 1000)
+        except Exception as e:
+            duration_ms = int((time.monotonic() - stage_start) * 1000)
+            async with self._db_lock:
                 await self.cost_tracker.record_stage(
                     stage=stage.name,
                     duration_ms=duration_ms,
@@ -74,16 +157,51 @@ class PipelineOrchestrator:
                     failure_type=type(e).__name__,
                     details=str(e)[:500],
                 )
-                logger.error(
-                    "pipeline.stage.failed",
-                    stage=stage.name,
-                    error=str(e),
-                    job_id=str(ctx.job_id),
+            logger.error(
+                "pipeline.stage.failed",
+                stage=stage.name,
+                error=str(e),
+                job_id=str(ctx.job_id),
+            )
+            raise
+
+    async def run(self, ctx: PipelineContext) -> PipelineContext:
+        total_start = time.monotonic()
+
+        dependencies = self.build_dependencies()
+        readers = self.buffer_readers() if self.release_buffers else {}
+        waiting = dict(enumerate(dependencies))
+        done: set[int] = set()
+        running: dict[asyncio.Task, int] = {}
+
+        try:
+            while waiting or running:
+                # Start every stage whose dependencies have completed, in list order
+                for idx in [i for i, deps in waiting.items() if deps <= done]:
+                    del waiting[idx]
+                    task = asyncio.create_task(self._run_stage(self.stages[idx], ctx))
+                    running[task] = idx
+
+                finished, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
                 )
-                raise
+                for task in finished:
+                    idx = running.pop(task)
+                    task.result()  # re-raises the stage failure
+                    done.add(idx)
+                    for buffer, reading in readers.items():
+                        if idx in reading and reading <= done:
+                            ctx.release(buffer)
+        finally:
+            # On failure, stop stages that are still in flight
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
 
         total_ms = int((time.monotonic() - total_start) * 1000)
-        await self.cost_tracker.finalize(total_ms)
+        async with self._db_lock:
+            await self.cost_tracker.finalize(total_ms)
 
         logger.info(
             "pipeline.complete",
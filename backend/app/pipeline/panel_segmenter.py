@@ -0,0 +1,178 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+from app.pipeline.base import Panel, PipelineContext, PipelineStage
+from app.pipeline.pyramid import box_to_full, detection_scale
+from app.pipeline.regions import NO_PANEL
+from app.pipeline.webtoon import is_webtoon
+
+logger = structlog.get_logger()
+
+Box = tuple[int, int, int, int]
+
+# Pixels darker than this count as ink (borders, art, screentone)
+INK_THRESHOLD = 200
+# Rows/columns with at most this share of ink are gutter
+GUTTER_MAX_INK = 0.01
+# Gutters narrower than this (detection-level px) do not separate panels
+MIN_GUTTER = 3
+# Pieces narrower than this share of the page width are not split off
+MIN_PANEL_FRACTION = 0.08
+MAX_DEPTH = 8
+
+_panel_pool: ThreadPoolExecutor | None = None
+
+
+def get_panel_pool() -> ThreadPoolExecutor:
+    """Shared pool for processing the panels of a page in parallel."""
+    global _panel_pool
+    if _panel_pool is None:
+        _panel_pool = ThreadPoolExecutor(
+            max_workers=settings.panel_threads, thread_name_prefix="panels"
+        )
+    return _panel_pool
+
+
+def _content_spans(profile: np.ndarray, min_size: int) -> list[tuple[int, int]]:
+    """Spans of ``profile`` between gutters, with undersized spans merged into a neighbour."""
+    ink = profile > GUTTER_MAX_INK
+    # Run boundaries of the ink/gutter sequence
+    edges = np.flatnonzero(np.diff(ink.astype(np.int8))) + 1
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [len(ink)]))
+
+    spans: list[list[int]] = []
+    gap = 0
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if not ink[start]:
+            gap = end - start
+            continue
+        if spans and gap < MIN_GUTTER:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    # Merge spans too small to be a panel (sound effects, captions in a gutter)
+    merged: list[list[int]] = []
+    for span in spans:
+        if merged and (span[1] - span[0] < min_size or merged[-1][1] - merged[-1][0] < min_size):
+            merged[-1][1] = span[1]
+        else:
+            merged.append(span)
+    return [(start, end) for start, end in merged]
+
+
+def xy_cut(ink: np.ndarray, min_size: int, rtl: bool = True) -> list[Box]:
+    """Recursive XY-cut of a binary ink mask into panel boxes, in reading order.
+
+    Each level trims blank margins, then splits at full-width gutters into
+    tiers (top to bottom) or, failing that, at full-height gutters into
+    columns (right to left when ``rtl``).
+    """
+
+    def cut(box: Box, depth: int) -> list[Box]:
+        x1, y1, x2, y2 = box
+        sub = ink[y1:y2, x1:x2]
+        rows = sub.mean(axis=1)
+        cols = sub.mean(axis=0)
+        inked_rows = np.flatnonzero(rows > GUTTER_MAX_INK)
+        inked_cols = np.flatnonzero(cols > GUTTER_MAX_INK)
+        if len(inked_rows) == 0 or len(inked_cols) == 0:
+            return []
+        # Trim to the inked area
+        ty1, ty2 = int(inked_rows[0]), int(inked_rows[-1]) + 1
+        tx1, tx2 = int(inked_cols[0]), int(inked_cols[-1]) + 1
+        box = (x1 + tx1, y1 + ty1, x1 + tx2, y1 + ty2)
+        if depth >= MAX_DEPTH:
+            return [box]
+        x1, y1, x2, y2 = box
+        sub = ink[y1:y2, x1:x2]
+
+        tiers = _content_spans(sub.mean(axis=1), min_size)
+        if len(tiers) > 1:
+            return [p for s, e in tiers for p in cut((x1, y1 + s, x2, y1 + e), depth + 1)]
+        columns = _content_spans(sub.mean(axis=0), min_size)
+        if len(columns) > 1:
+            if rtl:
+                columns.reverse()
+            return [p for s, e in columns for p in cut((x1 + s, y1, x1 + e, y2), depth + 1)]
+        return [box]
+
+    h, w = ink.shape
+    return cut((0, 0, w, h), 0)
+
+
+class PanelSegmenter(PipelineStage):
+    """GAP-P: Split the page into panels and order regions panel by panel.
+
+    Panels come from an XY-cut on gutters of the detection-resolution
+    image. Each region joins the panel it overlaps most (or the nearest
+    one), and regions are renumbered in reading order: panels first, then
+    right-to-left, top-to-bottom inside a panel. Later stages can use
+    ``RegionTable.panel_groups()`` as independent units of work.
+    """
+
+    name = "panel_segmenter"
+    reads = frozenset({"preprocessed_image", "derived.detect_gray", "regions"})
+    writes = frozenset({"regions", "panels"})
+
+    async def process(self, ctx: PipelineContext) -> PipelineContext:
+        if ctx.preprocessed_image is None:
+            raise ValueError("No preprocessed image")
+        if not settings.panel_segmentation:
+            return ctx
+
+        loop = asyncio.get_event_loop()
+        gray = await loop.run_in_executor(None, ctx.derived, "detect_gray")
+        await loop.run_in_executor(None, self._segment, ctx, gray)
+
+        ctx.metadata["panel_segmenter_details"] = json.dumps({"panels": len(ctx.panels)})
+        logger.info(
+            "panel_segmenter.completed",
+            panels=len(ctx.panels),
+            regions=len(ctx.regions),
+            job_id=str(ctx.job_id),
+        )
+        return ctx
+
+    def _segment(self, ctx: PipelineContext, gray: np.ndarray) -> None:
+        shape = ctx.preprocessed_image.shape
+        scale = detection_scale(shape)
+        webtoon = is_webtoon(shape)
+
+        min_size = max(1, int(gray.shape[1] * MIN_PANEL_FRACTION))
+        boxes = xy_cut(gray < INK_THRESHOLD, min_size)
+        ctx.panels = [
+            Panel(id=idx, bbox=box_to_full(box, scale, shape)) for idx, box in enumerate(boxes)
+        ]
+        if ctx.regions:
+            ctx.regions = ctx.regions.ordered_by_panel(
+                assign_panels(ctx.regions.bboxes, [p.bbox for p in ctx.panels]),
+                webtoon=webtoon,
+            )
+
+
+def assign_panels(bboxes: np.ndarray, panels: list[Box]) -> np.ndarray:
+    """Index of the panel each box overlaps most, or else the nearest panel."""
+    if not panels:
+        return np.full(len(bboxes), NO_PANEL, dtype=np.int32)
+    b = np.asarray(bboxes, dtype=np.int64).reshape(-1, 1, 4)
+    p = np.asarray(panels, dtype=np.int64).reshape(1, -1, 4)
+    iw = np.minimum(b[..., 2], p[..., 2]) - np.maximum(b[..., 0], p[..., 0])
+    ih = np.minimum(b[..., 3], p[..., 3]) - np.maximum(b[..., 1], p[..., 1])
+    overlap = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+
+    # Distance from the box centre to each panel, for boxes outside all panels
+    cx = (b[..., 0] + b[..., 2]) / 2
+    cy = (b[..., 1] + b[..., 3]) / 2
+    dx = np.maximum(0, np.maximum(p[..., 0] - cx, cx - p[..., 2]))
+    dy = np.maximum(0, np.maximum(p[..., 1] - cy, cy - p[..., 3]))
+    nearest = np.argmin(dx * dx + dy * dy, axis=1)
+
+    best = np.argmax(overlap, axis=1)
+    inside = overlap.max(axis=1) > 0
+    return np.where(inside, best, nearest).astype(np.int32)
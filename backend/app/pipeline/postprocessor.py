@@ -10,6 +10,8 @@ class Postprocessor(PipelineStage):
     """POST: Encode final image and gather pipeline stats."""
 
     name = "postprocessor"
+    reads = frozenset({"result_image", "regions", "ocr_results", "translations"})
+    writes = frozenset({"metadata.result_bytes", "metadata.stats"})
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         if ctx.result_image is None:
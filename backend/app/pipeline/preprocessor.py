@@ -1,21 +1,29 @@
 import asyncio
+import math
 
 import cv2
 import numpy as np
 import structlog
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.pyramid import font_scale
 
 logger = structlog.get_logger()
 
-MAX_WIDTH = 2000
-MAX_HEIGHT = 3000
-
 
 class Preprocessor(PipelineStage):
-    """PRE: Normalize input image — resize, convert color space."""
+    """PRE: Normalize input image — convert color space, cap the pixel count.
+
+    The page keeps its native resolution (detection works on a downscaled
+    copy, see ``app.pipeline.pyramid``); only uploads above
+    ``max_image_pixels`` are shrunk. ``metadata.font_scale`` records how much
+    larger than the reference page it is, for sizing the translated text.
+    """
 
     name = "preprocessor"
+    reads = frozenset({"original_image"})
+    writes = frozenset({"preprocessed_image", "metadata.font_scale"})
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         img = ctx.original_image
@@ -26,6 +34,7 @@ class Preprocessor(PipelineStage):
             None, self._normalize, img
         )
         ctx.preprocessed_image = img
+        ctx.metadata["font_scale"] = font_scale(img.shape)
         return ctx
 
     def _normalize(self, img: np.ndarray) -> np.ndarray:
@@ -42,9 +51,9 @@ class Preprocessor(PipelineStage):
 
         h, w = img.shape[:2]
 
-        # Resize if too large (preserve aspect ratio)
-        if w > MAX_WIDTH or h > MAX_HEIGHT:
-            scale = min(MAX_WIDTH / w, MAX_HEIGHT / h)
+        # Resize only if too large to hold in memory (preserve aspect ratio)
+        scale = min(1.0, math.sqrt(settings.max_image_pixels / (w * h)))
+        if scale < 1.0:
             new_w = int(w * scale)
             new_h = int(h * scale)
             img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
@@ -0,0 +1,74 @@
+"""Working resolutions of a page.
+
+``preprocessed_image`` is the page at native resolution; OCR, inpainting
+and typesetting use it directly and regions are stored in its coordinates.
+Detection and balloon parsing only need the layout, so they run on a copy
+scaled down to about ``DETECTION_MAX_SIDE`` pixels (``derived("detect_gray")``)
+and scale their boxes back up.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.pipeline.webtoon import is_webtoon
+
+# Page size the layout font range (12-40 px) was tuned for
+REFERENCE_WIDTH = 2000
+REFERENCE_HEIGHT = 3000
+
+Box = tuple[int, int, int, int]
+
+
+def detection_scale(shape: tuple[int, ...]) -> float:
+    """Factor from full resolution to the detection level (<= 1).
+
+    Pages are fitted by their longest side; webtoon strips by their width,
+    since their height is handled by sliced detection.
+    """
+    h, w = shape[:2]
+    side = w if is_webtoon(shape) else max(h, w)
+    return min(1.0, settings.detection_max_side / side)
+
+
+def font_scale(shape: tuple[int, ...]) -> float:
+    """How much larger than the reference page this one is (>= 1)."""
+    h, w = shape[:2]
+    if is_webtoon(shape):
+        return max(1.0, w / REFERENCE_WIDTH)
+    return max(1.0, w / REFERENCE_WIDTH, h / REFERENCE_HEIGHT)
+
+
+def downscale(img: np.ndarray, scale: float) -> np.ndarray:
+    if scale >= 1.0:
+        return img
+    h, w = img.shape[:2]
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def box_to_full(box: Box, scale: float, shape: tuple[int, ...]) -> Box:
+    """Map a detection-level box to full resolution, rounding outwards."""
+    if scale >= 1.0:
+        return box
+    h, w = shape[:2]
+    x1, y1, x2, y2 = box
+    return (
+        max(0, math.floor(x1 / scale)),
+        max(0, math.floor(y1 / scale)),
+        min(w, math.ceil(x2 / scale)),
+        min(h, math.ceil(y2 / scale)),
+    )
+
+
+def boxes_to_full(boxes: np.ndarray, scale: float, shape: tuple[int, ...]) -> np.ndarray:
+    """``box_to_full`` for an ``(N, 4)`` array of boxes."""
+    if scale >= 1.0:
+        return boxes
+    h, w = shape[:2]
+    full = np.empty_like(boxes)
+    full[:, :2] = np.floor(boxes[:, :2] / scale)
+    full[:, 2:] = np.ceil(boxes[:, 2:] / scale)
+    return np.clip(full, 0, [w, h, w, h])
@@ -0,0 +1,201 @@
+"""In-pipeline region data.
+
+Stages exchange regions as one ``RegionTable`` per page (a NumPy structured
+array, one row per region) and per-region text as slotted dataclasses, so
+the hot loops neither validate nor allocate a model per region. The Pydantic
+models in ``app.schemas.pipeline`` are the external form; convert with
+``RegionTable.to_models()``/``from_models()`` and ``model_validate()``.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.schemas.pipeline import DetectedRegion
+
+# balloon_id of a region outside any balloon
+NO_BALLOON = -1
+# panel_id of a region on an unsegmented page
+NO_PANEL = -1
+
+REGION_DTYPE = np.dtype(
+    [
+        ("id", np.int32),
+        ("bbox", np.int32, (4,)),  # (x1, y1, x2, y2)
+        ("region_type", "U10"),  # dialogue | narration | sfx
+        ("confidence", np.float64),
+        ("reading_order", np.int32),
+        ("balloon_id", np.int32),  # index into PipelineContext.balloons
+        ("balloon_bbox", np.int32, (4,)),  # valid where balloon_id != NO_BALLOON
+        ("panel_id", np.int32),  # index into PipelineContext.panels
+    ]
+)
+
+
+def reading_order(bboxes: np.ndarray, webtoon: bool = False, groups=None) -> np.ndarray:
+    """Row order in which ``bboxes`` are read.
+
+    Pages read right-to-left, then top-to-bottom (RTL manga); strips scroll
+    vertically, so top-to-bottom, then right-to-left. With ``groups`` (e.g.
+    panel ids, already numbered in reading order) boxes are ordered by
+    group first.
+    """
+    bboxes = np.asarray(bboxes).reshape(-1, 4)
+    x1, y1 = bboxes[:, 0], bboxes[:, 1]
+    keys = [-x1, y1] if webtoon else [y1, -x1]
+    if groups is not None:
+        keys.append(groups)
+    return np.lexsort(keys)
+
+
+class RegionTable:
+    """The detected text regions of one page, as columns.
+
+    Rows are in reading order. Column properties are views, so stages
+    update whole columns in place (``table.balloon_ids[matched] = ...``).
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: np.ndarray | None = None):
+        self.data = np.zeros(0, dtype=REGION_DTYPE) if data is None else data
+
+    @classmethod
+    def from_boxes(
+        cls, boxes, region_type: str = "dialogue", confidence: float = 0.8
+    ) -> "RegionTable":
+        """Regions for ``(N, 4)`` boxes already in reading order."""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        data = np.zeros(len(boxes), dtype=REGION_DTYPE)
+        data["id"] = np.arange(len(boxes))
+        data["reading_order"] = data["id"]
+        data["bbox"] = boxes
+        data["region_type"] = region_type
+        data["confidence"] = confidence
+        data["balloon_id"] = NO_BALLOON
+        data["panel_id"] = NO_PANEL
+        return cls(data)
+
+    @classmethod
+    def from_models(cls, regions: Iterable[DetectedRegion]) -> "RegionTable":
+        rows = [
+            (
+                r.id,
+                r.bbox,
+                r.region_type,
+                r.confidence,
+                r.reading_order,
+                NO_BALLOON if r.balloon_id is None else r.balloon_id,
+                r.balloon_bbox or (0, 0, 0, 0),
+                NO_PANEL if r.panel_id is None else r.panel_id,
+            )
+            for r in regions
+        ]
+        return cls(np.array(rows, dtype=REGION_DTYPE))
+
+    def to_models(self) -> list[DetectedRegion]:
+        columns = zip(
+            self.ids.tolist(),
+            self.bboxes.tolist(),
+            self.data["region_type"].tolist(),
+            self.confidences.tolist(),
+            self.reading_orders.tolist(),
+            self.balloon_ids.tolist(),
+            self.balloon_bboxes.tolist(),
+            self.panel_ids.tolist(),
+        )
+        return [
+            DetectedRegion(
+                id=rid,
+                bbox=tuple(bbox),
+                region_type=region_type,
+                confidence=confidence,
+                reading_order=order,
+                balloon_bbox=None if balloon_id == NO_BALLOON else tuple(balloon_bbox),
+                balloon_id=None if balloon_id == NO_BALLOON else balloon_id,
+                panel_id=None if panel_id == NO_PANEL else panel_id,
+            )
+            for (
+                rid, bbox, region_type, confidence, order, balloon_id, balloon_bbox, panel_id
+            ) in columns
+        ]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.data["id"]
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        return self.data["bbox"]
+
+    @property
+    def confidences(self) -> np.ndarray:
+        return self.data["confidence"]
+
+    @property
+    def reading_orders(self) -> np.ndarray:
+        return self.data["reading_order"]
+
+    @property
+    def balloon_ids(self) -> np.ndarray:
+        return self.data["balloon_id"]
+
+    @property
+    def balloon_bboxes(self) -> np.ndarray:
+        return self.data["balloon_bbox"]
+
+    @property
+    def panel_ids(self) -> np.ndarray:
+        return self.data["panel_id"]
+
+    def in_balloon(self) -> np.ndarray:
+        return self.balloon_ids != NO_BALLOON
+
+    def render_bboxes(self) -> np.ndarray:
+        """Balloon bbox where the region has one, otherwise its own bbox."""
+        return np.where(self.in_balloon()[:, None], self.balloon_bboxes, self.bboxes)
+
+    def ordered_by_panel(self, panel_ids: np.ndarray, webtoon: bool = False) -> "RegionTable":
+        """Copy with ``panel_id`` set and rows renumbered in reading order, panel by panel."""
+        data = self.data.copy()
+        data["panel_id"] = panel_ids
+        data = data[reading_order(data["bbox"], webtoon=webtoon, groups=data["panel_id"])]
+        data["id"] = np.arange(len(data))
+        data["reading_order"] = data["id"]
+        return RegionTable(data)
+
+    def panel_groups(self) -> list[np.ndarray]:
+        """Row indices of each panel's regions, panels in reading order.
+
+        An unsegmented page is one group. Groups touch disjoint rows, so
+        stages may process them concurrently.
+        """
+        panel_ids = self.panel_ids
+        used, first = np.unique(panel_ids, return_index=True)
+        return [np.flatnonzero(panel_ids == p) for p in used[np.argsort(first)].tolist()]
+
+
+@dataclass(slots=True)
+class OcrResult:
+    """OCR result for a single detected region."""
+
+    region_id: int
+    text: str
+    confidence: float = 0.0
+    language: str = "ja"
+
+
+@dataclass(slots=True)
+class MappedTranslation:
+    """A translated text mapped back to its region with rendering info."""
+
+    region_id: int
+    bbox: tuple[int, int, int, int]  # render target bbox
+    translated: str
+    font_size: int
+    lines: list[str] = field(default_factory=list)  # empty = typesetter lays out
+    balloon_info: dict = field(default_factory=dict)
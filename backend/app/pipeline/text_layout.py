@@ -0,0 +1,150 @@
+"""Fit translated text into a box using real font metrics.
+
+TranslationMapper picks the font size and line breaks with ``layout_text``
+and stores them on ``MappedTranslation``; Typesetter draws exactly those
+lines. Line widths come from the cached glyph advance tables, so wrapping a
+line is a bisect over prefix sums rather than re-measuring every prefix, and
+the largest fitting size is found by binary search over the size range.
+"""
+
+import bisect
+import itertools
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.pipeline.font_cache import GlyphMetrics, fallback_metrics, font_cache
+
+MIN_FONT_SIZE = 12
+MAX_FONT_SIZE = 40
+# Above MAX_FONT_SIZE (ranges widened by font_scale) only every
+# SCALED_SIZE_STEP-th size is tried, so pages of any scale share one small
+# set of cached fonts instead of each loading its own range
+SCALED_SIZE_STEP = 4
+# Largest font_scale whose sizes are preloaded at startup
+MAX_PRELOAD_FONT_SCALE = 3.0
+# Padding inside the text box
+TEXT_PADDING = 5
+# Line height multiplier
+LINE_HEIGHT_FACTOR = 1.3
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    font_size: int
+    lines: list[str]
+    fits: bool  # False when even the minimum size overflows the box
+
+    @property
+    def line_height(self) -> int:
+        return line_height(self.font_size)
+
+    @property
+    def height(self) -> int:
+        return len(self.lines) * self.line_height
+
+
+def line_height(font_size: int) -> int:
+    return int(font_size * LINE_HEIGHT_FACTOR)
+
+
+def candidate_sizes(min_size: int, max_size: int) -> list[int]:
+    """Font sizes in ``[min_size, max_size]`` that ``layout_text`` may pick.
+
+    Every size up to ``MAX_FONT_SIZE``, then every ``SCALED_SIZE_STEP``-th
+    one. A range with no such size yields its smallest size above
+    ``min_size`` on that grid (or ``min_size`` itself below it).
+    """
+    fine = range(min_size, min(max_size, MAX_FONT_SIZE) + 1)
+    # First grid size above MAX_FONT_SIZE that is at least min_size
+    steps = max(1, -(-(min_size - MAX_FONT_SIZE) // SCALED_SIZE_STEP))
+    first = MAX_FONT_SIZE + steps * SCALED_SIZE_STEP
+    coarse = range(first, max_size + 1, SCALED_SIZE_STEP)
+    return [*fine, *coarse] or [first if min_size > MAX_FONT_SIZE else min_size]
+
+
+def get_metrics(font_path: str, size: int) -> GlyphMetrics:
+    """Glyph metrics for the configured font, or the built-in fallback font."""
+    return font_cache.get_metrics(font_path, size) or fallback_metrics(size)
+
+
+def _wrap(
+    text: str, advances: Callable[[str], list[float]], max_width: float
+) -> list[tuple[str, float]]:
+    """Greedy character-level wrap; returns ``(line, width)`` pairs.
+
+    Korean text is wrapped at character level since Korean doesn't use spaces
+    as consistently as English. A line always takes at least one character,
+    so a glyph wider than ``max_width`` gets a line of its own.
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        if not paragraph:
+            continue
+        prefix = [0.0, *itertools.accumulate(advances(paragraph))]
+        start = 0
+        while start < len(paragraph):
+            end = bisect.bisect_right(prefix, prefix[start] + max_width) - 1
+            end = max(end, start + 1)
+            lines.append((paragraph[start:end], prefix[end] - prefix[start]))
+            start = end
+    return lines
+
+
+def wrap_lines(text: str, advances: Callable[[str], list[float]], max_width: float) -> list[str]:
+    return [line for line, _ in _wrap(text, advances, max_width)]
+
+
+def _layout_at(text: str, size: int, box_w: float, box_h: float, font_path: str) -> TextLayout:
+    wrapped = _wrap(text, get_metrics(font_path, size).advances, box_w)
+    fits = (
+        all(width <= box_w for _, width in wrapped)
+        and len(wrapped) * line_height(size) <= box_h
+    )
+    return TextLayout(size, [line for line, _ in wrapped], fits)
+
+
+def layout_text(
+    text: str,
+    box_w: float,
+    box_h: float,
+    font_path: str | None = None,
+    min_size: int = MIN_FONT_SIZE,
+    max_size: int = MAX_FONT_SIZE,
+) -> TextLayout:
+    """Largest of the ``candidate_sizes`` at which ``text`` fits.
+
+    ``box_w``/``box_h`` are the usable area (padding already removed). When
+    nothing fits, the smallest size's layout is returned with ``fits=False``.
+    """
+    font_path = font_path or settings.font_path
+    sizes = candidate_sizes(min_size, max(min_size, max_size))
+    best = None
+    lo, hi = 0, len(sizes) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        layout = _layout_at(text, sizes[mid], box_w, box_h, font_path)
+        if layout.fits:
+            best, lo = layout, mid + 1
+        else:
+            hi = mid - 1
+    return best or _layout_at(text, sizes[0], box_w, box_h, font_path)
+
+
+def layout_in_bbox(
+    text: str,
+    bbox: tuple[int, int, int, int],
+    font_path: str | None = None,
+    min_size: int = MIN_FONT_SIZE,
+    max_size: int = MAX_FONT_SIZE,
+) -> TextLayout:
+    """``layout_text`` for a render bbox, applying ``TEXT_PADDING`` on each side."""
+    x1, y1, x2, y2 = bbox
+    return layout_text(
+        text,
+        x2 - x1 - TEXT_PADDING * 2,
+        y2 - y1 - TEXT_PADDING * 2,
+        font_path=font_path,
+        min_size=min_size,
+        max_size=max_size,
+    )
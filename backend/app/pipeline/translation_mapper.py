@@ -1,59 +1,76 @@
-import math
+import asyncio
 
 import structlog
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
-from app.schemas.pipeline import MappedTranslation
+from app.pipeline.regions import MappedTranslation, RegionTable
+from app.pipeline.text_layout import MAX_FONT_SIZE, MIN_FONT_SIZE, TextLayout, layout_in_bbox
+from app.pipeline.translation_prep import response_id
 
 logger = structlog.get_logger()
 
-MIN_FONT_SIZE = 12
-MAX_FONT_SIZE = 40
-
 
 class TranslationMapper(PipelineStage):
-    """GAP-C: Map translated text back to regions with font size estimation."""
+    """GAP-C: Map translated text back to regions with font size estimation.
+
+    The font size range is widened by ``metadata.font_scale`` so text on a
+    high-resolution page is as large, relative to the page, as on a
+    reference-sized one. Layouts already made by an ``IncrementalMapper``
+    while the translation streamed in are reused.
+    """
 
     name = "translation_mapper"
+    reads = frozenset(
+        {
+            "regions",
+            "metadata.raw_translations",
+            "metadata.cached_translations",
+            "metadata.font_scale",
+            "metadata.premapped_translations",
+        }
+    )
+    writes = frozenset({"translations"})
+
+    def __init__(self, font_path: str | None = None):
+        self.font_path = font_path or settings.font_path
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         raw_translations = ctx.metadata.get("raw_translations", [])
+        cached_translations = ctx.metadata.get("cached_translations", [])
+        font_scale = ctx.metadata.get("font_scale", 1.0)
 
-        # Build lookup: region_id → translated text
+        # Build lookup: region_id → translated text (translation memory hits + fresh)
         translated_map: dict[int, str] = {}
-        for t in raw_translations:
-            tid = t.get("id")
+        for t in [*cached_translations, *raw_translations]:
+            tid = response_id(t.get("id"))
             text = t.get("text", "")
             if tid is not None and text:
                 translated_map[tid] = text
 
+        premapped = ctx.metadata.get("premapped_translations") or {}
+
         mapped = []
         skipped = 0
-        for region in ctx.regions:
-            translated_text = translated_map.get(region.id)
+        overflowed = 0
+        # Use balloon bbox if available, otherwise use region bbox
+        render_bboxes = ctx.regions.render_bboxes().tolist()
+        for region_id, bbox in zip(ctx.regions.ids.tolist(), render_bboxes):
+            translated_text = translated_map.get(region_id)
             if not translated_text:
                 skipped += 1
                 continue
 
-            # Use balloon bbox if available, otherwise use region bbox
-            bbox = region.balloon_bbox or region.bbox
-            bbox_w = bbox[2] - bbox[0]
-            bbox_h = bbox[3] - bbox[1]
-
-            # Estimate font size to fit text within bbox
-            font_size = self._estimate_font_size(
-                translated_text, bbox_w, bbox_h
-            )
-
-            mapped.append(
-                MappedTranslation(
-                    region_id=region.id,
-                    bbox=bbox,
-                    translated=translated_text,
-                    font_size=font_size,
-                    balloon_info={"width": bbox_w, "height": bbox_h},
-                )
-            )
+            bbox = tuple(bbox)
+            # Laid out while the response was still streaming, if available
+            done = premapped.get(region_id)
+            if done is not None and done[0].translated == translated_text and done[0].bbox == bbox:
+                translation, fits = done
+            else:
+                translation, fits = self.map_one(region_id, bbox, translated_text, font_scale)
+            if not fits:
+                overflowed += 1
+            mapped.append(translation)
 
         ctx.translations = mapped
 
@@ -67,37 +84,73 @@ class TranslationMapper(PipelineStage):
             total_regions=len(ctx.regions),
             mapped_count=len(mapped),
             skipped=skipped,
+            overflowed=overflowed,
             job_id=str(ctx.job_id),
         )
         return ctx
 
-    def _estimate_font_size(self, text: str, box_w: int, box_h: int) -> int:
-        """Estimate the largest font size that fits text within the box.
-
-        Uses a simple area-based heuristic: each character occupies
-        roughly font_size^2 pixels.
-        """
-        char_count = max(len(text.replace("\n", "")), 1)
-        # Usable area with padding
-        usable_w = box_w * 0.85
-        usable_h = box_h * 0.85
-        usable_area = usable_w * usable_h
-
-        # Approximate: each char needs font_size * (font_size * 0.6) pixels
-        # So total area ≈ char_count * font_size^2 * 0.6
-        font_size = int(math.sqrt(usable_area / (char_count * 0.6)))
-        font_size = max(MIN_FONT_SIZE, min(MAX_FONT_SIZE, font_size))
-
-        # Also check that characters per line is reasonable
-        chars_per_line = max(1, int(usable_w / (font_size * 0.6)))
-        lines_needed = math.ceil(char_count / chars_per_line)
-        total_text_height = lines_needed * font_size * 1.3
-
-        # If text overflows vertically, reduce font size
-        if total_text_height > usable_h:
-            font_size = max(
-                MIN_FONT_SIZE,
-                int(font_size * usable_h / total_text_height),
-            )
+    def map_one(
+        self, region_id: int, bbox: tuple[int, int, int, int], text: str, font_scale: float = 1.0
+    ) -> tuple[MappedTranslation, bool]:
+        """Lay out one translation in its bbox; False if it overflows even at the minimum size."""
+        # Largest font size (and its line breaks) that fits the bbox
+        layout = self._layout(text, bbox, font_scale)
+        translation = MappedTranslation(
+            region_id=region_id,
+            bbox=bbox,
+            translated=text,
+            font_size=layout.font_size,
+            lines=layout.lines,
+            balloon_info={"width": bbox[2] - bbox[0], "height": bbox[3] - bbox[1]},
+        )
+        return translation, layout.fits
+
+    def _layout(
+        self, text: str, bbox: tuple[int, int, int, int], font_scale: float = 1.0
+    ) -> TextLayout:
+        return layout_in_bbox(
+            text,
+            bbox,
+            font_path=self.font_path,
+            min_size=round(MIN_FONT_SIZE * font_scale),
+            max_size=round(MAX_FONT_SIZE * font_scale),
+        )
+
+
+class IncrementalMapper:
+    """Maps translations one at a time while a streamed response is still arriving.
+
+    ``add()`` starts the layout of each finished entry on the default
+    executor, and ``results()`` waits for the outstanding ones. The
+    translator stores the results as ``metadata.premapped_translations``,
+    so once the last entry arrives only the last few layouts are left.
+    """
+
+    def __init__(
+        self,
+        regions: RegionTable,
+        font_scale: float = 1.0,
+        mapper: TranslationMapper | None = None,
+    ):
+        self.mapper = mapper or TranslationMapper()
+        self.font_scale = font_scale
+        self._bboxes = dict(
+            zip(regions.ids.tolist(), map(tuple, regions.render_bboxes().tolist()))
+        )
+        self._futures: dict[int, asyncio.Future] = {}
+
+    def add(self, entry: dict) -> None:
+        region_id = entry.get("id")
+        text = entry.get("text")
+        bbox = self._bboxes.get(region_id) if isinstance(region_id, int) else None
+        if bbox is None or not isinstance(text, str) or not text:
+            return
+        self._futures[region_id] = asyncio.get_running_loop().run_in_executor(
+            None, self.mapper.map_one, region_id, bbox, text, self.font_scale
+        )
 
-        return font_size
+    async def results(self) -> dict[int, tuple[MappedTranslation, bool]]:
+        if not self._futures:
+            return {}
+        done = await asyncio.gather(*self._futures.values())
+        return dict(zip(self._futures, done))
@@ -2,10 +2,17 @@ import json
 
 import structlog
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
+from app.services.cost_tracker import estimate_tokens, token_cost_krw
+from app.services.translation_memory import translation_memory
 
 logger = structlog.get_logger()
 
+# Bump when SYSTEM_PROMPT or USER_PROMPT_TEMPLATE changes meaningfully;
+# translation memory entries from other versions are not reused.
+PROMPT_VERSION = "1"
+
 SYSTEM_PROMPT = """You are a professional Japanese-to-Korean manga translator.
 
 Rules:
@@ -25,11 +32,67 @@ Output ONLY a JSON object with a "translations" key containing an array.
 Each entry must have "id" (matching the input) and "text" (Korean translation):
 {{"translations": [{{"id": 0, "text": "한국어 번역"}}]}}"""
 
+# Several pages of a chapter in one request (see app.pipeline.chapter_batcher)
+CHAPTER_PROMPT_TEMPLATE = """Translate each text entry from Japanese to Korean.
+The entries come from consecutive pages of one chapter, in reading order.
+
+Input:
+{entries_json}
+
+Output ONLY a JSON object with a "translations" key containing an array.
+Each entry must have "page" and "id" (matching the input) and "text" (Korean translation):
+{{"translations": [{{"page": 0, "id": 0, "text": "한국어 번역"}}]}}"""
+
+
+def build_user_prompt(entries: list[dict]) -> str:
+    entries_json = json.dumps(entries, ensure_ascii=False, indent=2)
+    return USER_PROMPT_TEMPLATE.format(entries_json=entries_json)
+
+
+def response_id(value: object) -> int | None:
+    """An ``id``/``page`` from a model response as an int; numeric strings are accepted."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def chunk_entries(entries: list[dict], max_tokens: int) -> list[list[dict]]:
+    """Split entries, in reading order, into runs of at most ``max_tokens`` source tokens.
+
+    An entry larger than ``max_tokens`` gets a chunk of its own.
+    """
+    chunks: list[list[dict]] = []
+    chunk_tokens = 0
+    for entry in entries:
+        tokens = estimate_tokens(entry["text"])
+        if not chunks or chunk_tokens + tokens > max_tokens:
+            chunks.append([])
+            chunk_tokens = 0
+        chunks[-1].append(entry)
+        chunk_tokens += tokens
+    return chunks
+
 
 class TranslationPrep(PipelineStage):
     """GAP-B: Build structured translation prompt from OCR results."""
 
     name = "translation_prep"
+    reads = frozenset({"ocr_results"})
+    writes = frozenset(
+        {
+            "translation_prompt",
+            "metadata.translation_entries",
+            "metadata.translation_system_prompt",
+            "metadata.translation_entry_count",
+            "metadata.translation_sources",
+            "metadata.cached_translations",
+        }
+    )
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         entries = []
@@ -38,18 +101,26 @@ class TranslationPrep(PipelineStage):
             if text:
                 entries.append({"id": ocr.region_id, "text": text})
 
+        if entries and settings.translation_memory_enabled:
+            entries = await self._apply_translation_memory(ctx, entries)
+
+        # Source text per id, so the translator can store fresh results
+        ctx.metadata["translation_sources"] = {e["id"]: e["text"] for e in entries}
+
         if not entries:
-            logger.warning(
-                "translation_prep.no_text",
-                job_id=str(ctx.job_id),
-            )
+            if ctx.metadata.get("cached_translations"):
+                logger.info("translation_prep.all_cached", job_id=str(ctx.job_id))
+            else:
+                logger.warning(
+                    "translation_prep.no_text",
+                    job_id=str(ctx.job_id),
+                )
             ctx.translation_prompt = ""
             return ctx
 
-        entries_json = json.dumps(entries, ensure_ascii=False, indent=2)
-        user_prompt = USER_PROMPT_TEMPLATE.format(entries_json=entries_json)
-
-        ctx.translation_prompt = user_prompt
+        ctx.translation_prompt = build_user_prompt(entries)
+        # Kept as data too, for chapter batching and chunking of dense pages
+        ctx.metadata["translation_entries"] = entries
         ctx.metadata["translation_system_prompt"] = SYSTEM_PROMPT
         ctx.metadata["translation_entry_count"] = len(entries)
 
@@ -59,3 +130,48 @@ class TranslationPrep(PipelineStage):
             job_id=str(ctx.job_id),
         )
         return ctx
+
+    async def _apply_translation_memory(
+        self, ctx: PipelineContext, entries: list[dict]
+    ) -> list[dict]:
+        """Fill ``cached_translations`` from memory and return only the misses."""
+        found = await translation_memory.lookup(
+            [e["text"] for e in entries], settings.openai_model, PROMPT_VERSION
+        )
+        cached = []
+        misses = []
+        for entry in entries:
+            hit = found.get(entry["text"])
+            if hit is None:
+                misses.append(entry)
+            else:
+                cached.append({"id": entry["id"], "text": hit.translated_text})
+        ctx.metadata["cached_translations"] = cached
+
+        if cached:
+            # Per-entry tokens cover the entry in the prompt and its answer;
+            # split evenly between input and output for pricing
+            tokens_saved = sum(found[e["text"]].tokens for e in entries if e["text"] in found)
+            saved_krw = token_cost_krw(tokens_saved // 2, tokens_saved - tokens_saved // 2)
+            if not misses:
+                # No request at all: the system prompt is saved too
+                prompt_tokens = estimate_tokens(SYSTEM_PROMPT + USER_PROMPT_TEMPLATE)
+                tokens_saved += prompt_tokens
+                saved_krw += token_cost_krw(prompt_tokens, 0)
+            ctx.metadata["translation_prep_tokens_saved"] = tokens_saved
+            ctx.metadata["translation_prep_saved_krw"] = saved_krw
+
+        ctx.metadata["translation_prep_details"] = json.dumps(
+            {
+                "memory_hits": len(cached),
+                "memory_misses": len(misses),
+                "hit_rate": round(len(cached) / len(entries), 3),
+            }
+        )
+        logger.info(
+            "translation_prep.memory_lookup",
+            hits=len(cached),
+            misses=len(misses),
+            job_id=str(ctx.job_id),
+        )
+        return misses
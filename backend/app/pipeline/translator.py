@@ -1,29 +1,110 @@
 import asyncio
 import json
+from collections.abc import Callable
+from dataclasses import dataclass
 
 import structlog
-from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, RateLimitError
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+from openai.types import CompletionUsage
 
 from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.chapter_batcher import ChapterBatcher
+from app.pipeline.translation_mapper import IncrementalMapper
+from app.pipeline.translation_prep import (
+    CHAPTER_PROMPT_TEMPLATE,
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    build_user_prompt,
+    chunk_entries,
+    response_id,
+)
 from app.services.circuit_breaker import CircuitBreaker
+from app.services.cost_tracker import estimate_tokens, token_cost_krw
+from app.services.hedging import call_hedged, openai_hedge_budget, openai_latency
+from app.services.openai_client import (
+    estimate_request_tokens,
+    get_openai_client,
+    openai_limiter,
+    retry_after_s,
+)
+from app.services.translation_memory import translation_memory
+from app.utils.json_stream import JsonArrayStream
 
 logger = structlog.get_logger()
 
+_NO_USAGE = CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+# Extra requests for a chunk whose response was unparsable or left ids out;
+# transport errors are retried inside each request, not by asking again
+CHUNK_REASKS = 1
+
+
+@dataclass
+class _ChunkResponse:
+    complete: bool  # the response parsed as a whole
+    usage: CompletionUsage
+
+
+class _Received:
+    """Translations received so far for a page, by region id."""
+
+    def __init__(self, incremental: IncrementalMapper | None = None):
+        self.items: dict[int, dict] = {}
+        self.incremental = incremental
+
+    def add(self, item: dict) -> None:
+        region_id = response_id(item.get("id"))
+        if region_id is None or region_id in self.items:
+            return
+        item = {**item, "id": region_id}
+        self.items[region_id] = item
+        if self.incremental is not None:
+            self.incremental.add(item)
+
+    def missing(self, entries: list[dict]) -> list[dict]:
+        return [e for e in entries if e["id"] not in self.items]
+
 
 class Translator(PipelineStage):
-    """STAGE 3: Translate text using GPT-4o-mini."""
+    """STAGE 3: Translate text using GPT-4o-mini.
+
+    Responses are streamed: entries are parsed as they complete and handed
+    to an ``IncrementalMapper``, and a failure mid-stream only costs a retry
+    for the entries that had not arrived. On chapter jobs a shared
+    ``ChapterBatcher`` may be passed in; the page's entries are then
+    translated in a request shared with other pages, unless the page is
+    dense enough to be split into chunks of its own.
+    """
 
     name = "translator"
+    reads = frozenset(
+        {
+            "regions",
+            "metadata.font_scale",
+            "translation_prompt",
+            "metadata.translation_entries",
+            "metadata.translation_system_prompt",
+            "metadata.translation_entry_count",
+            "metadata.translation_sources",
+        }
+    )
+    writes = frozenset({"metadata.raw_translations", "metadata.premapped_translations"})
 
-    def __init__(self, circuit_breaker: CircuitBreaker | None = None):
-        self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            timeout=settings.openai_timeout_s,
-            max_retries=0,  # We handle retries ourselves
-        )
+    def __init__(
+        self,
+        circuit_breaker: CircuitBreaker | None = None,
+        batcher: ChapterBatcher | None = None,
+        hedging: bool | None = None,
+    ):
+        self.client = get_openai_client()
+        self.limiter = openai_limiter
         self.circuit_breaker = circuit_breaker or CircuitBreaker("openai")
         self.max_retries = settings.openai_max_retries
+        self.batcher = batcher
+        self.hedging = settings.openai_hedging if hedging is None else hedging
+        # Hedge requests sent during this page, and their [input, output] tokens
+        self._hedges = 0
+        self._hedge_tokens = [0, 0]
 
     async def process(self, ctx: PipelineContext) -> PipelineContext:
         if not ctx.translation_prompt:
@@ -31,85 +112,392 @@ class Translator(PipelineStage):
             ctx.metadata["raw_translations"] = []
             return ctx
 
-        system_prompt = ctx.metadata.get(
-            "translation_system_prompt", "Translate Japanese to Korean."
+        entries = ctx.metadata.get("translation_entries") or []
+        # A dense page would make one long shared request; it is chunked on its own
+        dense = len(chunk_entries(entries, settings.translation_chunk_max_tokens)) > 1
+        if self.batcher is not None and not dense:
+            translations, input_tokens, output_tokens = await self._translate_batched(ctx)
+        else:
+            translations, input_tokens, output_tokens = await self._translate_page(ctx)
+
+        # Calculate cost
+        total_tokens = input_tokens + output_tokens
+        cost_krw = token_cost_krw(input_tokens, output_tokens)
+        if self._hedges:
+            hedge_cost_krw = token_cost_krw(*self._hedge_tokens)
+            cost_krw += hedge_cost_krw
+            details = json.loads(ctx.metadata.get("translator_details") or "{}")
+            details.update(
+                hedged_requests=self._hedges, hedge_cost_krw=round(hedge_cost_krw, 4)
+            )
+            ctx.metadata["translator_details"] = json.dumps(details)
+
+        ctx.metadata["translator_cost_krw"] = cost_krw
+        ctx.metadata["translator_tokens"] = total_tokens
+
+        # Warn about missing translations
+        expected_count = ctx.metadata.get("translation_entry_count", 0)
+        if expected_count > 0 and len(translations) == 0:
+            ctx.metadata.setdefault("warnings", []).append(
+                f"Translation returned 0 results for {expected_count} text regions."
+            )
+        elif expected_count > 0 and len(translations) < expected_count:
+            ctx.metadata.setdefault("warnings", []).append(
+                f"Partial translation: {len(translations)}/{expected_count} regions translated."
+            )
+
+        ctx.metadata["raw_translations"] = translations
+        await self._store_in_memory(ctx, translations)
+
+        logger.info(
+            "translator.completed",
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost_krw=f"{cost_krw:.4f}",
+            translation_count=len(translations),
+            job_id=str(ctx.job_id),
         )
+        return ctx
+
+    async def complete(self, system_prompt: str, user_prompt: str, job_id: str):
+        """Send one JSON-mode chat completion, with retries."""
 
         async def _call_openai():
             return await self.client.chat.completions.create(
                 model=settings.openai_model,
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": ctx.translation_prompt},
+                    {"role": "user", "content": user_prompt},
                 ],
                 temperature=0.3,
                 response_format={"type": "json_object"},
             )
 
         # Retry with exponential backoff
-        response = await self._call_with_retry(_call_openai, ctx)
+        return await self._call_with_retry(
+            _call_openai,
+            job_id,
+            tokens=estimate_request_tokens(system_prompt, user_prompt),
+        )
 
-        # Calculate cost
-        input_tokens = response.usage.prompt_tokens
-        output_tokens = response.usage.completion_tokens
-        total_tokens = input_tokens + output_tokens
+    async def _translate_page(self, ctx: PipelineContext) -> tuple[list, int, int]:
+        """Translate the page in a request of its own: streamed, or in chunks if it is dense."""
+        system_prompt = ctx.metadata.get(
+            "translation_system_prompt", "Translate Japanese to Korean."
+        )
+        entries = ctx.metadata.get("translation_entries") or []
+        chunks = chunk_entries(entries, settings.translation_chunk_max_tokens)
+        if len(chunks) > 1 or (chunks and settings.translation_streaming):
+            return await self._translate_chunks(ctx, system_prompt, chunks)
 
-        # GPT-4o-mini pricing: $0.15/1M input, $0.60/1M output
-        cost_usd = (input_tokens * 0.15 + output_tokens * 0.60) / 1_000_000
-        cost_krw = cost_usd * settings.usd_krw_rate
+        response = await self.complete(system_prompt, ctx.translation_prompt, str(ctx.job_id))
+        translations = self._parse(response.choices[0].message.content, str(ctx.job_id))
+        if translations is None:
+            translations = []
+            self._warn_unparsable(ctx)
+        return translations, response.usage.prompt_tokens, response.usage.completion_tokens
 
-        ctx.metadata["translator_cost_krw"] = cost_krw
-        ctx.metadata["translator_tokens"] = total_tokens
+    async def _translate_chunks(
+        self, ctx: PipelineContext, system_prompt: str, chunks: list[list[dict]]
+    ) -> tuple[list, int, int]:
+        """Translate the page as concurrent requests of a few entries each.
 
-        # Parse response
-        raw_content = response.choices[0].message.content
-        expected_count = ctx.metadata.get("translation_entry_count", 0)
+        A chunk is asked again (up to ``CHUNK_REASKS`` times) only for its
+        entries that have not arrived: after an unparsable response or one
+        that left ids out. Transport errors, including a failure mid-stream,
+        are retried within the request itself. Translations that did arrive
+        are kept, so the page only fails if nothing was translated. While
+        streaming, each finished entry is laid out right away.
+        """
+        job_id = str(ctx.job_id)
+        incremental = None
+        if settings.translation_streaming and len(ctx.regions):
+            incremental = IncrementalMapper(ctx.regions, ctx.metadata.get("font_scale", 1.0))
+        received = _Received(incremental)
+        usage = [0, 0]
 
+        async def run_chunk(index: int, chunk: list[dict]) -> bool:
+            """True if a response for the chunk parsed (some ids may still be missing)."""
+            parsed = False
+            for attempt in range(CHUNK_REASKS + 1):
+                remaining = received.missing(chunk)
+                if not remaining:
+                    return True
+                if attempt:
+                    logger.warning(
+                        "translator.chunk_reask",
+                        chunk=index,
+                        missing=len(remaining),
+                        job_id=job_id,
+                    )
+                response = await self._request(
+                    system_prompt, remaining, job_id, received, usage
+                )
+                parsed = parsed or response.complete
+            return parsed
+
+        results = await asyncio.gather(
+            *(run_chunk(i, chunk) for i, chunk in enumerate(chunks)), return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if len(errors) == len(chunks) and not received.items:
+            raise errors[0]
+
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    "translator.chunk_failed", chunk=index, error=str(result), job_id=job_id
+                )
+        unparsable = sum(1 for result in results if result is False)
+        if unparsable:
+            self._warn_unparsable(ctx)
+        if incremental is not None:
+            ctx.metadata["premapped_translations"] = await incremental.results()
+
+        translations = [
+            received.items[e["id"]] for chunk in chunks for e in chunk if e["id"] in received.items
+        ]
+        ctx.metadata["translator_details"] = json.dumps(
+            {"chunks": len(chunks), "failed_chunks": len(errors) + unparsable}
+        )
+        logger.info(
+            "translator.chunked",
+            chunks=len(chunks),
+            failed=len(errors) + unparsable,
+            streamed=settings.translation_streaming,
+            job_id=job_id,
+        )
+        return translations, usage[0], usage[1]
+
+    async def _request(
+        self,
+        system_prompt: str,
+        entries: list[dict],
+        job_id: str,
+        received: _Received,
+        usage: list[int],
+    ) -> _ChunkResponse:
+        """Request translations of ``entries``, adding each to ``received`` as it arrives.
+
+        The tokens used are added to ``usage`` (``[input, output]``),
+        including those of attempts that failed partway through a stream.
+        """
+        if not settings.translation_streaming:
+            response = await self.complete(system_prompt, build_user_prompt(entries), job_id)
+            usage[0] += response.usage.prompt_tokens
+            usage[1] += response.usage.completion_tokens
+            translations = self._parse(response.choices[0].message.content, job_id)
+            for item in translations or []:
+                received.add(item)
+            return _ChunkResponse(complete=translations is not None, usage=response.usage)
+
+        # Estimated tokens of the current attempt if it fails mid-stream
+        failed_tokens = [0]
+
+        async def _call_openai():
+            failed_tokens[0] = 0
+            # A retry after a mid-stream failure only asks for what is still missing
+            remaining = received.missing(entries)
+            if not remaining:
+                return _ChunkResponse(complete=True, usage=_NO_USAGE)
+            user_prompt = build_user_prompt(remaining)
+            stream = await self.client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            parser = JsonArrayStream("translations")
+            stream_usage = _NO_USAGE
+            try:
+                async for event in stream:
+                    if event.usage is not None:
+                        stream_usage = event.usage
+                    if event.choices and event.choices[0].delta.content:
+                        for item in parser.feed(event.choices[0].delta.content):
+                            received.add(item)
+            except Exception:
+                # The usage event never arrived, but the prompt and the text
+                # streamed so far are still billed
+                prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+                completion_tokens = estimate_tokens(parser.text)
+                usage[0] += prompt_tokens
+                usage[1] += completion_tokens
+                failed_tokens[0] = prompt_tokens + completion_tokens
+                raise
+            usage[0] += stream_usage.prompt_tokens
+            usage[1] += stream_usage.completion_tokens
+            if not parser.complete():
+                logger.error(
+                    "translator.json_parse_error",
+                    content=parser.text[:200],
+                    job_id=job_id,
+                )
+            return _ChunkResponse(complete=parser.complete(), usage=stream_usage)
+
+        return await self._call_with_retry(
+            _call_openai,
+            job_id,
+            tokens=estimate_request_tokens(system_prompt, build_user_prompt(entries)),
+            failed_tokens=lambda: failed_tokens[0],
+        )
+
+    async def _translate_batched(self, ctx: PipelineContext) -> tuple[list, int, int]:
+        """Translate the page's entries in a request shared with other chapter pages.
+
+        Entries the shared response left out are asked for once more in a
+        request of the page's own; any still missing then count towards the
+        partial-translation warning.
+        """
+        result = await self.batcher.translate(ctx.metadata.get("translation_entries", []))
+        translations = result.translations
+        input_tokens, output_tokens = result.input_tokens, result.output_tokens
+        if result.parse_error:
+            self._warn_unparsable(ctx)
+        elif result.missing:
+            job_id = str(ctx.job_id)
+            system_prompt = ctx.metadata.get("translation_system_prompt", SYSTEM_PROMPT)
+            try:
+                response = await self.complete(
+                    system_prompt, build_user_prompt(result.missing), job_id
+                )
+            except Exception as e:
+                logger.error("translator.batch_reask_failed", error=str(e), job_id=job_id)
+            else:
+                wanted = {e["id"] for e in result.missing}
+                items = self._parse(response.choices[0].message.content, job_id) or []
+                reasked = []
+                for t in items:
+                    region_id = response_id(t.get("id")) if isinstance(t, dict) else None
+                    if region_id in wanted:
+                        reasked.append({**t, "id": region_id})
+                        wanted.discard(region_id)
+                translations = translations + reasked
+                input_tokens += response.usage.prompt_tokens
+                output_tokens += response.usage.completion_tokens
+        if result.pages > 1:
+            # The request carried one system prompt for all its pages
+            shared_tokens = estimate_tokens(SYSTEM_PROMPT + CHAPTER_PROMPT_TEMPLATE)
+            tokens_saved = shared_tokens * (result.pages - 1) // result.pages
+            ctx.metadata["translator_tokens_saved"] = tokens_saved
+            ctx.metadata["translator_saved_krw"] = token_cost_krw(tokens_saved, 0)
+        details = {"batch_pages": result.pages}
+        if result.missing and not result.parse_error:
+            details["reasked_entries"] = len(result.missing)
+        ctx.metadata["translator_details"] = json.dumps(details)
+        return translations, input_tokens, output_tokens
+
+    @staticmethod
+    def _parse(raw_content: str, job_id: str) -> list | None:
+        """The ``translations`` array of a response, or None if it is not valid JSON."""
         try:
             parsed = json.loads(raw_content)
-            translations = parsed.get("translations", [])
+            return parsed.get("translations", [])
         except json.JSONDecodeError:
             logger.error(
                 "translator.json_parse_error",
                 content=raw_content[:200],
-                job_id=str(ctx.job_id),
-            )
-            translations = []
-            ctx.metadata.setdefault("warnings", []).append(
-                "Translation response could not be parsed. Text regions will appear blank."
+                job_id=job_id,
             )
+            return None
 
-        # Warn about missing translations
-        if expected_count > 0 and len(translations) == 0:
-            ctx.metadata.setdefault("warnings", []).append(
-                f"Translation returned 0 results for {expected_count} text regions."
-            )
-        elif expected_count > 0 and len(translations) < expected_count:
-            ctx.metadata.setdefault("warnings", []).append(
-                f"Partial translation: {len(translations)}/{expected_count} regions translated."
-            )
+    @staticmethod
+    def _warn_unparsable(ctx: PipelineContext) -> None:
+        ctx.metadata.setdefault("warnings", []).append(
+            "Translation response could not be parsed. Text regions will appear blank."
+        )
 
-        ctx.metadata["raw_translations"] = translations
+    async def _store_in_memory(self, ctx: PipelineContext, translations: list) -> None:
+        if not settings.translation_memory_enabled:
+            return
+        sources = ctx.metadata.get("translation_sources") or {}
+        pairs = {}
+        for t in translations:
+            if not isinstance(t, dict):
+                continue
+            source = sources.get(response_id(t.get("id")))
+            text = t.get("text")
+            if source and isinstance(text, str) and text:
+                pairs[source] = text
+        if pairs:
+            await translation_memory.store(pairs, settings.openai_model, PROMPT_VERSION)
 
-        logger.info(
-            "translator.completed",
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            cost_krw=f"{cost_krw:.4f}",
-            translation_count=len(translations),
-            job_id=str(ctx.job_id),
+    async def _send(self, func, tokens: int):
+        """One attempt of ``func`` under the circuit breaker, hedged if enabled.
+
+        The hedge takes a limiter slot of its own, so it waits for the
+        concurrency limit and rate budgets like any other call.
+        """
+        if not self.hedging:
+            return await self.circuit_breaker.call(func)
+
+        hedge_sent = False
+        hedge_response = None
+
+        async def hedge():
+            nonlocal hedge_sent, hedge_response
+            async with self.limiter.slot(tokens) as reservation:
+                hedge_sent = True
+                hedge_response = await self.circuit_breaker.call(func)
+                usage = hedge_response.usage
+                reservation.used = usage.prompt_tokens + usage.completion_tokens
+            return hedge_response
+
+        response, _ = await call_hedged(
+            lambda: self.circuit_breaker.call(func),
+            openai_latency,
+            openai_hedge_budget,
+            settings.openai_hedge_percentile,
+            hedge=hedge,
         )
-        return ctx
+        if hedge_sent:
+            self._hedges += 1
+            if hedge_response is not None and hedge_response is not response:
+                # The losing hedge finished too; its own usage is known
+                self._hedge_tokens[0] += hedge_response.usage.prompt_tokens
+                self._hedge_tokens[1] += hedge_response.usage.completion_tokens
+            else:
+                # The cancelled request is billed at least for its prompt,
+                # which is the same as the response's
+                self._hedge_tokens[0] += response.usage.prompt_tokens
+        return response
 
-    async def _call_with_retry(self, func, ctx: PipelineContext):
-        """Call OpenAI with retry and exponential backoff."""
+    async def _call_with_retry(
+        self,
+        func,
+        job_id: str,
+        tokens: int = 0,
+        failed_tokens: Callable[[], int] | None = None,
+    ):
+        """Call OpenAI through the shared rate limiter, with retry and exponential backoff.
+
+        ``tokens`` is the estimated size of the call, reserved against the
+        tokens-per-minute budget until the response reports its usage. When
+        an attempt fails, ``failed_tokens`` (if given) reports what it used
+        before failing, and the reservation is corrected to that.
+        """
         last_error = None
         for attempt in range(1, self.max_retries + 2):
             try:
-                return await asyncio.wait_for(
-                    self.circuit_breaker.call(func),
-                    timeout=settings.openai_timeout_s + 5,
-                )
+                async with self.limiter.slot(tokens) as reservation:
+                    try:
+                        response = await asyncio.wait_for(
+                            self._send(func, tokens),
+                            timeout=settings.openai_timeout_s + 5,
+                        )
+                    except Exception:
+                        if failed_tokens is not None:
+                            reservation.used = failed_tokens()
+                        raise
+                    usage = response.usage
+                    reservation.used = usage.prompt_tokens + usage.completion_tokens
+                self.limiter.record_success()
+                return response
             except (asyncio.TimeoutError, APITimeoutError, APIConnectionError) as e:
                 last_error = e
                 if attempt <= self.max_retries:
@@ -120,21 +508,22 @@ class Translator(PipelineStage):
                         max_retries=self.max_retries,
                         wait_s=wait,
                         error=str(e),
-                        job_id=str(ctx.job_id),
+                        job_id=job_id,
                     )
                     await asyncio.sleep(wait)
                 else:
                     raise
             except RateLimitError as e:
                 last_error = e
+                # Shrinks the concurrency limit and holds every caller for the
+                # server's Retry-After; the retry queues behind that pause
+                wait = self.limiter.record_rate_limit(retry_after_s(e.response.headers))
                 if attempt <= self.max_retries:
-                    wait = 4 ** attempt  # 4s, 16s
                     logger.warning(
                         "translator.rate_limited",
                         wait_s=wait,
-                        job_id=str(ctx.job_id),
+                        job_id=job_id,
                     )
-                    await asyncio.sleep(wait)
                 else:
                     raise
         raise last_error
@@ -1,5 +1,4 @@
 import asyncio
-import os
 
 import cv2
 import numpy as np
@@ -8,21 +7,44 @@ from PIL import Image, ImageDraw, ImageFont
 
 from app.core.config import settings
 from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.font_cache import fallback_metrics, font_cache
+from app.pipeline.regions import MappedTranslation
+from app.pipeline.text_layout import (
+    MAX_FONT_SIZE,
+    MAX_PRELOAD_FONT_SCALE,
+    MIN_FONT_SIZE,
+    TEXT_PADDING,
+    candidate_sizes,
+    get_metrics,
+    layout_in_bbox,
+    line_height,
+)
 
 logger = structlog.get_logger()
 
-# Padding inside the text box
-TEXT_PADDING = 5
-# Line height multiplier
-LINE_HEIGHT_FACTOR = 1.3
-# Minimum font size (consistent with translation_mapper)
-MIN_FONT_SIZE = 12
+# White outline around the black glyphs (px)
+OUTLINE_WIDTH = 1
+_OUTLINE_KERNEL = np.ones((OUTLINE_WIDTH * 2 + 1, OUTLINE_WIDTH * 2 + 1), np.uint8)
+
+
+def _blend_patch(
+    img: np.ndarray, x: int, y: int, text_alpha: np.ndarray, outline_alpha: np.ndarray
+) -> None:
+    """Composite a white outline, then black text, onto ``img`` in place."""
+    h, w = text_alpha.shape
+    region = img[y:y + h, x:x + w]
+    text = text_alpha.astype(np.float32)[..., None] / 255
+    outline = outline_alpha.astype(np.float32)[..., None] / 255
+    blended = (region * (1 - outline) + 255 * outline) * (1 - text)
+    region[:] = (blended + 0.5).astype(np.uint8)
 
 
 class Typesetter(PipelineStage):
     """STAGE 4-insert: Render translated Korean text onto the image."""
 
     name = "typesetter"
+    reads = frozenset({"preprocessed_image", "inpainted_image", "translations"})
+    writes = frozenset({"result_image"})
 
     def __init__(self, font_path: str | None = None):
         self.font_path = font_path or settings.font_path
@@ -55,111 +77,102 @@ class Typesetter(PipelineStage):
         return ctx
 
     def _render(self, img: np.ndarray, translations) -> np.ndarray:
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(img_rgb)
-        draw = ImageDraw.Draw(img_pil)
-
+        result = img.copy()
+        # Serial on purpose: Pillow holds the GIL while drawing text, and the
+        # cached FreeTypeFont objects are shared between jobs
         for t in translations:
-            font = self._load_font(t.font_size)
-            x1, y1, x2, y2 = t.bbox
-            box_w = x2 - x1 - TEXT_PADDING * 2
-            box_h = y2 - y1 - TEXT_PADDING * 2
-
-            if box_w <= 0 or box_h <= 0:
-                continue
-
-            # Word-wrap text
-            lines = self._wrap_text(draw, t.translated, font, box_w)
-            if not lines:
-                continue
-
-            # Calculate total text height
-            line_height = int(t.font_size * LINE_HEIGHT_FACTOR)
-            total_text_h = len(lines) * line_height
-
-            # If text overflows, reduce font size and re-wrap
-            if total_text_h > box_h:
-                reduced_size = max(MIN_FONT_SIZE, int(t.font_size * box_h / total_text_h))
-                font = self._load_font(reduced_size)
-                lines = self._wrap_text(draw, t.translated, font, box_w)
-                line_height = int(reduced_size * LINE_HEIGHT_FACTOR)
-                total_text_h = len(lines) * line_height
-
-            # Center vertically
-            y_offset = y1 + TEXT_PADDING + max(0, (box_h - total_text_h) // 2)
-
-            for line in lines:
-                line_bbox = draw.textbbox((0, 0), line, font=font)
-                line_w = line_bbox[2] - line_bbox[0]
-                # Center horizontally
-                x_offset = x1 + TEXT_PADDING + max(0, (box_w - line_w) // 2)
-
-                # Draw white outline for readability
-                for dx in (-1, 0, 1):
-                    for dy in (-1, 0, 1):
-                        if dx == 0 and dy == 0:
-                            continue
-                        draw.text(
-                            (x_offset + dx, y_offset + dy),
-                            line,
-                            font=font,
-                            fill="white",
-                        )
-                # Draw black text
-                draw.text((x_offset, y_offset), line, font=font, fill="black")
-
-                y_offset += line_height
-
-        return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+            patch = self._render_patch(t, result.shape)
+            if patch is not None:
+                _blend_patch(result, *patch)
+        return result
+
+    def _render_patch(
+        self, t: MappedTranslation, image_shape: tuple[int, ...]
+    ) -> tuple[int, int, np.ndarray, np.ndarray] | None:
+        """Rasterise one translation as (x, y, text alpha, outline alpha) over its bbox."""
+        x1, y1, x2, y2 = t.bbox
+        box_w = x2 - x1 - TEXT_PADDING * 2
+        box_h = y2 - y1 - TEXT_PADDING * 2
+
+        if box_w <= 0 or box_h <= 0:
+            return None
+
+        lines, font_size = self._layout(t)
+        if not lines:
+            return None
+        font = self._load_font(font_size)
+        metrics = get_metrics(self.font_path, font_size)
+
+        # Calculate total text height
+        line_h = line_height(font_size)
+        total_text_h = len(lines) * line_h
+
+        # Center vertically, then each line horizontally (page coordinates)
+        y_start = y1 + TEXT_PADDING + max(0, (box_h - total_text_h) // 2)
+        placed = []
+        for i, line in enumerate(lines):
+            line_w = int(metrics.measure(line))
+            x_offset = x1 + TEXT_PADDING + max(0, (box_w - line_w) // 2)
+            placed.append((x_offset, y_start + i * line_h, line_w, line))
+
+        # Patch covers the text block plus room for glyph overhang and the
+        # outline, clipped to the bbox and the image
+        margin = font_size // 2 + OUTLINE_WIDTH
+        img_h, img_w = image_shape[:2]
+        px1 = max(0, x1 - OUTLINE_WIDTH, min(x for x, _, _, _ in placed) - margin)
+        px2 = min(img_w, x2 + OUTLINE_WIDTH, max(x + w for x, _, w, _ in placed) + margin)
+        py1 = max(0, y1 - OUTLINE_WIDTH, y_start - margin)
+        py2 = min(img_h, y2 + OUTLINE_WIDTH, y_start + total_text_h + margin)
+        if px2 <= px1 or py2 <= py1:
+            return None
+
+        mask = Image.new("L", (px2 - px1, py2 - py1), 0)
+        draw = ImageDraw.Draw(mask)
+        for x, y, _, line in placed:
+            draw.text((x - px1, y - py1), line, font=font, fill=255)
+
+        text_alpha = np.asarray(mask)
+        if not text_alpha.any():
+            return None
+        # White outline for readability: the glyph mask grown by OUTLINE_WIDTH
+        outline_alpha = cv2.dilate(text_alpha, _OUTLINE_KERNEL)
+        # Blend only the inked part of the patch
+        x, y, w, h = cv2.boundingRect(outline_alpha)
+        return (
+            px1 + x,
+            py1 + y,
+            text_alpha[y:y + h, x:x + w],
+            outline_alpha[y:y + h, x:x + w],
+        )
+
+    def _layout(self, t: MappedTranslation) -> tuple[list[str], int]:
+        """Line breaks chosen by TranslationMapper, or a fresh fit no larger than ``font_size``."""
+        if t.lines:
+            return t.lines, t.font_size
+        layout = layout_in_bbox(
+            t.translated, t.bbox, font_path=self.font_path, max_size=t.font_size
+        )
+        return layout.lines, layout.font_size
 
     def _load_font(self, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-        try:
-            if os.path.exists(self.font_path):
-                return ImageFont.truetype(self.font_path, size)
-        except Exception as e:
-            logger.warning("typesetter.font_load_error", error=str(e), font_path=self.font_path)
-        # Fallback to default font
+        font = font_cache.get_font(self.font_path, size)
+        if font is not None:
+            return font
+        # Fallback to Pillow's built-in font
         logger.warning(
             "typesetter.font_fallback",
             font_path=self.font_path,
             detail="Using default bitmap font - Korean glyphs will NOT render correctly",
         )
         self._used_fallback_font = True
-        return ImageFont.load_default()
-
-    def _wrap_text(
-        self,
-        draw: ImageDraw.ImageDraw,
-        text: str,
-        font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
-        max_width: int,
-    ) -> list[str]:
-        """Wrap text to fit within max_width.
-
-        Korean text is wrapped at character level since Korean doesn't use spaces
-        as consistently as English.
-        """
-        if not text:
-            return []
-
-        lines = []
-        for paragraph in text.split("\n"):
-            current = ""
-            for char in paragraph:
-                test = current + char
-                try:
-                    test_width = draw.textlength(test, font=font)
-                except AttributeError:
-                    # Fallback for older Pillow versions
-                    test_width = draw.textbbox((0, 0), test, font=font)[2]
-
-                if test_width <= max_width:
-                    current = test
-                else:
-                    if current:
-                        lines.append(current)
-                    current = char
-            if current:
-                lines.append(current)
-
-        return lines
+        return fallback_metrics(size).font
+
+
+def preload_font_metrics() -> int:
+    """Load the configured font at every layout size and measure its glyphs.
+
+    Covers the sizes of pages up to ``MAX_PRELOAD_FONT_SCALE``, as many as
+    the font cache holds.
+    """
+    sizes = candidate_sizes(MIN_FONT_SIZE, round(MAX_FONT_SIZE * MAX_PRELOAD_FONT_SCALE))
+    return font_cache.preload(settings.font_path, sizes[:font_cache.max_entries])
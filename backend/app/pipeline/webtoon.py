@@ -0,0 +1,85 @@
+"""Long-strip (webtoon) handling.
+
+A vertical-scroll strip is far taller than it is wide, so fitting it into
+the detection image like a page would shrink it to an unreadable width.
+Strips are instead scaled by width only and detected as overlapping
+horizontal bands: detection runs on each band in parallel and regions found
+twice, or cut by a band edge, are merged back in strip coordinates.
+Everything downstream (OCR, inpainting, typesetting) already works on
+per-region crops of the full-resolution strip, so the result is produced at
+the original width without a stitching step.
+"""
+
+from app.core.config import settings
+
+Box = tuple[int, int, int, int]
+
+
+def is_webtoon(shape: tuple[int, ...]) -> bool:
+    """True for images at least ``webtoon_min_aspect`` times taller than wide."""
+    if not settings.webtoon_mode:
+        return False
+    h, w = shape[:2]
+    return h >= w * settings.webtoon_min_aspect
+
+
+def plan_slices(height: int, slice_height: int, overlap: int) -> list[tuple[int, int]]:
+    """Cover ``[0, height)`` with bands of ``slice_height`` rows overlapping by ``overlap``."""
+    overlap = max(0, min(overlap, slice_height // 2))
+    if height <= slice_height:
+        return [(0, height)]
+    step = slice_height - overlap
+    slices = []
+    y0 = 0
+    while True:
+        y1 = min(height, y0 + slice_height)
+        slices.append((y0, y1))
+        if y1 == height:
+            return slices
+        y0 += step
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def merge_slice_boxes(per_slice: list[list[Box]], slices: list[tuple[int, int]]) -> list[Box]:
+    """Shift band-local boxes to strip coordinates and merge cross-band duplicates.
+
+    Only boxes from neighbouring bands are merged: within one band the
+    detector's boxes do not overlap, and a region that crosses a band edge
+    appears, whole or cut, in both bands' shared rows.
+    """
+    shifted = [
+        [(x1, y1 + y0, x2, y2 + y0) for x1, y1, x2, y2 in boxes]
+        for boxes, (y0, _) in zip(per_slice, slices)
+    ]
+    flat = [box for boxes in shifted for box in boxes]
+    parent = list(range(len(flat)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    offset = 0
+    for band in range(len(shifted) - 1):
+        upper, lower = shifted[band], shifted[band + 1]
+        for i, a in enumerate(upper):
+            for j, b in enumerate(lower):
+                if _intersects(a, b):
+                    parent[find(offset + i)] = find(offset + len(upper) + j)
+        offset += len(upper)
+
+    groups: dict[int, Box] = {}
+    for i, box in enumerate(flat):
+        root = find(i)
+        g = groups.get(root, box)
+        groups[root] = (
+            min(g[0], box[0]),
+            min(g[1], box[1]),
+            max(g[2], box[2]),
+            max(g[3], box[3]),
+        )
+    return list(groups.values())
@@ -20,16 +20,28 @@ class JobStatusResponse(BaseModel):
     warnings: list[str] = []
     current_stage: str | None = None
     created_at: datetime | None = None
+    result_job_id: uuid.UUID | None = None  # set when served from the result cache
 
     model_config = {"from_attributes": True}
 
 
 class PipelineLogResponse(BaseModel):
     stage: str
+    page: int | None = None
     duration_ms: int
     cost_krw: float
     tokens_used: int | None = None
+    tokens_saved: int | None = None
+    saved_krw: float = 0.0
     success: bool
     failure_type: str | None = None
 
     model_config = {"from_attributes": True}
+
+
+class QueueStatusResponse(BaseModel):
+    mode: str  # "queue" (worker pool) or "in_process"
+    in_flight: int
+    queued: int
+    max_in_flight: int
+    max_queued: int
@@ -1,3 +1,9 @@
+"""External form of pipeline data.
+
+Stages work on ``app.pipeline.regions`` (a columnar ``RegionTable`` and
+slotted records); these models are for anything leaving the pipeline.
+"""
+
 from pydantic import BaseModel
 
 
@@ -10,11 +16,15 @@ class DetectedRegion(BaseModel):
     confidence: float = 0.0
     reading_order: int = 0
     balloon_bbox: tuple[int, int, int, int] | None = None
+    balloon_id: int | None = None  # index into PipelineContext.balloons
+    panel_id: int | None = None  # index into PipelineContext.panels
 
 
 class OcrResult(BaseModel):
     """OCR result for a single detected region."""
 
+    model_config = {"from_attributes": True}
+
     region_id: int
     text: str
     confidence: float = 0.0
@@ -24,8 +34,11 @@ class OcrResult(BaseModel):
 class MappedTranslation(BaseModel):
     """A translated text mapped back to its region with rendering info."""
 
+    model_config = {"from_attributes": True}
+
     region_id: int
     bbox: tuple[int, int, int, int]  # render target bbox
     translated: str
     font_size: int
+    lines: list[str] = []  # line breaks chosen at font_size; empty = typesetter lays out
     balloon_info: dict = {}
@@ -0,0 +1,85 @@
+import asyncio
+import math
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Retry-After is clamped to this range (seconds)
+MIN_RETRY_AFTER_S = 1
+MAX_RETRY_AFTER_S = 3600
+
+
+class AdmissionController:
+    """Caps in-process pipelines and the number of admitted jobs waiting for a slot.
+
+    The endpoint calls ``reserve()`` when it accepts a job, and the background
+    task runs the pipeline inside ``slot()``. Reservations count as queued
+    until a slot frees up, so a burst of uploads cannot pile unbounded
+    full-resolution images into memory.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max(0, max_queued)
+        self.in_flight = 0
+        self.queued = 0
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    @property
+    def capacity(self) -> int:
+        return self.max_in_flight + self.max_queued
+
+    def reserve(self) -> bool:
+        """Admit one job if capacity remains. Returns False when full."""
+        if self.in_flight + self.queued >= self.capacity:
+            return False
+        self.queued += 1
+        return True
+
+    def cancel_reservation(self) -> None:
+        """Give back a reservation that will never reach ``slot()``."""
+        self.queued = max(0, self.queued - 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a pipeline slot, consuming a prior reservation."""
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued = max(0, self.queued - 1)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+def estimate_retry_after_s(
+    queue_depth: int,
+    concurrency: int,
+    job_avg_ms: float | None,
+) -> int:
+    """Seconds until a newly submitted job could likely be admitted.
+
+    The job duration is the recent average wall time per job (falling back
+    to ``default_job_duration_s``); the queue drains ``concurrency`` jobs at
+    a time.
+    """
+    if job_avg_ms:
+        job_s = job_avg_ms / 1000
+    else:
+        job_s = settings.default_job_duration_s
+    waves = (queue_depth + 1) / max(1, concurrency)
+    return max(MIN_RETRY_AFTER_S, min(MAX_RETRY_AFTER_S, math.ceil(waves * job_s)))
+
+
+pipeline_admission = AdmissionController(
+    max_in_flight=settings.max_concurrent_pipelines,
+    max_queued=settings.max_queued_pipelines,
+)
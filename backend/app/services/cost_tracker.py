@@ -4,11 +4,34 @@ import structlog
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.job import Job
 from app.models.pipeline_log import PipelineLog
 
 logger = structlog.get_logger()
 
+# GPT-4o-mini pricing (USD per 1M tokens)
+INPUT_USD_PER_M_TOKENS = 0.15
+OUTPUT_USD_PER_M_TOKENS = 0.60
+
+
+def token_cost_krw(input_tokens: int, output_tokens: int) -> float:
+    """KRW cost of one completion at the configured exchange rate."""
+    cost_usd = (
+        input_tokens * INPUT_USD_PER_M_TOKENS + output_tokens * OUTPUT_USD_PER_M_TOKENS
+    ) / 1_000_000
+    return cost_usd * settings.usd_krw_rate
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer.
+
+    CJK characters are about one token each; other text about four
+    characters per token.
+    """
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
 
 class BudgetExceededError(Exception):
     pass
@@ -18,12 +41,19 @@ class CostTracker:
     """Tracks per-stage costs and enforces budget limits."""
 
     def __init__(
-        self, job_id: uuid.UUID, db: AsyncSession, max_cost_krw: float = 10.0
+        self,
+        job_id: uuid.UUID,
+        db: AsyncSession,
+        max_cost_krw: float = 10.0,
+        page: int | None = None,
     ):
         self.job_id = job_id
         self.db = db
         self.max_cost_krw = max_cost_krw
+        self.page = page
         self.accumulated_krw = 0.0
+        self.saved_krw = 0.0
+        self.tokens_saved = 0
 
     async def record_stage(
         self,
@@ -34,28 +64,37 @@ class CostTracker:
         success: bool = True,
         failure_type: str | None = None,
         details: str | None = None,
+        saved_krw: float = 0.0,
+        tokens_saved: int | None = None,
     ) -> None:
         log_entry = PipelineLog(
             job_id=self.job_id,
             stage=stage,
+            page=self.page,
             duration_ms=duration_ms,
             cost_krw=cost_krw,
             tokens_used=tokens,
             success=success,
             failure_type=failure_type,
             details=details,
+            saved_krw=saved_krw,
+            tokens_saved=tokens_saved,
         )
         self.db.add(log_entry)
         await self.db.flush()
 
         self.accumulated_krw += cost_krw
+        self.saved_krw += saved_krw
+        self.tokens_saved += tokens_saved or 0
 
         logger.info(
             "cost_tracker.stage_recorded",
             job_id=str(self.job_id),
             stage=stage,
+            page=self.page,
             cost_krw=cost_krw,
             accumulated_krw=self.accumulated_krw,
+            saved_krw=saved_krw,
             success=success,
         )
 
@@ -81,5 +120,7 @@ class CostTracker:
             "cost_tracker.finalized",
             job_id=str(self.job_id),
             total_cost_krw=self.accumulated_krw,
+            saved_krw=self.saved_krw,
+            tokens_saved=self.tokens_saved,
             processing_time_ms=processing_time_ms,
         )
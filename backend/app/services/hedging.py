@@ -0,0 +1,117 @@
+"""Request hedging for OpenAI calls.
+
+A call that has not returned by a high percentile of recent call
+latencies is probably stuck behind a slow backend. A second, identical
+request is sent; whichever answers first wins and the other is
+cancelled. ``HedgeBudget`` caps the share of calls that may be hedged, so
+a general slowdown cannot double the request rate.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Recent call latencies kept for the percentile
+LATENCY_WINDOW = 200
+# Hedges allowed back to back before the budget has to refill
+HEDGE_BURST = 3
+
+
+class LatencyTracker:
+    """Latencies of the most recent calls and their percentiles."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = 20):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """The ``p``-th percentile (nearest rank), or None until ``min_samples`` are in."""
+        if len(self._samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self._samples)
+        rank = math.ceil(p / 100 * len(ordered))
+        return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+class HedgeBudget:
+    """Allows at most ``max_rate`` of calls to be hedged.
+
+    Every call earns ``max_rate`` of a hedge, up to ``burst`` banked;
+    a hedge spends one.
+    """
+
+    def __init__(self, max_rate: float, burst: float = HEDGE_BURST):
+        self.max_rate = max(0.0, max_rate)
+        self.burst = burst
+        self.credit = 0.0
+
+    def on_call(self) -> None:
+        self.credit = min(self.burst, self.credit + self.max_rate)
+
+    def try_spend(self) -> bool:
+        # Tolerate float drift from repeated max_rate increments
+        if self.credit < 1 - 1e-9:
+            return False
+        self.credit -= 1
+        return True
+
+
+async def call_hedged(
+    func: Callable[[], Awaitable[Any]],
+    tracker: LatencyTracker,
+    budget: HedgeBudget,
+    percentile: float,
+    hedge: Callable[[], Awaitable[Any]] | None = None,
+) -> tuple[Any, bool]:
+    """Run ``func``, hedging it with a second call past the latency percentile.
+
+    ``hedge`` makes the second call (default: ``func`` again). Returns the
+    first successful result and whether a hedge was started. A call that
+    fails while the other is still running does not end the race; if both
+    fail, the last error is raised. The latency recorded is the time since
+    ``func`` started, whichever call won, so hedged calls still count as
+    slow ones.
+    """
+    budget.on_call()
+    delay = tracker.percentile(percentile)
+    started = time.monotonic()
+    pending = {asyncio.ensure_future(func())}
+    hedged = False
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and budget.try_spend():
+                logger.info("hedging.hedge_sent", delay_s=round(delay, 3))
+                pending.add(asyncio.ensure_future((hedge or func)()))
+                hedged = True
+
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.record(time.monotonic() - started)
+                    return task.result(), hedged
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+openai_latency = LatencyTracker(min_samples=settings.openai_hedge_min_samples)
+openai_hedge_budget = HedgeBudget(max_rate=settings.openai_hedge_max_rate)
@@ -1,6 +1,7 @@
 import uuid
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import Select, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.job import Job, JobStatus
@@ -11,11 +12,15 @@ async def create_job(
     db: AsyncSession,
     page_count: int = 1,
     original_filename: str | None = None,
+    content_hash: str | None = None,
+    pipeline_version: str | None = None,
 ) -> Job:
     job = Job(
         status=JobStatus.PENDING,
         page_count=page_count,
         original_filename=original_filename,
+        content_hash=content_hash,
+        pipeline_version=pipeline_version,
     )
     db.add(job)
     await db.flush()
@@ -28,6 +33,58 @@ async def get_job(db: AsyncSession, job_id: uuid.UUID) -> Job | None:
     return result.scalar_one_or_none()
 
 
+async def find_cached_jobs(
+    db: AsyncSession, content_hash: str, pipeline_version: str, limit: int = 5
+) -> list[Job]:
+    """Most recent clean, completed jobs that ran the pipeline for this upload.
+
+    Jobs that finished with warnings (a degraded OCR or translation) are not
+    reused, so a re-upload gets a fresh run instead of the degraded result.
+    """
+    result = await db.execute(
+        select(Job)
+        .where(
+            Job.content_hash == content_hash,
+            Job.pipeline_version == pipeline_version,
+            Job.status == JobStatus.COMPLETED,
+            Job.result_job_id.is_(None),
+            Job.warnings_json.is_(None),
+        )
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def create_cached_job(
+    db: AsyncSession, source: Job, original_filename: str | None = None
+) -> Job:
+    """A COMPLETED job that serves ``source``'s result without running anything."""
+    job = Job(
+        status=JobStatus.COMPLETED,
+        page_count=source.page_count,
+        original_filename=original_filename,
+        total_cost_krw=0.0,
+        processing_time_ms=0,
+        warnings_json=source.warnings_json,
+        result_job_id=source.id,
+    )
+    db.add(job)
+    await db.flush()
+    await db.refresh(job)
+    return job
+
+
+async def evict_result_cache(db: AsyncSession, job_ids: list[uuid.UUID]) -> None:
+    """Stop offering these jobs' results once their files are gone."""
+    if not job_ids:
+        return
+    await db.execute(
+        update(Job).where(Job.id.in_(job_ids)).values(content_hash=None)
+    )
+    await db.flush()
+
+
 async def update_job_status(
     db: AsyncSession,
     job_id: uuid.UUID,
@@ -42,6 +99,35 @@ async def update_job_status(
     await db.flush()
 
 
+async def count_jobs_by_status(db: AsyncSession, status: JobStatus) -> int:
+    result = await db.execute(
+        select(func.count()).select_from(Job).where(Job.status == status)
+    )
+    return int(result.scalar_one())
+
+
+async def get_recent_job_duration_ms(db: AsyncSession, limit: int = 50) -> float | None:
+    """Average wall time (ms) of the most recent jobs that ran the pipeline.
+
+    Stages overlap, so this is shorter than the sum of their durations.
+    Returns None when no job has completed yet.
+    """
+    recent = (
+        select(Job.processing_time_ms)
+        .where(
+            Job.status == JobStatus.COMPLETED,
+            Job.result_job_id.is_(None),
+            Job.processing_time_ms.is_not(None),
+        )
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    result = await db.execute(select(func.avg(recent.c.processing_time_ms)))
+    avg_ms = result.scalar_one_or_none()
+    return float(avg_ms) if avg_ms is not None else None
+
+
 async def get_job_logs(
     db: AsyncSession, job_id: uuid.UUID
 ) -> list[PipelineLog]:
@@ -51,3 +137,78 @@ async def get_job_logs(
         .order_by(PipelineLog.created_at)
     )
     return list(result.scalars().all())
+
+
+def claim_next_job_query() -> Select:
+    """Oldest PENDING job, locked so concurrent workers skip it instead of waiting."""
+    return (
+        select(Job)
+        .where(Job.status == JobStatus.PENDING)
+        .order_by(Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def claim_next_job(db: AsyncSession, worker_id: str) -> Job | None:
+    """Claim the oldest PENDING job for a worker.
+
+    The caller must commit promptly: the row lock is held until then, and
+    the PROCESSING status is what keeps other workers away afterwards.
+    """
+    result = await db.execute(claim_next_job_query())
+    job = result.scalar_one_or_none()
+    if job is None:
+        return None
+
+    job.status = JobStatus.PROCESSING
+    job.claimed_by = worker_id
+    job.claimed_at = datetime.now(timezone.utc)
+    job.attempts = (job.attempts or 0) + 1
+    await db.flush()
+    return job
+
+
+async def heartbeat_job(db: AsyncSession, job_id: uuid.UUID, worker_id: str) -> bool:
+    """Refresh the claim on a job this worker is still running.
+
+    Returns False if the job is no longer claimed by ``worker_id``.
+    """
+    result = await db.execute(
+        update(Job)
+        .where(
+            Job.id == job_id,
+            Job.claimed_by == worker_id,
+            Job.status == JobStatus.PROCESSING,
+        )
+        .values(claimed_at=datetime.now(timezone.utc))
+    )
+    return result.rowcount > 0
+
+
+async def requeue_stale_jobs(
+    db: AsyncSession, claim_timeout_s: int, max_attempts: int
+) -> int:
+    """Return jobs abandoned by a dead worker to the queue, or fail them.
+
+    A live worker refreshes ``claimed_at`` with ``heartbeat_job`` while a
+    job runs, so only jobs whose worker stopped heartbeating are touched.
+    Returns the number of jobs touched.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=claim_timeout_s)
+    result = await db.execute(
+        select(Job)
+        .where(Job.status == JobStatus.PROCESSING, Job.claimed_at < cutoff)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = list(result.scalars().all())
+    for job in jobs:
+        if (job.attempts or 0) >= max_attempts:
+            job.status = JobStatus.FAILED
+            job.error_message = f"Job abandoned after {job.attempts} attempt(s)"
+        else:
+            job.status = JobStatus.PENDING
+        job.claimed_by = None
+        job.claimed_at = None
+    await db.flush()
+    return len(jobs)
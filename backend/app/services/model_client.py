@@ -0,0 +1,119 @@
+"""Client proxies for the local model server (``python -m app.model_server``).
+
+``RemoteOcr`` and ``RemoteLama`` mimic the call signatures of PaddleOCR and
+SimpleLama, so pipeline stages use them unchanged when ``MODEL_SERVER_SOCKET``
+is set. Calls block and are made from executor threads; each thread keeps its
+own connection so concurrent stages can be batched together by the server.
+"""
+
+import socket
+import threading
+
+import numpy as np
+import structlog
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.ipc import ProtocolError, recv_message, send_message
+
+logger = structlog.get_logger()
+
+
+class ModelServerError(Exception):
+    """Raised when the model server reports a failure or cannot be reached."""
+
+
+class ModelServerClient:
+    def __init__(self, socket_path: str, timeout_s: float):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout_s)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._local.sock = None
+
+    def call(
+        self, header: dict, arrays: list[np.ndarray] | tuple = ()
+    ) -> tuple[dict, list[np.ndarray]]:
+        """Send one request and wait for the response.
+
+        A stale connection (e.g. after a server restart) is retried once on a
+        fresh socket.
+        """
+        for attempt in range(2):
+            try:
+                sock = getattr(self._local, "sock", None)
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                send_message(sock, header, arrays)
+                response, out_arrays = recv_message(sock)
+                break
+            except (OSError, ProtocolError) as e:
+                self._close()
+                if attempt == 1 or isinstance(e, socket.timeout):
+                    raise ModelServerError(f"Model server unavailable: {e}") from e
+                logger.warning("model_client.reconnecting", op=header.get("op"), error=str(e))
+
+        if not response.get("ok"):
+            raise ModelServerError(response.get("error", "Unknown model server error"))
+        return response, out_arrays
+
+
+class RemoteOcr:
+    """Stand-in for ``PaddleOCR`` that forwards ``ocr()`` calls.
+
+    ``recognize()`` is the recognition-only path used by ``OcrEngine``.
+    """
+
+    def __init__(self, client: ModelServerClient):
+        self._client = client
+
+    def ocr(self, image: np.ndarray, cls: bool = True):
+        response, _ = self._client.call({"op": "ocr", "cls": cls}, [image])
+        return response["result"]
+
+    def recognize(
+        self, lines: list[np.ndarray], needs_cls: list[bool]
+    ) -> list[tuple[str, float]]:
+        if not lines:
+            return []
+        response, _ = self._client.call({"op": "recognize", "cls": needs_cls}, lines)
+        return [(text, float(score)) for text, score in response["result"]]
+
+
+class RemoteLama:
+    """Stand-in for ``SimpleLama``: takes and returns PIL images."""
+
+    def __init__(self, client: ModelServerClient):
+        self._client = client
+
+    def __call__(self, image: Image.Image, mask: Image.Image) -> Image.Image:
+        _, arrays = self._client.call(
+            {"op": "inpaint"},
+            [np.asarray(image.convert("RGB")), np.asarray(mask.convert("L"))],
+        )
+        return Image.fromarray(arrays[0])
+
+
+_client: ModelServerClient | None = None
+
+
+def get_model_client() -> ModelServerClient:
+    global _client
+    if _client is None:
+        _client = ModelServerClient(
+            settings.model_server_socket, settings.model_server_timeout_s
+        )
+    return _client
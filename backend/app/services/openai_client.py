@@ -0,0 +1,206 @@
+"""Process-wide OpenAI client and request pacing.
+
+All translator calls share one ``AsyncOpenAI`` client, so they reuse one
+pool of keep-alive connections instead of opening a client per job. In
+front of it, ``openai_limiter`` keeps calls under the account's
+requests-per-minute and tokens-per-minute limits and adapts how many run
+at once, so a burst of jobs queues here instead of collecting 429s.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import httpx
+import structlog
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from app.core.config import settings
+from app.services.cost_tracker import estimate_tokens
+
+logger = structlog.get_logger()
+
+# Tokens reserved for the reply, as a share of the prompt estimate
+COMPLETION_TOKEN_RATIO = 1.0
+# Pause after a 429 that carries no usable Retry-After (seconds)
+DEFAULT_RATE_LIMIT_PAUSE_S = 1.0
+MAX_RATE_LIMIT_PAUSE_S = 60.0
+
+_client: AsyncOpenAI | None = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """The shared client, created on first use."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            timeout=settings.openai_timeout_s,
+            max_retries=0,  # Translator handles retries
+            http_client=DefaultAsyncHttpxClient(
+                timeout=settings.openai_timeout_s,
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections,
+                    keepalive_expiry=settings.openai_keepalive_expiry_s,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def estimate_request_tokens(*texts: str) -> int:
+    """Tokens to reserve for a call sending ``texts``: the prompt plus its reply."""
+    prompt = sum(estimate_tokens(t) for t in texts)
+    return math.ceil(prompt * (1 + COMPLETION_TOKEN_RATIO))
+
+
+def retry_after_s(headers: Mapping[str, str] | None) -> float | None:
+    """Pause requested by a 429 response's ``retry-after-ms``/``retry-after`` header."""
+    if not headers:
+        return None
+    for name, unit in (("retry-after-ms", 1000), ("retry-after", 1)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) / unit
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """Budget of ``per_minute`` units that refills continuously.
+
+    At most one minute's worth is banked. ``take`` may overdraw the bucket
+    (a request larger than the whole budget, or usage above the estimate);
+    later callers then wait until it has refilled.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units (at most a full bucket) are available."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Spend ``amount`` units; a negative amount gives units back."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class Reservation:
+    """Budget held by one call; set ``used`` to the tokens the API reports."""
+
+    tokens: int
+    used: int | None = None
+
+
+class RateLimiter:
+    """Requests/tokens-per-minute buckets plus an AIMD concurrency limit.
+
+    ``slot(tokens)`` waits, in arrival order, until a request and ``tokens``
+    tokens fit the buckets and fewer than ``limit`` calls are in flight.
+    When the call reports its real usage the token bucket is corrected by
+    the difference. Each success raises the limit by ``1/limit`` (about one
+    per round of calls, up to ``max_concurrency``); a 429 halves it and
+    holds every caller for the server's Retry-After.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._clock = clock
+        self._paused_until = 0.0
+        self._queue = asyncio.Lock()
+        self._released = asyncio.Event()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[Reservation]:
+        await self._acquire(tokens)
+        reservation = Reservation(tokens)
+        try:
+            yield reservation
+        finally:
+            self.in_flight -= 1
+            if reservation.used is not None:
+                self.tokens.take(reservation.used - reservation.tokens)
+            self._released.set()
+
+    async def _acquire(self, tokens: int) -> None:
+        # One waiter at a time: later calls queue on the lock in arrival order
+        async with self._queue:
+            while True:
+                if self.in_flight >= int(self.limit):
+                    self._released.clear()
+                    await self._released.wait()
+                    continue
+                wait = max(
+                    self._paused_until - self._clock(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+
+    def record_success(self) -> None:
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def record_rate_limit(self, retry_after: float | None = None) -> float:
+        """Back off after a 429. Returns the pause applied to all callers (seconds)."""
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        pause = DEFAULT_RATE_LIMIT_PAUSE_S if retry_after is None else retry_after
+        pause = max(0.0, min(MAX_RATE_LIMIT_PAUSE_S, pause))
+        self._paused_until = max(self._paused_until, self._clock() + pause)
+        logger.warning(
+            "openai_client.rate_limited",
+            concurrency_limit=int(self.limit),
+            pause_s=pause,
+        )
+        return pause
+
+
+openai_limiter = RateLimiter(
+    rpm=settings.openai_rpm_limit,
+    tpm=settings.openai_tpm_limit,
+    max_concurrency=settings.openai_max_concurrency,
+)
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+import structlog
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.models.job import Job, JobStatus
+from app.pipeline.balloon_parser import BalloonParser
+from app.pipeline.base import PipelineContext, PipelineStage
+from app.pipeline.chapter_batcher import ChapterBatcher
+from app.pipeline.detector import TextDetector
+from app.pipeline.inpainter import Inpainter
+from app.pipeline.ocr_engine import OcrEngine
+from app.pipeline.orchestrator import PipelineOrchestrator
+from app.pipeline.panel_segmenter import PanelSegmenter
+from app.pipeline.postprocessor import Postprocessor
+from app.pipeline.preprocessor import Preprocessor
+from app.pipeline.translation_mapper import TranslationMapper
+from app.pipeline.translation_prep import PROMPT_VERSION, TranslationPrep
+from app.pipeline.translator import Translator
+from app.pipeline.typesetter import Typesetter
+from app.services.admission import pipeline_admission
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.cost_tracker import CostTracker
+from app.services.job_service import update_job_status
+from app.utils.security import get_job_result_path
+
+logger = structlog.get_logger()
+
+# Bump when a stage change alters results; cached results from other
+# revisions are not reused
+PIPELINE_REVISION = "3"
+
+# Shared circuit breaker instances
+openai_circuit_breaker = CircuitBreaker("openai", failure_threshold=5, recovery_timeout_s=60)
+
+
+def build_stages(batcher: ChapterBatcher | None = None) -> list[PipelineStage]:
+    """Create a fresh set of pipeline stages for one page.
+
+    Chapter pages pass the chapter's ``batcher`` so their translations are
+    requested together.
+    """
+    return [
+        Preprocessor(),
+        TextDetector(),
+        PanelSegmenter(),
+        BalloonParser(),
+        OcrEngine(),
+        TranslationPrep(),
+        Translator(circuit_breaker=openai_circuit_breaker, batcher=batcher),
+        TranslationMapper(),
+        Inpainter(),
+        Typesetter(),
+        Postprocessor(),
+    ]
+
+
+def pipeline_version() -> str:
+    """Identifies everything that determines a page's result, for the result cache."""
+    return f"{PIPELINE_REVISION}/{settings.openai_model}/prompt-{PROMPT_VERSION}"
+
+
+def load_original_image(job_id: uuid.UUID, page: int | None = None) -> np.ndarray | None:
+    """Load the original upload stored by the API for a queued job (or chapter page)."""
+    original_path = get_job_result_path(
+        settings.result_dir, job_id, original=True, check_exists=False, page=page
+    )
+    return cv2.imread(str(original_path), cv2.IMREAD_UNCHANGED)
+
+
+async def run_pipeline(job_id: uuid.UUID, image: np.ndarray) -> None:
+    """Execute the full translation pipeline for one job."""
+    async with async_session_factory() as db:
+        try:
+            await update_job_status(db, job_id, JobStatus.PROCESSING)
+            await db.commit()
+
+            cost_tracker = CostTracker(
+                job_id, db, max_cost_krw=settings.max_cost_per_page_krw
+            )
+
+            orchestrator = PipelineOrchestrator(build_stages(), cost_tracker)
+            ctx = PipelineContext(job_id=job_id, original_image=image)
+            del image  # the orchestrator frees the original once preprocessed
+            ctx = await orchestrator.run(ctx)
+
+            # Save result image
+            result_bytes = ctx.metadata.get("result_bytes")
+            if result_bytes:
+                result_path = os.path.join(settings.result_dir, f"{job_id}.png")
+                with open(result_path, "wb") as f:
+                    f.write(result_bytes)
+
+            # Collect warnings from pipeline
+            warnings = ctx.metadata.get("warnings", [])
+
+            # Determine outcome based on translation results
+            total_regions = len(ctx.regions) if ctx.regions else 0
+            mapped_translations = len(ctx.translations) if ctx.translations else 0
+
+            if total_regions > 0 and mapped_translations == 0:
+                await update_job_status(
+                    db,
+                    job_id,
+                    JobStatus.FAILED,
+                    error_message=(
+                        "Translation failed: no text regions were successfully translated."
+                    ),
+                )
+            else:
+                await update_job_status(db, job_id, JobStatus.COMPLETED)
+
+            # Persist warnings
+            if warnings:
+                result = await db.execute(select(Job).where(Job.id == job_id))
+                job = result.scalar_one()
+                job.warnings_json = json.dumps(warnings, ensure_ascii=False)
+
+            await db.commit()
+            logger.info("pipeline.job_completed", job_id=str(job_id))
+
+        except Exception as e:
+            logger.error("pipeline.job_failed", job_id=str(job_id), error=str(e))
+            await update_job_status(
+                db, job_id, JobStatus.FAILED, error_message=str(e)[:500]
+            )
+            await db.commit()
+
+
+async def run_admitted_pipeline(job_id: uuid.UUID, image: np.ndarray) -> None:
+    """Run a job admitted by ``pipeline_admission.reserve()`` once a slot is free."""
+    async with pipeline_admission.slot():
+        await run_pipeline(job_id, image)
+
+
+@dataclass
+class PageOutcome:
+    """Result of one chapter page run."""
+
+    page: int
+    success: bool
+    cost_krw: float = 0.0
+    warnings: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+async def _run_page(
+    job_id: uuid.UUID, page: int, batcher: ChapterBatcher | None = None
+) -> PageOutcome:
+    """Run the pipeline for one chapter page in its own session.
+
+    The page original is loaded from disk here, so only pages that hold a
+    concurrency slot have a decoded image in memory.
+    """
+    loop = asyncio.get_event_loop()
+    image = await loop.run_in_executor(None, load_original_image, job_id, page)
+    if image is None:
+        return PageOutcome(page=page, success=False, error="Original page not found")
+
+    async with async_session_factory() as db:
+        cost_tracker = CostTracker(
+            job_id, db, max_cost_krw=settings.max_cost_per_page_krw, page=page
+        )
+        orchestrator = PipelineOrchestrator(
+            build_stages(batcher), cost_tracker, report_progress=False
+        )
+        ctx = PipelineContext(job_id=job_id, original_image=image)
+        del image
+        try:
+            ctx = await orchestrator.run(ctx)
+        except Exception as e:
+            # Keep the failed stage log for this page
+            await db.commit()
+            logger.error("pipeline.page_failed", job_id=str(job_id), page=page, error=str(e))
+            return PageOutcome(
+                page=page,
+                success=False,
+                cost_krw=cost_tracker.accumulated_krw,
+                error=str(e)[:500],
+            )
+        await db.commit()
+
+    result_bytes = ctx.metadata.get("result_bytes")
+    if result_bytes:
+        result_path = get_job_result_path(
+            settings.result_dir, job_id, check_exists=False, page=page
+        )
+        with open(result_path, "wb") as f:
+            f.write(result_bytes)
+
+    total_regions = len(ctx.regions) if ctx.regions else 0
+    mapped_translations = len(ctx.translations) if ctx.translations else 0
+    if total_regions > 0 and mapped_translations == 0:
+        return PageOutcome(
+            page=page,
+            success=False,
+            cost_krw=cost_tracker.accumulated_krw,
+            error="no text regions were successfully translated",
+        )
+
+    return PageOutcome(
+        page=page,
+        success=True,
+        cost_krw=cost_tracker.accumulated_krw,
+        warnings=list(ctx.metadata.get("warnings", [])),
+    )
+
+
+async def _set_current_stage(job_id: uuid.UUID, stage: str) -> None:
+    try:
+        async with async_session_factory() as db:
+            result = await db.execute(select(Job).where(Job.id == job_id))
+            result.scalar_one().current_stage = stage
+            await db.commit()
+    except Exception as e:
+        logger.warning("pipeline.progress_update_failed", job_id=str(job_id), error=str(e))
+
+
+async def run_chapter_pipeline(job_id: uuid.UUID, page_count: int) -> None:
+    """Execute the pipeline for every page of a chapter job.
+
+    Pages run concurrently up to ``chapter_page_concurrency``. A failed page
+    becomes a warning; the job only fails when no page succeeds.
+    """
+    total_start = time.monotonic()
+    async with async_session_factory() as db:
+        await update_job_status(db, job_id, JobStatus.PROCESSING)
+        await db.commit()
+
+    semaphore = asyncio.Semaphore(max(1, settings.chapter_page_concurrency))
+    finished = 0
+    batcher = None
+    if settings.chapter_translation_batching and page_count > 1:
+        batcher = ChapterBatcher(
+            # Chapter jobs are not interactive; hedge costs could not be split per page
+            Translator(circuit_breaker=openai_circuit_breaker, hedging=False).complete,
+            max_tokens=settings.chapter_batch_max_tokens,
+            max_pages=settings.chapter_batch_max_pages,
+            max_wait_ms=settings.chapter_batch_max_wait_ms,
+            job_id=str(job_id),
+        )
+
+    async def run_one(page: int) -> PageOutcome:
+        nonlocal finished
+        async with semaphore:
+            outcome = await _run_page(job_id, page, batcher)
+        finished += 1
+        await _set_current_stage(job_id, f"page {finished}/{page_count}")
+        return outcome
+
+    results = await asyncio.gather(
+        *(run_one(page) for page in range(1, page_count + 1)),
+        return_exceptions=True,
+    )
+
+    outcomes: list[PageOutcome] = []
+    for page, result in enumerate(results, start=1):
+        if isinstance(result, BaseException):
+            logger.error("pipeline.page_crashed", job_id=str(job_id), page=page, error=str(result))
+            result = PageOutcome(page=page, success=False, error=str(result)[:500])
+        outcomes.append(result)
+
+    warnings: list[str] = []
+    for outcome in outcomes:
+        if not outcome.success:
+            warnings.append(f"Page {outcome.page}: failed ({outcome.error})")
+        warnings.extend(f"Page {outcome.page}: {w}" for w in outcome.warnings)
+
+    succeeded = sum(1 for outcome in outcomes if outcome.success)
+    async with async_session_factory() as db:
+        if succeeded == 0:
+            await update_job_status(
+                db,
+                job_id,
+                JobStatus.FAILED,
+                error_message="Translation failed: no pages were successfully translated.",
+            )
+        else:
+            await update_job_status(db, job_id, JobStatus.COMPLETED)
+
+        result = await db.execute(select(Job).where(Job.id == job_id))
+        job = result.scalar_one()
+        # Page trackers each finalize with their own totals; store the chapter sum
+        job.total_cost_krw = sum(outcome.cost_krw for outcome in outcomes)
+        job.processing_time_ms = int((time.monotonic() - total_start) * 1000)
+        if warnings:
+            job.warnings_json = json.dumps(warnings, ensure_ascii=False)
+        await db.commit()
+
+    logger.info(
+        "pipeline.chapter_completed",
+        job_id=str(job_id),
+        pages=page_count,
+        succeeded=succeeded,
+    )
+
+
+async def run_admitted_chapter_pipeline(job_id: uuid.UUID, page_count: int) -> None:
+    """Run an admitted chapter job; the whole chapter holds one pipeline slot."""
+    async with pipeline_admission.slot():
+        await run_chapter_pipeline(job_id, page_count)
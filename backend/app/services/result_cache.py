@@ -0,0 +1,57 @@
+"""Whole-page result cache: serve re-uploads of an already translated image.
+
+Entries are completed jobs with a ``content_hash``. Their lifetime follows
+the result files: ``_cleanup_old_results`` deletes files by mtime and then
+clears the hash of those jobs, and every cache hit refreshes the files'
+mtime so frequently re-uploaded pages stay cached.
+"""
+
+import os
+import time
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job
+from app.services.job_service import find_cached_jobs
+from app.utils.security import get_job_result_path
+
+logger = structlog.get_logger()
+
+
+def _result_files(job: Job) -> list[str]:
+    return [
+        str(get_job_result_path(settings.result_dir, job.id, original=original, check_exists=False))
+        for original in (False, True)
+    ]
+
+
+def _is_servable(job: Job) -> bool:
+    """Both files exist and will not be cleaned up in the next few minutes."""
+    cutoff = time.time() - (
+        settings.result_ttl_hours * 3600 - settings.result_cache_min_remaining_minutes * 60
+    )
+    try:
+        return all(os.path.getmtime(path) > cutoff for path in _result_files(job))
+    except OSError:
+        return False
+
+
+def _touch(job: Job) -> None:
+    for path in _result_files(job):
+        try:
+            os.utime(path)
+        except OSError as e:
+            logger.warning("result_cache.touch_failed", file=path, error=str(e))
+
+
+async def find_cached_result(
+    db: AsyncSession, content_hash: str, pipeline_version: str
+) -> Job | None:
+    """Return a completed job whose result can be reused, refreshing its TTL."""
+    for job in await find_cached_jobs(db, content_hash, pipeline_version):
+        if _is_servable(job):
+            _touch(job)
+            return job
+    return None
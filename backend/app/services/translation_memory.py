@@ -0,0 +1,147 @@
+"""Translation memory: reuse earlier translations of the same source line.
+
+Entries live in the ``translation_memory`` table with an in-process LRU in
+front. Lookups and writes use their own short sessions so they never
+contend with the pipeline's session, and database errors only cost cache
+hits, never the job.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import structlog
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.models.translation_memory import TranslationMemory
+from app.services.cost_tracker import estimate_tokens
+
+logger = structlog.get_logger()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_source_text(text: str) -> str:
+    """NFKC-normalise and collapse whitespace (OCR line breaks vary between scans)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def memory_key(text: str, model: str, prompt_version: str) -> str:
+    payload = f"{model}\x1f{prompt_version}\x1f{normalize_source_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class MemoryEntry:
+    translated_text: str
+    tokens: int  # estimated tokens a fresh translation of this line costs
+
+
+class TranslationMemoryCache:
+    def __init__(
+        self,
+        max_entries: int,
+        session_factory: async_sessionmaker[AsyncSession] = async_session_factory,
+    ):
+        self.max_entries = max(0, max_entries)
+        self._session_factory = session_factory
+        self._lru: OrderedDict[str, MemoryEntry] = OrderedDict()
+
+    def _remember(self, key: str, entry: MemoryEntry) -> None:
+        if self.max_entries == 0:
+            return
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def lookup(
+        self, texts: list[str], model: str, prompt_version: str
+    ) -> dict[str, MemoryEntry]:
+        """Return cached entries for ``texts``, keyed by the original text."""
+        keys = {text: memory_key(text, model, prompt_version) for text in texts}
+        found: dict[str, MemoryEntry] = {}
+        missing: dict[str, list[str]] = {}
+        for text, key in keys.items():
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                found[text] = entry
+            else:
+                missing.setdefault(key, []).append(text)
+
+        try:
+            async with self._session_factory() as db:
+                if missing:
+                    result = await db.execute(
+                        select(TranslationMemory).where(TranslationMemory.key.in_(missing))
+                    )
+                    for row in result.scalars().all():
+                        entry = MemoryEntry(row.translated_text, row.tokens)
+                        self._remember(row.key, entry)
+                        for text in missing[row.key]:
+                            found[text] = entry
+
+                hit_keys = {keys[text] for text in found}
+                if hit_keys:
+                    await db.execute(
+                        update(TranslationMemory)
+                        .where(TranslationMemory.key.in_(hit_keys))
+                        .values(
+                            hit_count=TranslationMemory.hit_count + 1,
+                            last_used_at=datetime.now(timezone.utc),
+                        )
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.warning("translation_memory.lookup_failed", error=str(e))
+
+        return found
+
+    async def store(
+        self, pairs: dict[str, str], model: str, prompt_version: str
+    ) -> None:
+        """Save fresh translations (source text -> translated text)."""
+        rows: dict[str, TranslationMemory] = {}
+        for source, translated in pairs.items():
+            if not source.strip() or not translated.strip():
+                continue
+            key = memory_key(source, model, prompt_version)
+            tokens = estimate_tokens(source) + estimate_tokens(translated)
+            self._remember(key, MemoryEntry(translated, tokens))
+            rows[key] = TranslationMemory(
+                key=key,
+                source_text=normalize_source_text(source),
+                translated_text=translated,
+                model=model,
+                prompt_version=prompt_version,
+                tokens=tokens,
+                hit_count=0,
+            )
+        if not rows:
+            return
+
+        try:
+            async with self._session_factory() as db:
+                result = await db.execute(
+                    select(TranslationMemory.key).where(TranslationMemory.key.in_(rows))
+                )
+                existing = set(result.scalars().all())
+                db.add_all(row for key, row in rows.items() if key not in existing)
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Another job stored the same line concurrently; first write wins
+                    await db.rollback()
+        except Exception as e:
+            logger.warning("translation_memory.store_failed", error=str(e))
+
+
+translation_memory = TranslationMemoryCache(settings.translation_memory_lru_size)
@@ -0,0 +1,109 @@
+"""Streaming page extraction for chapter archives (CBZ/ZIP)."""
+
+import os
+import re
+import zipfile
+from collections.abc import Iterator
+from typing import IO
+
+import structlog
+from fastapi import HTTPException
+
+logger = structlog.get_logger()
+
+# Archive formats accepted by the chapter endpoint.
+# CBR (RAR) needs the external unrar tool, which the image does not ship.
+SUPPORTED_ARCHIVE_EXTENSIONS = {"cbz", "zip"}
+
+# Member extensions treated as pages; content is still validated per page
+PAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+_READ_CHUNK = 64 * 1024
+
+
+def _natural_key(name: str) -> list:
+    """Sort key so that page2.png comes before page10.png."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def open_archive(fileobj: IO[bytes]) -> zipfile.ZipFile:
+    """Open a seekable upload as a ZIP archive without reading it into memory.
+
+    Raises:
+        HTTPException: If the file is not a valid ZIP archive
+    """
+    try:
+        return zipfile.ZipFile(fileobj)
+    except (zipfile.BadZipFile, OSError) as e:
+        logger.warning("archive.open_failed", error=str(e))
+        raise HTTPException(status_code=400, detail="File is not a valid CBZ/ZIP archive")
+
+
+def list_archive_pages(archive: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """Return image members in natural reading order, skipping metadata entries."""
+    pages = []
+    for info in archive.infolist():
+        name = info.filename
+        basename = os.path.basename(name)
+        if info.is_dir() or not basename:
+            continue
+        # macOS resource forks and hidden files
+        if name.startswith("__MACOSX/") or basename.startswith("."):
+            continue
+        if os.path.splitext(basename)[1].lower() not in PAGE_EXTENSIONS:
+            continue
+        pages.append(info)
+    pages.sort(key=lambda info: _natural_key(info.filename))
+    return pages
+
+
+def read_archive_member(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int
+) -> bytes:
+    """Decompress one member, enforcing the size limit on actual output.
+
+    The header's declared size is not trusted (zip bombs can lie about it).
+
+    Raises:
+        HTTPException: If the member exceeds max_bytes or is corrupt
+    """
+    if info.file_size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Page '{info.filename}' too large. "
+            f"Maximum size: {max_bytes // (1024 * 1024)}MB",
+        )
+
+    chunks: list[bytes] = []
+    total = 0
+    try:
+        with archive.open(info) as member:
+            while True:
+                chunk = member.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Page '{info.filename}' too large. "
+                        f"Maximum size: {max_bytes // (1024 * 1024)}MB",
+                    )
+                chunks.append(chunk)
+    except (zipfile.BadZipFile, RuntimeError, OSError) as e:
+        # RuntimeError covers encrypted members
+        logger.warning("archive.member_read_failed", member=info.filename, error=str(e))
+        raise HTTPException(
+            status_code=400, detail=f"Page '{info.filename}' could not be extracted"
+        )
+    return b"".join(chunks)
+
+
+def iter_archive_pages(
+    archive: zipfile.ZipFile,
+    pages: list[zipfile.ZipInfo],
+    max_page_bytes: int,
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (member name, bytes) one page at a time."""
+    for info in pages:
+        yield info.filename, read_archive_member(archive, info, max_page_bytes)
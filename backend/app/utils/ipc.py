@@ -0,0 +1,110 @@
+"""Framing for the local model-server protocol.
+
+A message is a 4-byte big-endian header length, a JSON header, then the raw
+bytes of each ndarray listed in ``header["arrays"]`` (dtype, shape). Arrays
+are sent as contiguous buffers, never pickled.
+"""
+
+import asyncio
+import json
+import socket
+import struct
+
+import numpy as np
+
+_LENGTH = struct.Struct(">I")
+
+# Upper bound on a JSON header, to reject garbage before allocating
+MAX_HEADER_BYTES = 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised on malformed frames or a closed connection."""
+
+
+def encode_message(header: dict, arrays: list[np.ndarray] | tuple = ()) -> list[bytes]:
+    """Return the frame parts for ``header`` and ``arrays``."""
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    header = dict(header)
+    header["arrays"] = [{"dtype": a.dtype.str, "shape": list(a.shape)} for a in arrays]
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    parts = [_LENGTH.pack(len(header_bytes)), header_bytes]
+    parts.extend(a.data.cast("B") if a.size else b"" for a in arrays)
+    return parts
+
+
+def _decode_header(header_bytes: bytes) -> tuple[dict, list[tuple[np.dtype, tuple, int]]]:
+    try:
+        header = json.loads(header_bytes)
+    except ValueError as e:
+        raise ProtocolError(f"Invalid header: {e}") from e
+    specs = []
+    for spec in header.pop("arrays", []):
+        dtype = np.dtype(spec["dtype"])
+        if dtype.hasobject:
+            raise ProtocolError("Object arrays are not allowed")
+        shape = tuple(int(dim) for dim in spec["shape"])
+        specs.append((dtype, shape, int(np.prod(shape)) * dtype.itemsize))
+    return header, specs
+
+
+def _check_length(length: int) -> None:
+    if length > MAX_HEADER_BYTES:
+        raise ProtocolError(f"Header too large: {length} bytes")
+
+
+# --- blocking sockets (client side, used from executor threads) ---
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ProtocolError("Connection closed")
+        received += count
+    return buffer
+
+
+def send_message(
+    sock: socket.socket, header: dict, arrays: list[np.ndarray] | tuple = ()
+) -> None:
+    for part in encode_message(header, arrays):
+        sock.sendall(part)
+
+
+def recv_message(sock: socket.socket) -> tuple[dict, list[np.ndarray]]:
+    (length,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    _check_length(length)
+    header, specs = _decode_header(bytes(_recv_exactly(sock, length)))
+    arrays = [
+        np.frombuffer(_recv_exactly(sock, nbytes), dtype=dtype).reshape(shape)
+        for dtype, shape, nbytes in specs
+    ]
+    return header, arrays
+
+
+# --- asyncio streams (server side) ---
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[dict, list[np.ndarray]]:
+    try:
+        (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+        _check_length(length)
+        header, specs = _decode_header(await reader.readexactly(length))
+        arrays = []
+        for dtype, shape, nbytes in specs:
+            data = bytearray(await reader.readexactly(nbytes))
+            arrays.append(np.frombuffer(data, dtype=dtype).reshape(shape))
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError("Connection closed") from e
+    return header, arrays
+
+
+async def write_message(
+    writer: asyncio.StreamWriter, header: dict, arrays: list[np.ndarray] | tuple = ()
+) -> None:
+    writer.writelines(encode_message(header, arrays))
+    await writer.drain()
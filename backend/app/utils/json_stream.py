@@ -0,0 +1,79 @@
+"""Incremental parsing of streamed JSON responses."""
+
+import json
+from typing import Any
+
+
+class JsonArrayStream:
+    """Yields the objects of one array in a JSON response as soon as each is complete.
+
+    Feed the response text in pieces as it streams in; ``feed`` returns the
+    objects of the top-level ``key`` array (e.g. ``{"translations": [...]}``)
+    whose closing brace arrived in that piece. Only the token structure is
+    tracked (strings, escapes, nesting), so each object is decoded once and
+    the text is scanned once overall.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._array_depth: int | None = None  # depth inside the ``key`` array
+        self._item_start: int | None = None
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.text += chunk
+        text = self.text
+        items = []
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch in "{[":
+                if self._depth == 1 and ch == "[" and self._last_key == self.key:
+                    self._array_depth = 2
+                elif self._depth == self._array_depth and ch == "{":
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == self._array_depth and self._item_start is not None:
+                    item = self._decode(text[self._item_start:i + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+                elif self._array_depth is not None and self._depth < self._array_depth:
+                    self._array_depth = None
+        self._pos = len(text)
+        return items
+
+    @staticmethod
+    def _decode(fragment: str) -> dict[str, Any] | None:
+        try:
+            item = json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    def complete(self) -> bool:
+        """True once the text fed so far is one valid JSON document."""
+        try:
+            json.loads(self.text)
+        except json.JSONDecodeError:
+            return False
+        return True
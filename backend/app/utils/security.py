@@ -60,6 +60,7 @@ def get_job_result_path(
     *,
     original: bool = False,
     check_exists: bool = True,
+    page: int | None = None,
 ) -> Path:
     """
     Get the safe file path for a job result or original image.
@@ -69,6 +70,7 @@ def get_job_result_path(
         job_id: The job UUID
         original: If True, return path to original image
         check_exists: If True, verify the file exists
+        page: 1-based page number for multi-page (chapter) jobs
 
     Returns:
         Validated Path object
@@ -77,7 +79,8 @@ def get_job_result_path(
         HTTPException: If path is invalid or file not found
     """
     suffix = "_original" if original else ""
-    filename = f"{job_id}{suffix}.png"
+    page_part = f"_p{page:03d}" if page is not None else ""
+    filename = f"{job_id}{page_part}{suffix}.png"
 
     return validate_safe_path(
         result_dir,
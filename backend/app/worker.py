@@ -0,0 +1,221 @@
+"""Standalone pipeline worker.
+
+Claims PENDING jobs from the ``jobs`` table with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and runs them, so API nodes and CPU-heavy worker nodes can be
+scaled independently. Requires ``JOB_QUEUE_ENABLED=true`` on the API side.
+
+Usage:
+    python -m app.worker --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import structlog
+
+from app.core.config import settings
+from app.core.database import async_session_factory, engine
+from app.models.job import JobStatus
+from app.services.job_service import (
+    claim_next_job,
+    heartbeat_job,
+    requeue_stale_jobs,
+    update_job_status,
+)
+from app.services.openai_client import close_openai_client
+from app.services.pipeline_runner import (
+    load_original_image,
+    run_chapter_pipeline,
+    run_pipeline,
+)
+
+structlog.configure(
+    wrapper_class=structlog.make_filtering_bound_logger(
+        logging.getLevelName(settings.log_level.upper())
+    ),
+)
+logger = structlog.get_logger()
+
+
+class JobWorker:
+    """Runs up to ``concurrency`` pipelines at once from the durable job queue."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval_s: float,
+        worker_id: str | None = None,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval_s = poll_interval_s
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; in-flight jobs are allowed to finish."""
+        logger.info("worker.stopping", worker_id=self.worker_id)
+        self._stopping.set()
+
+    async def _claim(self):
+        async with async_session_factory() as db:
+            job = await claim_next_job(db, self.worker_id)
+            await db.commit()
+            return job
+
+    async def _heartbeat(self, job_id) -> None:
+        """Refresh the job's claim until cancelled, so it is not requeued mid-run."""
+        interval = settings.job_claim_timeout_s / 4
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with async_session_factory() as db:
+                    claimed = await heartbeat_job(db, job_id, self.worker_id)
+                    await db.commit()
+                if not claimed:
+                    logger.warning("worker.claim_lost", job_id=str(job_id))
+                    return
+            except Exception as e:
+                logger.error("worker.heartbeat_failed", job_id=str(job_id), error=str(e))
+
+    async def _process(self, job) -> None:
+        if job.page_count > 1:
+            # Chapter pages are loaded from disk one at a time by the runner
+            await run_chapter_pipeline(job.id, job.page_count)
+            return
+
+        image = await asyncio.get_event_loop().run_in_executor(
+            None, load_original_image, job.id
+        )
+        if image is None:
+            logger.error("worker.original_missing", job_id=str(job.id))
+            async with async_session_factory() as db:
+                await update_job_status(
+                    db, job.id, JobStatus.FAILED, error_message="Original image not found"
+                )
+                await db.commit()
+            return
+
+        await run_pipeline(job.id, image)
+
+    async def _slot_loop(self, slot: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error("worker.claim_failed", slot=slot, error=str(e))
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(
+                "worker.job_claimed",
+                job_id=str(job.id),
+                attempt=job.attempts,
+                slot=slot,
+                worker_id=self.worker_id,
+            )
+            heartbeat = asyncio.create_task(self._heartbeat(job.id))
+            try:
+                await self._process(job)
+            except Exception as e:
+                # run_pipeline records its own failures; this guards the loop itself
+                logger.error("worker.job_crashed", job_id=str(job.id), error=str(e))
+            finally:
+                heartbeat.cancel()
+
+    async def _requeue_loop(self) -> None:
+        """Periodically requeue jobs whose worker died mid-run."""
+        interval = max(settings.job_claim_timeout_s / 4, self.poll_interval_s)
+        while not self._stopping.is_set():
+            try:
+                async with async_session_factory() as db:
+                    count = await requeue_stale_jobs(
+                        db, settings.job_claim_timeout_s, settings.job_max_attempts
+                    )
+                    await db.commit()
+                if count:
+                    logger.warning("worker.requeued_stale_jobs", count=count)
+            except Exception as e:
+                logger.error("worker.requeue_failed", error=str(e))
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> None:
+        logger.info(
+            "worker.started",
+            worker_id=self.worker_id,
+            concurrency=self.concurrency,
+        )
+        await asyncio.gather(
+            self._requeue_loop(),
+            *(self._slot_loop(slot) for slot in range(self.concurrency)),
+        )
+        logger.info("worker.stopped", worker_id=self.worker_id)
+
+
+def _preload_models() -> None:
+    from app.pipeline.inpainter import get_shared_lama
+    from app.pipeline.ocr_engine import get_shared_ocr
+
+    for name, loader in (("ocr", get_shared_ocr), ("lama", get_shared_lama)):
+        try:
+            loader()
+            logger.info("worker.model_ready", model=name)
+        except Exception as e:
+            logger.error("worker.model_preload_failed", model=name, error=str(e))
+
+
+def _preload_font_metrics() -> None:
+    from app.pipeline.typesetter import preload_font_metrics
+
+    try:
+        sizes = preload_font_metrics()
+        logger.info("worker.glyph_metrics_ready", sizes=sizes)
+    except Exception as e:
+        logger.error("worker.glyph_metrics_failed", error=str(e))
+
+
+async def _main(concurrency: int) -> None:
+    worker = JobWorker(concurrency, settings.worker_poll_interval_s)
+
+    loop = asyncio.get_event_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    if settings.preload_models:
+        await loop.run_in_executor(None, _preload_models)
+    if settings.preload_glyph_metrics:
+        await loop.run_in_executor(None, _preload_font_metrics)
+
+    try:
+        await worker.run()
+    finally:
+        await close_openai_client()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline job worker.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Number of pipelines to run at once (default: WORKER_CONCURRENCY)",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(max(1, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Peak memory of one page through the CPU stages of the pipeline.
+
+Runs preprocessing, detection, balloon parsing, inpainting (fast path),
+mapping, typesetting and encoding on a synthetic page in a fresh process
+and reports how much the job raised peak RSS above the warmed-up process.
+OCR and translation are replaced by a stub, so no models or API key are
+needed.
+
+Usage (from backend/):
+    python -m benchmarks.memory_per_job --width 1400 --height 2000
+    python -m benchmarks.memory_per_job --compare   # with vs without buffer release
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import uuid
+
+# Settings validation needs these; the benchmark touches neither
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder-key")
+
+
+def _synthetic_page(width: int, height: int):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    img = np.full((height, width, 3), 235, dtype=np.uint8)
+    for _ in range(max(4, width * height // 250_000)):
+        w, h = int(rng.integers(160, 320)), int(rng.integers(120, 240))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        img[y:y + h, x:x + w] = 255  # balloon
+        for line in range(3):
+            ly = y + 30 + line * 40
+            if ly + 18 < y + h:
+                img[ly:ly + 18, x + 30:x + w - 30] = 20  # text line
+    return img
+
+
+def _run_job(width: int, height: int, release_buffers: bool) -> dict:
+    from unittest.mock import AsyncMock, MagicMock
+
+    from app.core.config import settings
+    from app.pipeline.balloon_parser import BalloonParser
+    from app.pipeline.base import PipelineContext, PipelineStage
+    from app.pipeline.detector import TextDetector
+    from app.pipeline.inpainter import Inpainter
+    from app.pipeline.orchestrator import PipelineOrchestrator
+    from app.pipeline.panel_segmenter import PanelSegmenter
+    from app.pipeline.postprocessor import Postprocessor
+    from app.pipeline.preprocessor import Preprocessor
+    from app.pipeline.translation_mapper import TranslationMapper
+    from app.pipeline.typesetter import Typesetter
+
+    class StubTranslation(PipelineStage):
+        name = "stub_translation"
+        reads = frozenset({"regions"})
+        writes = frozenset({"metadata.raw_translations"})
+
+        async def process(self, ctx):
+            ctx.metadata["raw_translations"] = [
+                {"id": rid, "text": "벤치마크용 번역 문장입니다"}
+                for rid in ctx.regions.ids.tolist()
+            ]
+            return ctx
+
+    settings.inpaint_fast_path = True
+    inpainter = Inpainter()
+    inpainter._lama = MagicMock(side_effect=RuntimeError("no LaMa in benchmark"))
+
+    def stages():
+        return [
+            Preprocessor(),
+            TextDetector(),
+            PanelSegmenter(),
+            BalloonParser(),
+            StubTranslation(),
+            TranslationMapper(),
+            inpainter,
+            Typesetter(),
+            Postprocessor(),
+        ]
+
+    tracker = MagicMock(record_stage=AsyncMock(), finalize=AsyncMock(), accumulated_krw=0.0)
+
+    async def run(image):
+        orchestrator = PipelineOrchestrator(
+            stages(), tracker, report_progress=False, release_buffers=release_buffers
+        )
+        ctx = PipelineContext(job_id=uuid.uuid4(), original_image=image)
+        del image
+        ctx = await orchestrator.run(ctx)
+        return len(ctx.regions)
+
+    # Warm up imports, thread pools and allocator on a small page first
+    asyncio.run(run(_synthetic_page(400, 400)))
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    regions = asyncio.run(run(_synthetic_page(width, height)))
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "release_buffers": release_buffers,
+        "regions": regions,
+        "baseline_mb": baseline_kb / 1024,
+        "job_peak_mb": (peak_kb - baseline_kb) / 1024,
+    }
+
+
+def _measure(width: int, height: int, release_buffers: bool) -> dict:
+    # A fresh process per measurement: ru_maxrss never goes down
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_run_job, (width, height, release_buffers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure peak RSS of one pipeline job.")
+    parser.add_argument("--width", type=int, default=1400)
+    parser.add_argument("--height", type=int, default=2000)
+    parser.add_argument("--no-release", action="store_true", help="keep every buffer alive")
+    parser.add_argument("--compare", action="store_true", help="run with and without release")
+    args = parser.parse_args()
+
+    modes = [False, True] if args.compare else [not args.no_release]
+    frame_mb = args.width * args.height * 3 / 2**20
+    print(f"page {args.width}x{args.height} ({frame_mb:.1f} MB per BGR frame)")
+    for release in modes:
+        r = _measure(args.width, args.height, release)
+        print(
+            f"release_buffers={r['release_buffers']!s:5}  regions={r['regions']:3d}  "
+            f"job peak +{r['job_peak_mb']:.1f} MB  (process baseline {r['baseline_mb']:.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import io
 import uuid
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import numpy as np
 import pytest
+from PIL import ImageFont
 
 
 @pytest.fixture
@@ -72,3 +74,28 @@ def mock_openai_response():
         return response
 
     return _make
+
+
+@pytest.fixture
+def truetype_font(tmp_path):
+    """Path to a loadable font; ``ImageFont.truetype`` is served by Pillow's
+    built-in scalable font so tests do not depend on system fonts."""
+    from app.pipeline.font_cache import font_cache
+
+    path = str(tmp_path / "font.ttf")
+    with open(path, "wb"):
+        pass
+    font_bytes = ImageFont.load_default(12).font_bytes
+    truetype = ImageFont.truetype
+    loader = MagicMock()
+
+    def load(font, size=10, **kwargs):
+        if font != path:
+            return truetype(font, size, **kwargs)
+        loader(font, size)
+        return truetype(io.BytesIO(font_bytes), size)
+
+    font_cache.clear()
+    with patch("app.pipeline.font_cache.ImageFont.truetype", load):
+        yield path, loader
+    font_cache.clear()
@@ -0,0 +1,93 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models.job import Job, JobStatus
+from app.services.admission import AdmissionController, estimate_retry_after_s
+from app.services.job_service import get_recent_job_duration_ms
+
+
+class TestAdmissionController:
+    def test_reserve_until_capacity(self):
+        controller = AdmissionController(max_in_flight=2, max_queued=1)
+        assert all(controller.reserve() for _ in range(3))
+        assert controller.reserve() is False
+        assert controller.queued == 3
+
+    def test_cancel_reservation_frees_capacity(self):
+        controller = AdmissionController(max_in_flight=1, max_queued=0)
+        assert controller.reserve()
+        assert controller.reserve() is False
+        controller.cancel_reservation()
+        assert controller.reserve()
+
+    @pytest.mark.asyncio
+    async def test_slot_caps_in_flight(self):
+        controller = AdmissionController(max_in_flight=1, max_queued=5)
+        release = asyncio.Event()
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            async with controller.slot():
+                peak = max(peak, controller.in_flight)
+                await release.wait()
+
+        for _ in range(3):
+            assert controller.reserve()
+        tasks = [asyncio.create_task(job()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert controller.in_flight == 1
+        assert controller.queued == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert peak == 1
+        assert controller.in_flight == 0
+        assert controller.queued == 0
+
+
+class TestRetryAfter:
+    def test_scales_with_queue_depth(self):
+        short = estimate_retry_after_s(0, 2, 10_000.0)
+        long = estimate_retry_after_s(9, 2, 10_000.0)
+        assert short == 5  # half a 10 s job
+        assert long == 50
+        assert long > short
+
+    def test_default_without_history(self):
+        from app.core.config import settings
+
+        assert estimate_retry_after_s(0, 1, None) == settings.default_job_duration_s
+
+    def test_clamped(self):
+        assert estimate_retry_after_s(0, 1, 1.0) == 1
+        assert estimate_retry_after_s(10_000, 1, 60_000.0) == 3600
+
+    @pytest.mark.asyncio
+    async def test_job_duration_is_wall_time_of_recent_jobs(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Job.__table__.create)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession)
+        async with session_factory() as db:
+            assert await get_recent_job_duration_ms(db) is None
+            db.add_all(
+                [
+                    Job(status=JobStatus.COMPLETED, processing_time_ms=4000),
+                    Job(status=JobStatus.COMPLETED, processing_time_ms=8000),
+                    # Cache hits and failures do not say how long a run takes
+                    Job(
+                        status=JobStatus.COMPLETED,
+                        processing_time_ms=10,
+                        result_job_id=uuid.uuid4(),
+                    ),
+                    Job(status=JobStatus.FAILED, processing_time_ms=90_000),
+                ]
+            )
+            await db.commit()
+            assert await get_recent_job_duration_ms(db) == 6000.0
+        await engine.dispose()
@@ -0,0 +1,59 @@
+import io
+import uuid
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.archive import list_archive_pages, open_archive, read_archive_member
+from app.utils.security import get_job_result_path
+
+
+def _make_zip(entries: dict[str, bytes]) -> zipfile.ZipFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+class TestArchive:
+    def test_pages_in_natural_order(self):
+        archive = _make_zip({
+            "ch1/page10.png": b"x",
+            "ch1/page2.png": b"x",
+            "ch1/page1.jpg": b"x",
+        })
+        names = [info.filename for info in list_archive_pages(archive)]
+        assert names == ["ch1/page1.jpg", "ch1/page2.png", "ch1/page10.png"]
+
+    def test_skips_metadata_entries(self):
+        archive = _make_zip({
+            "__MACOSX/._page1.png": b"x",
+            ".hidden.png": b"x",
+            "ComicInfo.xml": b"<xml/>",
+            "page1.png": b"x",
+        })
+        names = [info.filename for info in list_archive_pages(archive)]
+        assert names == ["page1.png"]
+
+    def test_member_size_limit(self):
+        archive = _make_zip({"page1.png": b"\0" * 4096})
+        info = archive.getinfo("page1.png")
+        with pytest.raises(HTTPException) as exc:
+            read_archive_member(archive, info, max_bytes=1024)
+        assert exc.value.status_code == 413
+        assert read_archive_member(archive, info, max_bytes=8192) == b"\0" * 4096
+
+    def test_invalid_archive_rejected(self):
+        with pytest.raises(HTTPException) as exc:
+            open_archive(io.BytesIO(b"not a zip"))
+        assert exc.value.status_code == 400
+
+    def test_page_result_path(self, tmp_path):
+        job_id = uuid.uuid4()
+        path = get_job_result_path(
+            tmp_path, job_id, original=True, check_exists=False, page=3
+        )
+        assert path.name == f"{job_id}_p003_original.png"
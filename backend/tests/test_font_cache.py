@@ -0,0 +1,132 @@
+import threading
+from unittest.mock import patch
+
+import numpy as np
+
+from app.core.config import settings
+from app.pipeline.font_cache import PRELOAD_CHARSET, FontCache
+from app.pipeline.regions import MappedTranslation
+from app.pipeline.text_layout import MAX_FONT_SIZE, candidate_sizes
+from app.pipeline.translation_mapper import TranslationMapper
+from app.pipeline.typesetter import Typesetter, preload_font_metrics
+
+
+class TestFontCache:
+    def test_font_is_parsed_once_per_size(self, truetype_font):
+        path, loader = truetype_font
+        cache = FontCache(8)
+
+        first = cache.get_font(path, 20)
+        assert cache.get_font(path, 20) is first
+        assert cache.get_font(path, 24) is not first
+        assert loader.call_count == 2
+        assert cache.hits == 1
+
+    def test_lru_evicts_least_recently_used(self, truetype_font):
+        path, loader = truetype_font
+        cache = FontCache(2)
+
+        cache.get_font(path, 12)
+        cache.get_font(path, 14)
+        cache.get_font(path, 12)  # 14 is now the oldest
+        cache.get_font(path, 16)
+
+        assert len(cache) == 2
+        cache.get_font(path, 12)
+        assert loader.call_count == 3
+        cache.get_font(path, 14)
+        assert loader.call_count == 4
+
+    def test_missing_font_is_not_cached(self, tmp_path):
+        cache = FontCache(8)
+        path = tmp_path / "late.ttf"
+
+        assert cache.get_font(str(path), 20) is None
+        assert len(cache) == 0
+
+    def test_concurrent_loads_share_one_entry(self, truetype_font):
+        path, _ = truetype_font
+        cache = FontCache(8)
+        fonts = []
+
+        threads = [
+            threading.Thread(target=lambda: fonts.append(cache.get_font(path, 20)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len({id(f) for f in fonts}) == 1
+
+    def test_glyph_metrics_match_freetype(self, truetype_font):
+        path, _ = truetype_font
+        cache = FontCache(8)
+        assert cache.preload(path, [18], chars="abc ") == 1
+
+        metrics = cache.get_metrics(path, 18)
+        font = cache.get_font(path, 18)
+        assert len(metrics) == 4
+        for char in "abc 가?":
+            assert metrics.advance(char) == font.getlength(char)
+        assert metrics.measure("ab") == font.getlength("a") + font.getlength("b")
+
+    def test_uniform_hangul_answered_without_freetype(self, truetype_font):
+        path, _ = truetype_font
+        cache = FontCache(8)
+        metrics = cache.get_metrics(path, 20)
+        font = cache.get_font(path, 20)
+        assert metrics.hangul_advance == font.getlength("가")
+
+        with patch.object(font, "getlength", side_effect=AssertionError("measured")):
+            assert metrics.measure("뷁똠") == 2 * metrics.hangul_advance
+        assert "A" in PRELOAD_CHARSET and "ㅋ" in PRELOAD_CHARSET
+
+
+class TestTypesetterFontCache:
+    def test_render_loads_each_size_once(self, truetype_font):
+        path, loader = truetype_font
+        translations = [
+            MappedTranslation(
+                region_id=i,
+                bbox=(10, 10 + i * 60, 200, 60 + i * 60),
+                translated="안녕하세요",
+                font_size=20,
+                lines=["안녕", "하세요"],
+                balloon_info={},
+            )
+            for i in range(5)
+        ]
+        typesetter = Typesetter(font_path=path)
+        image = np.full((400, 300, 3), 255, dtype=np.uint8)
+
+        typesetter._render(image, translations)
+        typesetter._render(image, translations)
+
+        assert loader.call_count == 1
+        assert typesetter._used_fallback_font is False
+
+
+class TestScaledFontSizes:
+    def test_sizes_above_reference_range_are_quantised(self):
+        assert candidate_sizes(12, 40) == list(range(12, 41))
+        sizes = candidate_sizes(36, 120)
+        assert sizes[:5] == [36, 37, 38, 39, 40]
+        assert all(s % 4 == 0 for s in sizes if s > MAX_FONT_SIZE)
+        assert candidate_sizes(130, 131) == [132]
+
+    def test_scaled_page_reuses_preloaded_metrics(self, truetype_font):
+        path, loader = truetype_font
+        with patch.object(settings, "font_path", path):
+            preload_font_metrics()
+        loaded = loader.call_count
+
+        mapper = TranslationMapper(font_path=path)
+        for font_scale in (1.7, 2.6, 3.0):
+            for i, text in enumerate(("안녕", "안녕하세요, 반갑습니다", "네?")):
+                bbox = (0, 0, 150 + 90 * i, 120 + 60 * i)
+                translation, _ = mapper.map_one(i, bbox, text, font_scale)
+                assert translation.font_size in candidate_sizes(12, 120)
+
+        assert loader.call_count == loaded
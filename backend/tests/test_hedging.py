@@ -0,0 +1,198 @@
+import asyncio
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.pipeline.base import PipelineContext
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.hedging import HedgeBudget, LatencyTracker, call_hedged
+
+
+def _tracker(latency_s: float) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(5):
+        tracker.record(latency_s)
+    return tracker
+
+
+class TestLatencyTracker:
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(1.0)
+        assert tracker.percentile(95) is None
+
+    def test_nearest_rank_percentile(self):
+        tracker = LatencyTracker(min_samples=1)
+        for i in range(1, 101):
+            tracker.record(float(i))
+        assert tracker.percentile(50) == 50
+        assert tracker.percentile(95) == 95
+        assert tracker.percentile(100) == 100
+
+
+class TestHedgeBudget:
+    def test_caps_hedge_rate(self):
+        budget = HedgeBudget(max_rate=0.1, burst=1)
+        spent = 0
+        for _ in range(100):
+            budget.on_call()
+            spent += budget.try_spend()
+        assert spent == 10
+
+
+class TestCallHedged:
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        calls = []
+        cancelled = asyncio.Event()
+
+        async def func():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return f"answer {len(calls)}"
+
+        result, hedged = await call_hedged(
+            func, _tracker(0.01), HedgeBudget(max_rate=1.0), percentile=95
+        )
+
+        assert (result, hedged) == ("answer 2", True)
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_latency_is_measured_from_first_call(self):
+        tracker = _tracker(0.05)
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "hedge"
+
+        result, hedged = await call_hedged(
+            slow, tracker, HedgeBudget(max_rate=1.0), percentile=95, hedge=fast
+        )
+
+        assert (result, hedged) == ("hedge", True)
+        # The winning hedge took no time, but the caller waited out the delay
+        assert tracker._samples[-1] >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_budget(self):
+        calls = 0
+
+        async def func():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "slow"
+
+        result, hedged = await call_hedged(
+            func, _tracker(0.01), HedgeBudget(max_rate=0.0), percentile=95
+        )
+
+        assert (result, hedged) == ("slow", False)
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_call_does_not_end_race(self):
+        attempts = 0
+
+        async def func():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                await asyncio.sleep(0.05)
+                raise RuntimeError("backend error")
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        result, hedged = await call_hedged(
+            func, _tracker(0.01), HedgeBudget(max_rate=1.0), percentile=95
+        )
+
+        assert (result, hedged) == ("ok", True)
+
+
+@pytest.mark.asyncio
+async def test_translator_records_hedge_cost(mock_openai_response):
+    from app.pipeline.translator import Translator
+
+    response = mock_openai_response(
+        content=json.dumps({"translations": [{"id": 0, "text": "안녕"}]}),
+        input_tokens=1000,
+        output_tokens=100,
+    )
+    first_call = True
+
+    async def create(**kwargs):
+        nonlocal first_call
+        if first_call:
+            first_call = False
+            await asyncio.sleep(10)
+        return response
+
+    with patch("app.pipeline.translator.get_openai_client"):
+        translator = Translator(circuit_breaker=CircuitBreaker("test"), hedging=True)
+    translator.client = MagicMock()
+    translator.client.chat.completions.create = AsyncMock(side_effect=create)
+
+    ctx = PipelineContext(job_id=uuid.uuid4())
+    ctx.translation_prompt = "Translate."
+    ctx.metadata["translation_entry_count"] = 1
+
+    with (
+        patch("app.pipeline.translator.openai_latency", _tracker(0.01)),
+        patch("app.pipeline.translator.openai_hedge_budget", HedgeBudget(max_rate=1.0)),
+        patch.object(settings, "translation_streaming", False),
+    ):
+        result = await translator.process(ctx)
+
+    details = json.loads(result.metadata["translator_details"])
+    assert details["hedged_requests"] == 1
+    # 1000 prompt tokens twice, 100 completion tokens once
+    expected = (2000 * 0.15 + 100 * 0.60) / 1_000_000 * settings.usd_krw_rate
+    assert result.metadata["translator_cost_krw"] == pytest.approx(expected, rel=0.01)
+
+
+@pytest.mark.asyncio
+async def test_hedge_waits_for_a_limiter_slot(mock_openai_response):
+    from app.pipeline.translator import Translator
+    from app.services.openai_client import RateLimiter
+
+    response = mock_openai_response(
+        content=json.dumps({"translations": [{"id": 0, "text": "안녕"}]})
+    )
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.1)
+        return response
+
+    with patch("app.pipeline.translator.get_openai_client"):
+        translator = Translator(circuit_breaker=CircuitBreaker("test"), hedging=True)
+    translator.client = MagicMock()
+    translator.client.chat.completions.create = AsyncMock(side_effect=create)
+    # One call at a time: the hedge cannot start while the first call runs
+    translator.limiter = RateLimiter(rpm=1000, tpm=1_000_000, max_concurrency=1)
+
+    ctx = PipelineContext(job_id=uuid.uuid4())
+    ctx.translation_prompt = "Translate."
+    ctx.metadata["translation_entry_count"] = 1
+
+    with (
+        patch("app.pipeline.translator.openai_latency", _tracker(0.01)),
+        patch("app.pipeline.translator.openai_hedge_budget", HedgeBudget(max_rate=1.0)),
+        patch.object(settings, "translation_streaming", False),
+    ):
+        result = await translator.process(ctx)
+
+    assert translator.client.chat.completions.create.await_count == 1
+    assert translator.limiter.in_flight == 0
+    assert "hedged_requests" not in json.loads(result.metadata.get("translator_details", "{}"))
@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models.job import Job, JobStatus
+from app.services.job_service import (
+    claim_next_job,
+    claim_next_job_query,
+    get_job,
+    heartbeat_job,
+    requeue_stale_jobs,
+)
+
+
+def _result_with(obj=None, many=None):
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = obj
+    result.scalars.return_value.all.return_value = many or []
+    return result
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Job.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+class TestJobQueue:
+    def test_claim_query_skips_locked_rows(self):
+        sql = str(claim_next_job_query().compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "ORDER BY jobs.created_at" in sql
+
+    @pytest.mark.asyncio
+    async def test_claim_marks_job_processing(self, mock_db_session):
+        job = Job(id=uuid.uuid4(), status=JobStatus.PENDING, attempts=0)
+        mock_db_session.execute.return_value = _result_with(job)
+
+        claimed = await claim_next_job(mock_db_session, "worker-1")
+
+        assert claimed is job
+        assert job.status == JobStatus.PROCESSING
+        assert job.claimed_by == "worker-1"
+        assert job.claimed_at is not None
+        assert job.attempts == 1
+
+    @pytest.mark.asyncio
+    async def test_claim_empty_queue(self, mock_db_session):
+        mock_db_session.execute.return_value = _result_with(None)
+        assert await claim_next_job(mock_db_session, "worker-1") is None
+
+    @pytest.mark.asyncio
+    async def test_requeue_stale_jobs(self, mock_db_session):
+        retry = Job(
+            status=JobStatus.PROCESSING,
+            attempts=1,
+            claimed_by="dead",
+            claimed_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+        exhausted = Job(
+            status=JobStatus.PROCESSING,
+            attempts=3,
+            claimed_by="dead",
+            claimed_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+        mock_db_session.execute.return_value = _result_with(many=[retry, exhausted])
+
+        count = await requeue_stale_jobs(mock_db_session, claim_timeout_s=60, max_attempts=3)
+
+        assert count == 2
+        assert retry.status == JobStatus.PENDING
+        assert retry.claimed_by is None
+        assert exhausted.status == JobStatus.FAILED
+        assert "abandoned" in exhausted.error_message
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_keeps_long_job_claimed(self, session_factory):
+        long_ago = datetime.now(timezone.utc) - timedelta(hours=2)
+        running = Job(
+            status=JobStatus.PROCESSING, attempts=1, claimed_by="live", claimed_at=long_ago
+        )
+        crashed = Job(
+            status=JobStatus.PROCESSING, attempts=1, claimed_by="dead", claimed_at=long_ago
+        )
+        async with session_factory() as db:
+            db.add_all([running, crashed])
+            await db.commit()
+
+        async with session_factory() as db:
+            assert await heartbeat_job(db, running.id, "live")
+            # Another worker cannot refresh a claim it does not hold
+            assert not await heartbeat_job(db, crashed.id, "live")
+            await db.commit()
+
+        async with session_factory() as db:
+            count = await requeue_stale_jobs(db, claim_timeout_s=60, max_attempts=3)
+            await db.commit()
+
+        assert count == 1
+        async with session_factory() as db:
+            assert (await get_job(db, running.id)).status == JobStatus.PROCESSING
+            assert (await get_job(db, crashed.id)).status == JobStatus.PENDING
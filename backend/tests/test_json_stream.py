@@ -0,0 +1,24 @@
+from app.utils.json_stream import JsonArrayStream
+
+
+class TestJsonArrayStream:
+    def test_emits_each_object_when_complete(self):
+        text = '{"translations": [{"id": 0, "text": "a \\" }{"}, {"id": 1, "text": "b", "n": [1]}]}'
+        stream = JsonArrayStream("translations")
+
+        emitted = [stream.feed(text[i:i + 4]) for i in range(0, len(text), 4)]
+
+        items = [item for batch in emitted for item in batch]
+        assert items == [{"id": 0, "text": 'a " }{'}, {"id": 1, "text": "b", "n": [1]}]
+        # The first object is emitted before the rest of the text has arrived
+        first = next(i for i, batch in enumerate(emitted) if batch)
+        assert first * 4 < text.index('{"id": 1')
+        assert stream.complete()
+
+    def test_ignores_other_keys_and_keeps_partial_progress(self):
+        stream = JsonArrayStream("translations")
+
+        items = stream.feed('{"notes": [{"id": 9}], "translations": [{"id": 5, "text": "y"}, {"id"')
+
+        assert items == [{"id": 5, "text": "y"}]
+        assert not stream.complete()
@@ -0,0 +1,135 @@
+import asyncio
+import socket
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.model_server import DynamicBatcher, ModelServer
+from app.services.model_client import ModelServerClient, ModelServerError, RemoteLama, RemoteOcr
+from app.utils.ipc import recv_message, send_message
+
+
+class TestIpc:
+    def test_roundtrip_preserves_arrays(self):
+        left, right = socket.socketpair()
+        image = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        mask = np.ones((4, 5), dtype=np.float32)[:, ::2]  # non-contiguous
+        try:
+            send_message(left, {"op": "test", "text": "日本語"}, [image, mask])
+            header, arrays = recv_message(right)
+        finally:
+            left.close()
+            right.close()
+
+        assert header["op"] == "test"
+        assert header["text"] == "日本語"
+        np.testing.assert_array_equal(arrays[0], image)
+        np.testing.assert_array_equal(arrays[1], mask)
+        assert arrays[1].dtype == np.float32
+
+
+class TestDynamicBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_a_batch(self):
+        batches = []
+
+        def handler(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = DynamicBatcher("test", handler, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+
+    @pytest.mark.asyncio
+    async def test_batch_size_is_capped(self):
+        batches = []
+
+        def handler(items):
+            batches.append(len(items))
+            return items
+
+        batcher = DynamicBatcher("test", handler, max_batch_size=2, max_wait_ms=20)
+        batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+        assert max(batches) == 2
+        assert sum(batches) == 5
+
+    @pytest.mark.asyncio
+    async def test_handler_error_fails_whole_batch(self):
+        def handler(items):
+            raise RuntimeError("model crashed")
+
+        batcher = DynamicBatcher("test", handler, max_batch_size=4, max_wait_ms=10)
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class TestModelServer:
+    @pytest.mark.asyncio
+    async def test_remote_proxies(self, tmp_path):
+        socket_path = str(tmp_path / "models.sock")
+        batchers = {
+            "ocr": DynamicBatcher(
+                "ocr",
+                lambda items: [[[[[0, 0]], ["テスト", 0.9]]] for _ in items],
+                max_batch_size=4,
+                max_wait_ms=5,
+            ),
+            "recognize": DynamicBatcher(
+                "recognize",
+                lambda items: [[("字", 0.8)] * len(lines) for lines, _ in items],
+                max_batch_size=4,
+                max_wait_ms=5,
+            ),
+            "lama": DynamicBatcher(
+                "lama",
+                lambda items: [np.full_like(image, 7) for image, _ in items],
+                max_batch_size=4,
+                max_wait_ms=5,
+            ),
+        }
+        server = ModelServer(socket_path, batchers)
+        await server.start()
+        client = ModelServerClient(socket_path, timeout_s=5)
+        loop = asyncio.get_running_loop()
+        try:
+            ocr_output = await loop.run_in_executor(
+                None, RemoteOcr(client).ocr, np.zeros((10, 10, 3), np.uint8), True
+            )
+            recognized = await loop.run_in_executor(
+                None,
+                RemoteOcr(client).recognize,
+                [np.zeros((48, 96, 3), np.uint8), np.zeros((48, 60, 3), np.uint8)],
+                [True, False],
+            )
+            image = Image.fromarray(np.zeros((8, 16, 3), np.uint8))
+            mask = Image.fromarray(np.zeros((8, 16), np.uint8))
+            inpainted = await loop.run_in_executor(None, RemoteLama(client), image, mask)
+            with pytest.raises(ModelServerError):
+                await loop.run_in_executor(None, client.call, {"op": "unknown"})
+        finally:
+            await server.stop()
+
+        assert ocr_output[0][1] == ["テスト", 0.9]
+        assert recognized == [("字", 0.8), ("字", 0.8)]
+        assert inpainted.size == (16, 8)
+        assert np.asarray(inpainted).max() == 7
@@ -0,0 +1,122 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.openai_client import (
+    RateLimiter,
+    TokenBucket,
+    estimate_request_tokens,
+    retry_after_s,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_refills_at_per_minute_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+        bucket.take(60)
+        assert bucket.wait_time(10) == pytest.approx(10)
+        clock.now = 4
+        assert bucket.wait_time(10) == pytest.approx(6)
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+        assert bucket.wait_time(500) == 0
+        bucket.take(500)
+        # Overdrawn by 440: the next caller waits for the debt and a full bucket
+        assert bucket.wait_time(60) == pytest.approx(500)
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_waits_for_token_budget(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=1000, tpm=60, max_concurrency=4, clock=clock)
+
+        with patch("app.services.openai_client.asyncio.sleep", clock.sleep):
+            async with limiter.slot(60):
+                pass
+            async with limiter.slot(30):
+                pass
+
+        assert clock.now == pytest.approx(30)
+
+    @pytest.mark.asyncio
+    async def test_settles_reservation_with_actual_usage(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=1000, tpm=600, max_concurrency=4, clock=clock)
+
+        async with limiter.slot(400) as reservation:
+            reservation.used = 100
+
+        assert limiter.tokens.level == pytest.approx(500)
+
+    @pytest.mark.asyncio
+    async def test_caps_in_flight_at_limit(self):
+        limiter = RateLimiter(rpm=1000, tpm=100_000, max_concurrency=2)
+        release = asyncio.Event()
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot(10):
+                peak = max(peak, limiter.in_flight)
+                await release.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert limiter.in_flight == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_halves_limit_and_pauses_callers(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=1000, tpm=100_000, max_concurrency=8, clock=clock)
+
+        assert limiter.record_rate_limit(retry_after=5) == 5
+        assert limiter.limit == 4
+        with patch("app.services.openai_client.asyncio.sleep", clock.sleep):
+            async with limiter.slot(10):
+                pass
+        assert clock.now == pytest.approx(5)
+
+    def test_limit_recovers_additively(self):
+        limiter = RateLimiter(rpm=1000, tpm=100_000, max_concurrency=8, min_concurrency=1)
+        for _ in range(5):
+            limiter.record_rate_limit(retry_after=0)
+        assert limiter.limit == 1
+
+        for _ in range(3):
+            limiter.record_success()
+        assert 2 < limiter.limit < 3
+        for _ in range(200):
+            limiter.record_success()
+        assert limiter.limit == 8
+
+
+def test_estimate_request_tokens_reserves_reply():
+    assert estimate_request_tokens("abcdefgh", "こんにちは") == 14
+
+
+def test_retry_after_s():
+    assert retry_after_s({"retry-after-ms": "1500"}) == 1.5
+    assert retry_after_s({"retry-after": "2"}) == 2
+    assert retry_after_s({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert retry_after_s(None) is None
@@ -1,13 +1,30 @@
+import asyncio
+import json
 import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import numpy as np
 import pytest
+from PIL import Image
 
-from app.pipeline.base import PipelineContext
+from app.core.config import settings
+from app.pipeline.base import PipelineContext, PipelineStage
 from app.pipeline.preprocessor import Preprocessor
-from app.pipeline.detector import TextDetector
-from app.pipeline.balloon_parser import BalloonParser
+from app.pipeline.detector import TextDetector, merge_boxes
+from app.pipeline.balloon_parser import BalloonParser, fill_holes
+from app.pipeline.inpainter import LAMA_STRIDE, Inpainter, build_text_mask, plan_crops
+from app.pipeline.ocr_engine import OcrEngine, split_text_lines
+from app.pipeline.orchestrator import PipelineOrchestrator
+from app.pipeline.panel_segmenter import PanelSegmenter, assign_panels, xy_cut
+from app.pipeline.postprocessor import Postprocessor
+from app.pipeline.pyramid import box_to_full, detection_scale
+from app.pipeline.regions import RegionTable
 from app.pipeline.translation_mapper import TranslationMapper
+from app.pipeline.translation_prep import TranslationPrep
+from app.pipeline.translator import Translator
+from app.pipeline.typesetter import Typesetter
+from app.pipeline.webtoon import merge_slice_boxes, plan_slices
+from app.schemas.pipeline import DetectedRegion
 
 
 @pytest.fixture
@@ -28,17 +45,33 @@ class TestPreprocessor:
         assert result.preprocessed_image.shape == sample_image.shape
 
     @pytest.mark.asyncio
-    async def test_resize_large_image(self, make_context):
-        # Create oversized image
+    async def test_large_image_keeps_native_resolution(self, make_context):
         large_img = np.full((4000, 3000, 3), 128, dtype=np.uint8)
         ctx = make_context(large_img)
         preprocessor = Preprocessor()
         result = await preprocessor.process(ctx)
 
-        assert result.preprocessed_image is not None
+        assert result.preprocessed_image.shape == large_img.shape
+        assert result.metadata["font_scale"] == 1.5
+        assert max(result.derived("detect_gray").shape) == settings.detection_max_side
+
+    @pytest.mark.asyncio
+    async def test_resize_above_pixel_cap(self, make_context):
+        large_img = np.full((4000, 3000, 3), 128, dtype=np.uint8)
+        with patch.object(settings, "max_image_pixels", 3_000_000):
+            result = await Preprocessor().process(make_context(large_img))
+
         h, w = result.preprocessed_image.shape[:2]
-        assert w <= 2000
-        assert h <= 3000
+        assert h * w <= 3_000_000
+        assert (h, w) == (2000, 1500)
+
+    @pytest.mark.asyncio
+    async def test_webtoon_strip_keeps_working_width(self, make_context):
+        strip = np.full((20000, 800, 3), 128, dtype=np.uint8)
+        result = await Preprocessor().process(make_context(strip))
+        assert result.preprocessed_image.shape == strip.shape
+        assert result.metadata["font_scale"] == 1.0
+        assert result.derived("detect_gray").shape == strip.shape[:2]
 
     @pytest.mark.asyncio
     async def test_grayscale_conversion(self, make_context):
@@ -79,7 +112,7 @@ class TestDetector:
         result = await detector.process(ctx)
 
         assert len(result.regions) > 0
-        for region in result.regions:
+        for region in result.regions.to_models():
             x1, y1, x2, y2 = region.bbox
             assert x1 < x2
             assert y1 < y2
@@ -95,6 +128,184 @@ class TestDetector:
         # Should find no (or very few) regions on a blank image
         assert len(result.regions) <= 2
 
+    def test_merge_boxes(self):
+        boxes = [
+            (0, 0, 100, 50),
+            (10, 10, 40, 30),  # nested in the first
+            (90, 0, 190, 50),  # IoU with the first below threshold
+            (300, 300, 400, 350),
+            (320, 300, 420, 350),  # overlaps the previous one heavily
+        ]
+        merged = sorted(map(tuple, merge_boxes(boxes).tolist()))
+        assert merged == [(0, 0, 100, 50), (90, 0, 190, 50), (300, 300, 420, 350)]
+        assert merge_boxes([]).shape == (0, 4)
+
+    def test_reading_order(self):
+        boxes = [(10, 10, 50, 30), (200, 100, 250, 120), (200, 10, 250, 30)]
+        regions = TextDetector()._to_regions(boxes).to_models()
+        assert [r.bbox for r in regions] == [
+            (200, 10, 250, 30), (200, 100, 250, 120), (10, 10, 50, 30)
+        ]
+        assert [r.reading_order for r in regions] == [0, 1, 2]
+        strip = TextDetector()._to_regions(boxes, webtoon=True).to_models()
+        assert [r.bbox for r in strip][0] == (200, 10, 250, 30)
+        assert [r.bbox for r in strip][-1] == (200, 100, 250, 120)
+
+
+class TestWebtoon:
+    def test_slices_cover_strip_with_overlap(self):
+        slices = plan_slices(5000, 2048, 256)
+        assert slices[0] == (0, 2048)
+        assert slices[-1][1] == 5000
+        for (_, prev_end), (start, _) in zip(slices, slices[1:]):
+            assert prev_end - start == 256
+        assert plan_slices(1000, 2048, 256) == [(0, 1000)]
+
+    def test_boxes_cut_by_band_edge_are_merged(self):
+        slices = [(0, 1000), (900, 1900)]
+        per_slice = [
+            [(100, 950, 300, 1000), (50, 100, 200, 150)],  # cut at the band's bottom edge
+            [(100, 50, 300, 120), (400, 50, 500, 80)],  # same text seen whole from 950
+        ]
+
+        merged = sorted(merge_slice_boxes(per_slice, slices))
+
+        assert merged == [(50, 100, 200, 150), (100, 950, 300, 1020), (400, 950, 500, 980)]
+
+    @pytest.mark.asyncio
+    async def test_detector_finds_text_across_bands(self, make_context):
+        strip = np.full((6000, 600, 3), 255, dtype=np.uint8)
+        strip[500:540, 100:400] = 0
+        strip[2000:2080, 150:450] = 0  # straddles the first band edge (2048)
+        strip[5000:5040, 200:500] = 0
+        ctx = make_context(strip)
+        ctx.preprocessed_image = strip
+
+        ctx = await TextDetector().process(ctx)
+
+        assert len(ctx.regions) == 3
+        tops = ctx.regions.bboxes[:, 1].tolist()
+        assert tops == sorted(tops)  # strips read top to bottom
+        middle = ctx.regions.bboxes[1]
+        assert middle[1] <= 2000 and middle[3] >= 2080
+        assert json.loads(ctx.metadata["detector_details"])["webtoon_slices"] == 4
+
+
+class TestPyramid:
+    def test_detection_scale(self):
+        assert detection_scale((800, 600, 3)) == 1.0
+        assert detection_scale((4096, 3000, 3)) == settings.detection_max_side / 4096
+        # Strips are fitted by width only
+        assert detection_scale((20000, 2048, 3)) == settings.detection_max_side / 2048
+
+    def test_box_to_full_rounds_outwards_and_clips(self):
+        assert box_to_full((10, 20, 30, 40), 1.0, (100, 100)) == (10, 20, 30, 40)
+        assert box_to_full((10, 20, 33, 50), 0.3, (160, 100)) == (33, 66, 100, 160)
+
+    @pytest.mark.asyncio
+    async def test_regions_in_full_resolution_coordinates(self, make_context):
+        page = np.full((4096, 3000, 3), 255, dtype=np.uint8)
+        page[1000:1200, 400:1600] = 0
+        ctx = make_context(page)
+        ctx.preprocessed_image = page
+
+        ctx = await TextDetector().process(ctx)
+
+        assert len(ctx.regions) == 1
+        x1, y1, x2, y2 = ctx.regions.bboxes[0]
+        # The block plus the detector's dilation margin, scaled up by 4
+        assert x1 <= 400 and y1 <= 1000 and x2 >= 1600 and y2 >= 1200
+        assert x2 - x1 < 1500 and y2 - y1 < 500
+
+    @pytest.mark.asyncio
+    async def test_balloon_mask_at_full_resolution(self, make_context):
+        page = np.full((4096, 3072, 3), 120, dtype=np.uint8)
+        page[800:2000, 400:2400] = 255
+        page[1300:1500, 800:2000] = 0
+        ctx = make_context(page)
+        ctx.preprocessed_image = page
+        ctx.regions = RegionTable.from_boxes([(800, 1300, 2000, 1500)])
+
+        ctx = await BalloonParser().process(ctx)
+
+        (balloon,) = ctx.balloons
+        x1, y1, x2, y2 = balloon.bbox
+        assert abs(x1 - 400) <= 4 and abs(y1 - 800) <= 4
+        assert abs(x2 - 2400) <= 4 and abs(y2 - 2000) <= 4
+        assert balloon.mask.shape == (y2 - y1, x2 - x1)
+        assert balloon.area == pytest.approx(2000 * 1200, rel=0.01)
+
+
+class TestRegionTable:
+    def test_round_trip_through_models(self):
+        models = [
+            DetectedRegion(id=0, bbox=(10, 10, 50, 30), confidence=0.5),
+            DetectedRegion(
+                id=1, bbox=(60, 10, 90, 30), balloon_id=0, balloon_bbox=(55, 5, 95, 40)
+            ),
+        ]
+        table = RegionTable.from_models(models)
+
+        assert table.to_models() == models
+        assert table.render_bboxes().tolist() == [[10, 10, 50, 30], [55, 5, 95, 40]]
+        assert len(RegionTable.from_models([])) == 0
+
+    def test_columns_are_views(self):
+        table = RegionTable.from_boxes([(0, 0, 10, 10), (20, 0, 30, 10)])
+        table.balloon_ids[1] = 3
+        assert table.to_models()[1].balloon_id == 3
+        assert table.to_models()[0].balloon_id is None
+
+
+def _bordered_panel(page: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> None:
+    page[y1:y2, x1:x2] = 0
+    page[y1 + 3:y2 - 3, x1 + 3:x2 - 3] = 255
+
+
+class TestPanelSegmenter:
+    def test_xy_cut_orders_tiers_then_right_to_left(self):
+        page = np.full((1000, 700), 255, dtype=np.uint8)
+        _bordered_panel(page, 20, 20, 680, 400)
+        _bordered_panel(page, 20, 420, 340, 980)
+        _bordered_panel(page, 360, 420, 680, 980)
+
+        panels = xy_cut(page < 200, min_size=56)
+
+        assert panels == [(20, 20, 680, 400), (360, 420, 680, 980), (20, 420, 340, 980)]
+
+    def test_assign_panels_falls_back_to_nearest(self):
+        panels = [(0, 0, 100, 100), (120, 0, 220, 100)]
+        bboxes = np.array([(10, 10, 50, 50), (90, 10, 200, 50), (112, 40, 118, 60)])
+        assert assign_panels(bboxes, panels).tolist() == [0, 1, 1]
+        assert assign_panels(bboxes, []).tolist() == [-1, -1, -1]
+
+    @pytest.mark.asyncio
+    async def test_regions_read_panel_by_panel(self, make_context):
+        page = np.full((1000, 700, 3), 255, dtype=np.uint8)
+        _bordered_panel(page, 20, 20, 680, 400)
+        _bordered_panel(page, 20, 420, 340, 980)
+        _bordered_panel(page, 360, 420, 680, 980)
+        ctx = make_context(page)
+        ctx.preprocessed_image = page
+        # Global right-to-left order would read the left column's top region
+        # before the right column's lower one
+        ctx.regions = RegionTable.from_boxes(
+            [(400, 450, 500, 500), (200, 30, 300, 80), (60, 440, 160, 490), (400, 800, 500, 850)]
+        )
+
+        ctx = await PanelSegmenter().process(ctx)
+
+        assert len(ctx.panels) == 3
+        assert ctx.regions.bboxes.tolist() == [
+            [200, 30, 300, 80],
+            [400, 450, 500, 500],
+            [400, 800, 500, 850],
+            [60, 440, 160, 490],
+        ]
+        assert ctx.regions.panel_ids.tolist() == [0, 1, 1, 2]
+        assert ctx.regions.ids.tolist() == [0, 1, 2, 3]
+        assert [g.tolist() for g in ctx.regions.panel_groups()] == [[0], [1, 2], [3]]
+
 
 class TestBalloonParser:
     @pytest.mark.asyncio
@@ -110,21 +321,437 @@ class TestBalloonParser:
         ctx = await parser.process(ctx)
 
         # Some regions should have balloon_bbox
-        has_balloon = [r for r in ctx.regions if r.balloon_bbox is not None]
+        has_balloon = [r for r in ctx.regions.to_models() if r.balloon_bbox is not None]
         # Not asserting exact count since it depends on the test image
         assert isinstance(has_balloon, list)
 
+    @pytest.mark.asyncio
+    async def test_region_maps_to_enclosing_balloon(self, make_context):
+        img = np.full((300, 400, 3), 120, dtype=np.uint8)
+        img[40:160, 30:190] = 255  # balloon with text inside
+        img[80:100, 60:160] = 0
+        img[200:280, 250:380] = 255  # second balloon
+        img[230:245, 270:360] = 0
+        ctx = make_context(img)
+        ctx.preprocessed_image = img
+        ctx.regions = RegionTable.from_models([
+            DetectedRegion(id=0, bbox=(60, 80, 160, 100)),
+            DetectedRegion(id=1, bbox=(270, 230, 360, 245)),
+            DetectedRegion(id=2, bbox=(10, 180, 40, 200)),  # on the gray background
+            DetectedRegion(id=3, bbox=(70, 110, 150, 130)),  # same balloon as region 0
+        ])
+
+        ctx = await BalloonParser().process(ctx)
+
+        r0, r1, r2, r3 = ctx.regions.to_models()
+        assert r0.balloon_bbox == (30, 40, 190, 160)
+        assert r1.balloon_bbox == (250, 200, 380, 280)
+        assert r2.balloon_bbox is None and r2.balloon_id is None
+        assert r3.balloon_id == r0.balloon_id
+        assert len(ctx.balloons) == 2
+
+        balloon = ctx.balloons[r0.balloon_id]
+        assert balloon.mask.shape == (120, 160)
+        # Text holes are part of the interior
+        assert balloon.mask.all()
+        assert balloon.area == 120 * 160
+
+    def test_fill_holes_keeps_open_areas(self):
+        binary = np.zeros((50, 50), np.uint8)
+        binary[10:40, 10:40] = 255
+        binary[20:30, 20:30] = 0  # enclosed hole
+        binary[0:5, 0:50] = 255  # touches the border, encloses nothing
+
+        filled = fill_holes(binary)
+
+        assert filled[20:30, 20:30].all()
+        assert not filled[45:50, :].any()
+
+
+def _vertical_text_crop(columns: int) -> np.ndarray:
+    """White crop with ``columns`` tall black strokes, like vertical text."""
+    crop = np.full((200, 40 * columns + 20, 3), 255, dtype=np.uint8)
+    for i in range(columns):
+        x = 20 + i * 40
+        crop[20:180, x:x + 16] = 0
+    return crop
+
+
+class _FakeRecognizerOcr:
+    def __init__(self):
+        self.rec_calls = []
+        self.cls_calls = []
+
+    def text_classifier(self, lines):
+        self.cls_calls.append(len(lines))
+        return lines, [("0", 1.0)] * len(lines), 0.0
+
+    def text_recognizer(self, lines):
+        self.rec_calls.append(len(lines))
+        return [(f"line{i}", 0.9) for i in range(len(lines))], 0.0
+
+    def ocr(self, crop, cls=True):  # pragma: no cover - must not be used
+        raise AssertionError("per-region OCR should not run")
+
+
+class TestOcrEngine:
+    def test_split_vertical_columns(self):
+        lines = split_text_lines(_vertical_text_crop(3))
+        assert len(lines) == 3
+        for line, rotated in lines:
+            assert rotated
+            assert line.shape[0] == 48
+            assert line.shape[1] > line.shape[0]  # rotated to read horizontally
+
+    def test_split_blank_crop(self):
+        assert split_text_lines(np.full((50, 50, 3), 255, dtype=np.uint8)) == []
+
+    def test_batched_recognition_single_call(self):
+        page = np.full((400, 400, 3), 255, dtype=np.uint8)
+        page[0:200, 0:140] = _vertical_text_crop(3)
+        page[250:270, 20:300] = 0  # one horizontal line
+        regions = RegionTable.from_boxes(
+            [(0, 0, 140, 200), (10, 240, 320, 280), (0, 0, 3, 3)], confidence=1.0
+        )
+        engine = OcrEngine()
+        fake = _FakeRecognizerOcr()
+        engine._ocr = fake
+
+        results = engine._run_ocr(page, regions)
+
+        assert fake.rec_calls == [4]
+        assert fake.cls_calls == [3]  # only the rotated columns
+        assert results[0].text.count("\n") == 2
+        assert results[1].text
+        assert results[2].text == ""
+
+    def test_falls_back_without_recognizer(self):
+        page = np.full((100, 100, 3), 255, dtype=np.uint8)
+        page[40:60, 10:90] = 0
+        ocr = MagicMock(spec=["ocr"])
+        ocr.ocr.return_value = [[[[[0, 0]], ("テスト", 0.95)]]]
+        engine = OcrEngine()
+        engine._ocr = ocr
+
+        results = engine._run_ocr(
+            page, RegionTable.from_boxes([(0, 30, 100, 70)], confidence=1.0)
+        )
+
+        ocr.ocr.assert_called_once()
+        assert results[0].text == "テスト"
+
+
+class _FakeLama:
+    def __init__(self, fail=False):
+        self.sizes = []
+        self.fail = fail
+
+    def __call__(self, image, mask):
+        if self.fail:
+            raise RuntimeError("lama unavailable")
+        self.sizes.append(image.size)
+        # Like SimpleLama: output padded up to a multiple of 8, painted grey
+        w, h = image.size
+        out = np.full((-(-h // 8) * 8, -(-w // 8) * 8, 3), 128, dtype=np.uint8)
+        return Image.fromarray(out)
+
+
+class TestInpainter:
+    def test_nearby_regions_share_a_crop(self):
+        bboxes = np.array(
+            [(100, 100, 140, 200), (150, 100, 190, 200), (900, 1500, 960, 1600)]
+        )
+        crops = plan_crops(build_text_mask((2000, 1200), bboxes))
+
+        assert len(crops) == 2
+        for x1, y1, x2, y2 in crops:
+            assert (x2 - x1) % LAMA_STRIDE == 0
+            assert (y2 - y1) % LAMA_STRIDE == 0
+        assert sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in crops) < 2000 * 1200 * 0.1
+
+    def test_only_masked_pixels_change(self, sample_image):
+        regions = RegionTable.from_boxes([(50, 100, 350, 150)])
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        with patch.object(settings, "inpaint_fast_path", False):
+            result, stats = inpainter._inpaint(sample_image, regions)
+
+        mask = build_text_mask(sample_image.shape[:2], regions.bboxes)
+        assert np.all(result[mask == 255] == 128)
+        assert np.array_equal(result[mask == 0], sample_image[mask == 0])
+        assert stats["lama_crops"] == len(inpainter._lama.sizes) == 1
+        assert result.shape == sample_image.shape
+
+    def test_lama_failure_falls_back_to_white(self, sample_image):
+        regions = RegionTable.from_boxes([(50, 100, 350, 150)])
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama(fail=True)
+
+        with patch.object(settings, "inpaint_fast_path", False):
+            result, _ = inpainter._inpaint(sample_image, regions)
+
+        assert np.all(result[100:150, 50:350] == 255)
+
+    def test_flat_balloon_skips_lama(self):
+        img = np.full((300, 300, 3), 250, dtype=np.uint8)
+        img[100:150, 80:220] = 0  # text on a flat balloon
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        result, stats = inpainter._inpaint(
+            img, RegionTable.from_boxes([(80, 100, 220, 150)])
+        )
+
+        assert stats["fill_regions"] == 1
+        assert stats["lama_crops"] == 0
+        assert inpainter._lama.sizes == []
+        assert np.all(result == 250)
+
+    def test_smooth_background_uses_cv2_inpaint(self):
+        gradient = np.tile(np.linspace(150, 200, 300, dtype=np.uint8), (300, 1))
+        img = np.dstack([gradient] * 3)
+        img[100:150, 80:220] = 0
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        result, stats = inpainter._inpaint(
+            img, RegionTable.from_boxes([(80, 100, 220, 150)])
+        )
+
+        assert stats["telea_regions"] == 1
+        assert inpainter._lama.sizes == []
+        assert result[100:150, 80:220].min() > 100
+
+    def test_cv2_inpaint_ignores_neighbouring_text(self):
+        gradient = np.tile(np.linspace(150, 200, 300, dtype=np.uint8), (300, 1))
+        img = np.dstack([gradient] * 3)
+        img[100:140, 80:220] = 0
+        img[146:190, 80:220] = 0  # next line's text, inside the first box's ring
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        result, stats = inpainter._inpaint(
+            img, RegionTable.from_boxes([(80, 100, 220, 140), (80, 146, 220, 190)])
+        )
+
+        assert stats["telea_regions"] == 2
+        assert result[100:190, 80:220].min() >= 150
+
+    def test_fast_path_runs_per_panel(self):
+        img = np.full((300, 300, 3), 250, dtype=np.uint8)
+        img[40:70, 30:120] = 0
+        img[200:230, 170:270] = 0
+        regions = RegionTable.from_boxes([(30, 40, 120, 70), (170, 200, 270, 230)])
+        regions.panel_ids[:] = [0, 1]
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        with patch.object(settings, "panel_threads", 2):
+            result, stats = inpainter._inpaint(img, regions)
+
+        assert stats["fill_regions"] == 2
+        assert np.all(result == 250)
+
+    def test_panels_with_overlapping_rings_are_deterministic(self):
+        gradient = np.tile(np.linspace(150, 200, 300, dtype=np.uint8), (300, 1))
+        img = np.dstack([gradient] * 3)
+        img[60:140, 40:140] = 0
+        img[60:140, 150:250] = 0  # across a narrow gutter, in the next panel
+        regions = RegionTable.from_boxes([(40, 60, 140, 140), (150, 60, 250, 140)])
+        regions.panel_ids[:] = [0, 1]
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        with patch.object(settings, "panel_threads", 1):
+            expected, stats = inpainter._inpaint(img, regions)
+        assert stats["telea_regions"] == 2
+        assert expected[60:140, 40:250].min() >= 150
+
+        with patch.object(settings, "panel_threads", 2):
+            for _ in range(5):
+                result, _ = inpainter._inpaint(img, regions)
+                assert np.array_equal(result, expected)
+
+    def test_textured_background_uses_lama(self):
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 256, (300, 300, 3), dtype=np.uint8)
+        inpainter = Inpainter()
+        inpainter._lama = _FakeLama()
+
+        _, stats = inpainter._inpaint(
+            img, RegionTable.from_boxes([(80, 100, 220, 150)])
+        )
+
+        assert stats["lama_regions"] == 1
+        assert len(inpainter._lama.sizes) == 1
+
 
 class TestTranslationMapper:
-    @pytest.mark.asyncio
-    async def test_font_size_estimation(self):
+    def test_font_size_fits_box(self):
         mapper = TranslationMapper()
         # Large box, short text → larger font
-        large_font = mapper._estimate_font_size("안녕", 200, 100)
+        large, large_fits = mapper.map_one(0, (0, 0, 200, 100), "안녕")
         # Small box, long text → smaller font
-        small_font = mapper._estimate_font_size(
-            "이것은 매우 긴 텍스트입니다", 100, 50
-        )
-        assert large_font >= small_font
-        assert 12 <= large_font <= 40
-        assert 12 <= small_font <= 40
+        small, _ = mapper.map_one(1, (0, 0, 100, 50), "이것은 매우 긴 텍스트입니다")
+        assert large_fits
+        assert large.font_size >= small.font_size
+        assert 12 <= large.font_size <= 40
+        assert 12 <= small.font_size <= 40
+        assert large.lines == ["안녕"]
+
+
+class _RecordingStage(PipelineStage):
+    def __init__(self, name, reads=(), writes=(), delay=0.0, log=None, fail=False):
+        self.name = name
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+        self.delay = delay
+        self.log = log if log is not None else []
+        self.fail = fail
+
+    async def process(self, ctx: PipelineContext) -> PipelineContext:
+        self.log.append(("start", self.name))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        self.log.append(("end", self.name))
+        return ctx
+
+
+@pytest.fixture
+def mock_cost_tracker(job_id, mock_db_session):
+    mock_db_session.execute.return_value = MagicMock()
+    tracker = MagicMock()
+    tracker.job_id = job_id
+    tracker.db = mock_db_session
+    tracker.record_stage = AsyncMock()
+    tracker.finalize = AsyncMock()
+    tracker.accumulated_krw = 0.0
+    return tracker
+
+
+class TestOrchestrator:
+    def test_inpainter_only_waits_for_balloon_parser(self, mock_cost_tracker):
+        stages = [
+            Preprocessor(),
+            TextDetector(),
+            BalloonParser(),
+            OcrEngine(),
+            TranslationPrep(),
+            Translator(),
+            TranslationMapper(),
+            Inpainter(),
+            Typesetter(),
+            Postprocessor(),
+        ]
+        deps = PipelineOrchestrator(stages, mock_cost_tracker).build_dependencies()
+
+        # inpainter needs regions, not OCR or translation output
+        assert max(deps[7]) == 2
+        # translator ← translation_prep, plus regions/font scale for incremental layout
+        assert deps[5] == {0, 2, 4}
+        assert {6, 7} <= deps[8]  # typesetter ← mapper, inpainter
+
+    def test_undeclared_stage_is_barrier(self, mock_cost_tracker):
+        stages = [
+            _RecordingStage("a", writes={"x"}),
+            _RecordingStage("legacy"),
+            _RecordingStage("b", reads={"y"}, writes={"z"}),
+        ]
+        deps = PipelineOrchestrator(stages, mock_cost_tracker).build_dependencies()
+        assert deps == [set(), {0}, {1}]
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap(self, job_id, mock_cost_tracker):
+        log = []
+        stages = [
+            _RecordingStage("src", writes={"a"}, log=log),
+            _RecordingStage("slow", reads={"a"}, writes={"b"}, delay=0.05, log=log),
+            _RecordingStage("fast", reads={"a"}, writes={"c"}, delay=0.01, log=log),
+            _RecordingStage("sink", reads={"b", "c"}, writes={"d"}, log=log),
+        ]
+        orchestrator = PipelineOrchestrator(stages, mock_cost_tracker)
+        await orchestrator.run(PipelineContext(job_id=job_id))
+
+        assert log.index(("start", "fast")) < log.index(("end", "slow"))
+        assert log.index(("end", "fast")) < log.index(("end", "slow"))
+        assert log[-1] == ("end", "sink")
+        assert mock_cost_tracker.record_stage.await_count == 4
+        mock_cost_tracker.finalize.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_running_stages(self, job_id, mock_cost_tracker):
+        log = []
+        stages = [
+            _RecordingStage("slow", writes={"a"}, delay=1.0, log=log),
+            _RecordingStage("broken", writes={"b"}, fail=True, log=log),
+            _RecordingStage("after", reads={"a", "b"}, writes={"c"}, log=log),
+        ]
+        orchestrator = PipelineOrchestrator(stages, mock_cost_tracker)
+
+        with pytest.raises(RuntimeError, match="broken failed"):
+            await orchestrator.run(PipelineContext(job_id=job_id))
+
+        assert ("end", "slow") not in log
+        assert ("start", "after") not in log
+        mock_cost_tracker.finalize.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_buffers_released_after_last_reader(self, job_id, mock_cost_tracker):
+        seen = {}
+
+        class _Snapshot(_RecordingStage):
+            async def process(self, ctx):
+                seen[self.name] = (ctx.original_image is not None, "gray" in ctx._derived)
+                return await super().process(ctx)
+
+        stages = [
+            _RecordingStage("pre", reads={"original_image"}, writes={"preprocessed_image"}),
+            _Snapshot("det", reads={"preprocessed_image", "derived.gray"}, writes={"regions"}),
+            _Snapshot("ocr", reads={"preprocessed_image", "regions"}, writes={"ocr_results"}),
+            _RecordingStage("out", reads={"ocr_results"}, writes={"result_image"}),
+        ]
+        ctx = PipelineContext(job_id=job_id, original_image=np.zeros((4, 4, 3), np.uint8))
+        ctx.preprocessed_image = np.zeros((4, 4, 3), np.uint8)
+        ctx.derived("gray")
+        ctx.result_image = np.zeros((4, 4, 3), np.uint8)
+
+        await PipelineOrchestrator(stages, mock_cost_tracker).run(ctx)
+
+        assert seen["det"] == (False, True)  # original dropped once preprocessed
+        assert seen["ocr"] == (False, False)  # gray dropped after the detector
+        assert ctx.preprocessed_image is None
+        assert ctx.result_image is not None  # no stage reads it: pipeline output
+
+    @pytest.mark.asyncio
+    async def test_barrier_keeps_buffers_alive(self, job_id, mock_cost_tracker):
+        stages = [
+            _RecordingStage("pre", reads={"original_image"}, writes={"preprocessed_image"}),
+            _RecordingStage("legacy"),
+        ]
+        orchestrator = PipelineOrchestrator(stages, mock_cost_tracker)
+        assert orchestrator.buffer_readers()["original_image"] == {0, 1}
+
+        ctx = PipelineContext(job_id=job_id, original_image=np.zeros((4, 4, 3), np.uint8))
+        orchestrator.release_buffers = False
+        await orchestrator.run(ctx)
+        assert ctx.original_image is not None
+
+
+class TestPipelineContext:
+    def test_derived_view_is_computed_once_per_image(self, job_id, sample_image):
+        ctx = PipelineContext(job_id=job_id, preprocessed_image=sample_image)
+
+        gray = ctx.derived("gray")
+        assert ctx.derived("gray") is gray
+        assert gray.shape == sample_image.shape[:2]
+        np.testing.assert_array_equal(ctx.derived("rgb"), sample_image[..., ::-1])
+
+        ctx.preprocessed_image = sample_image.copy()
+        assert ctx.derived("gray") is not gray
+
+        ctx.release("preprocessed_image")
+        assert ctx._derived == {}
+        with pytest.raises(ValueError):
+            ctx.derived("gray")
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+import time
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1.translate import _read_with_limit
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+from app.services.job_service import create_cached_job, find_cached_jobs
+from app.services.result_cache import find_cached_result
+
+
+def _write_result_files(result_dir, job_id, age_s: float = 0) -> list[str]:
+    paths = [os.path.join(result_dir, f"{job_id}{suffix}.png") for suffix in ("", "_original")]
+    mtime = time.time() - age_s
+    for path in paths:
+        with open(path, "wb") as f:
+            f.write(b"png")
+        os.utime(path, (mtime, mtime))
+    return paths
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Job.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+class TestResultCache:
+    @pytest.mark.asyncio
+    async def test_read_with_limit_hashes_upload(self):
+        data = os.urandom(200 * 1024)
+        upload = UploadFile(file=io.BytesIO(data), filename="page.png")
+
+        read, digest = await _read_with_limit(upload, 1024 * 1024)
+
+        assert read == data
+        assert digest == hashlib.sha256(data).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_hit_refreshes_file_lifetime(self, tmp_path, mock_db_session):
+        job = Job(id=uuid.uuid4(), status=JobStatus.COMPLETED)
+        paths = _write_result_files(tmp_path, job.id, age_s=3600)
+
+        with patch.object(settings, "result_dir", str(tmp_path)), patch(
+            "app.services.result_cache.find_cached_jobs", AsyncMock(return_value=[job])
+        ):
+            found = await find_cached_result(mock_db_session, "hash", "v1")
+
+        assert found is job
+        assert all(time.time() - os.path.getmtime(p) < 60 for p in paths)
+
+    @pytest.mark.asyncio
+    async def test_skips_entries_near_cleanup(self, tmp_path, mock_db_session):
+        expiring = Job(id=uuid.uuid4(), status=JobStatus.COMPLETED)
+        missing = Job(id=uuid.uuid4(), status=JobStatus.COMPLETED)
+        _write_result_files(tmp_path, expiring.id, age_s=settings.result_ttl_hours * 3600 - 60)
+
+        with patch.object(settings, "result_dir", str(tmp_path)), patch(
+            "app.services.result_cache.find_cached_jobs",
+            AsyncMock(return_value=[expiring, missing]),
+        ):
+            found = await find_cached_result(mock_db_session, "hash", "v1")
+
+        assert found is None
+
+    @pytest.mark.asyncio
+    async def test_cached_job_points_at_source(self, mock_db_session):
+        source = Job(
+            id=uuid.uuid4(),
+            status=JobStatus.COMPLETED,
+            page_count=1,
+            warnings_json='["w"]',
+        )
+
+        job = await create_cached_job(mock_db_session, source, original_filename="a.png")
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.result_job_id == source.id
+        assert job.total_cost_krw == 0.0
+        assert job.warnings_json == '["w"]'
+        mock_db_session.add.assert_called_once_with(job)
+
+    @pytest.mark.asyncio
+    async def test_jobs_with_warnings_are_not_cached(self, session_factory):
+        clean = Job(status=JobStatus.COMPLETED, content_hash="abc", pipeline_version="v1")
+        degraded = Job(
+            status=JobStatus.COMPLETED,
+            content_hash="abc",
+            pipeline_version="v1",
+            warnings_json='["Translation response could not be parsed"]',
+        )
+        async with session_factory() as db:
+            db.add_all([clean, degraded])
+            await db.commit()
+
+        async with session_factory() as db:
+            found = await find_cached_jobs(db, "abc", "v1")
+
+        assert [job.id for job in found] == [clean.id]
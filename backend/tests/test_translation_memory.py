@@ -0,0 +1,102 @@
+import json
+import uuid
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.translation_memory import TranslationMemory
+from app.pipeline.base import PipelineContext
+from app.pipeline.regions import OcrResult, RegionTable
+from app.pipeline.translation_mapper import TranslationMapper
+from app.pipeline.translation_prep import PROMPT_VERSION, TranslationPrep
+from app.services.translation_memory import (
+    TranslationMemoryCache,
+    memory_key,
+    normalize_source_text,
+)
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tm.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(TranslationMemory.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+class TestTranslationMemory:
+    def test_key_normalises_text(self):
+        assert normalize_source_text("ＡＢＣ\n 　ですか？ ") == "ABC ですか?"
+        assert memory_key("ですか？", "m", "1") == memory_key(" ですか?\n", "m", "1")
+        assert memory_key("ですか", "m", "1") != memory_key("ですか", "m", "2")
+        assert memory_key("ですか", "m", "1") != memory_key("ですか", "other", "1")
+
+    @pytest.mark.asyncio
+    async def test_store_then_lookup_from_database(self, session_factory):
+        writer = TranslationMemoryCache(100, session_factory)
+        await writer.store({"こんにちは": "안녕하세요"}, "m", "1")
+
+        # A fresh process has an empty LRU and reads the table
+        reader = TranslationMemoryCache(100, session_factory)
+        found = await reader.lookup(["こんにちは", "さようなら"], "m", "1")
+
+        assert set(found) == {"こんにちは"}
+        assert found["こんにちは"].translated_text == "안녕하세요"
+        assert found["こんにちは"].tokens > 0
+
+    @pytest.mark.asyncio
+    async def test_database_failure_degrades_to_lru(self):
+        def broken_factory():
+            raise RuntimeError("database down")
+
+        cache = TranslationMemoryCache(100, broken_factory)
+        await cache.store({"はい": "네"}, "m", "1")  # logs, does not raise
+
+        found = await cache.lookup(["はい", "いいえ"], "m", "1")
+        assert set(found) == {"はい"}
+
+    @pytest.mark.asyncio
+    async def test_lru_evicts_oldest(self):
+        def broken_factory():
+            raise RuntimeError("database down")
+
+        cache = TranslationMemoryCache(2, broken_factory)
+        await cache.store({"一": "1", "二": "2", "三": "3"}, "m", "1")
+        found = await cache.lookup(["一", "二", "三"], "m", "1")
+        assert set(found) == {"二", "三"}
+
+
+class TestTranslationMemoryPipeline:
+    @pytest.mark.asyncio
+    async def test_prep_sends_only_misses_and_mapper_merges(self, session_factory):
+        cache = TranslationMemoryCache(100, session_factory)
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.regions = RegionTable.from_boxes([(0, 0, 100, 60), (0, 100, 100, 160)])
+        ctx.ocr_results = [
+            OcrResult(region_id=0, text="こんにちは", confidence=0.9),
+            OcrResult(region_id=1, text="新しい台詞", confidence=0.9),
+        ]
+
+        with patch("app.pipeline.translation_prep.translation_memory", cache):
+            await cache.store({"こんにちは": "안녕하세요"}, settings.openai_model, PROMPT_VERSION)
+            ctx = await TranslationPrep().process(ctx)
+
+        assert "新しい台詞" in ctx.translation_prompt
+        assert "こんにちは" not in ctx.translation_prompt
+        assert ctx.metadata["translation_entry_count"] == 1
+        assert ctx.metadata["translation_sources"] == {1: "新しい台詞"}
+        assert ctx.metadata["translation_prep_tokens_saved"] > 0
+        assert ctx.metadata["translation_prep_saved_krw"] > 0
+        assert json.loads(ctx.metadata["translation_prep_details"])["memory_hits"] == 1
+
+        ctx.metadata["raw_translations"] = [{"id": 1, "text": "새 대사"}]
+        ctx = await TranslationMapper().process(ctx)
+
+        assert {t.region_id: t.translated for t in ctx.translations} == {
+            0: "안녕하세요",
+            1: "새 대사",
+        }
@@ -1,10 +1,13 @@
 import asyncio
 import json
+import re
 import uuid
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app.core.config import settings
 from app.pipeline.base import PipelineContext
 from app.services.circuit_breaker import CircuitBreaker
 
@@ -22,10 +25,10 @@ class TestTranslator:
             output_tokens=100,
         )
 
-        with patch("app.pipeline.translator.AsyncOpenAI") as mock_client_cls:
+        with patch("app.pipeline.translator.get_openai_client") as mock_get_client:
             mock_client = MagicMock()
             mock_client.chat.completions.create = AsyncMock(return_value=response)
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             from app.pipeline.translator import Translator
 
@@ -43,14 +46,43 @@ class TestTranslator:
             assert result.metadata["translator_tokens"] == 300
             assert result.metadata["translator_cost_krw"] > 0
 
+    @pytest.mark.asyncio
+    async def test_string_ids_are_stored_in_memory(self, mock_openai_response):
+        translations = [{"id": "0", "text": "안녕하세요"}, {"id": " 1 ", "text": "감사합니다"}]
+        response = mock_openai_response(content=json.dumps({"translations": translations}))
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            from app.pipeline.translator import Translator
+
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(return_value=response)
+
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.translation_prompt = "Translate."
+        ctx.metadata["translation_entry_count"] = 2
+        ctx.metadata["translation_sources"] = {0: "こんにちは", 1: "ありがとう"}
+
+        memory = MagicMock()
+        memory.store = AsyncMock()
+        with (
+            patch.object(settings, "translation_memory_enabled", True),
+            patch.object(settings, "translation_streaming", False),
+            patch("app.pipeline.translator.translation_memory", memory),
+        ):
+            await translator.process(ctx)
+
+        pairs = memory.store.await_args.args[0]
+        assert pairs == {"こんにちは": "안녕하세요", "ありがとう": "감사합니다"}
+
     @pytest.mark.asyncio
     async def test_json_parse_error_returns_empty_with_warning(self, mock_openai_response):
         response = mock_openai_response(content="not valid json {{{")
 
-        with patch("app.pipeline.translator.AsyncOpenAI") as mock_client_cls:
+        with patch("app.pipeline.translator.get_openai_client") as mock_get_client:
             mock_client = MagicMock()
             mock_client.chat.completions.create = AsyncMock(return_value=response)
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             from app.pipeline.translator import Translator
 
@@ -70,7 +102,7 @@ class TestTranslator:
 
     @pytest.mark.asyncio
     async def test_empty_prompt_skips(self):
-        with patch("app.pipeline.translator.AsyncOpenAI"):
+        with patch("app.pipeline.translator.get_openai_client"):
             from app.pipeline.translator import Translator
 
             translator = Translator()
@@ -89,10 +121,10 @@ class TestTranslator:
             output_tokens=500,
         )
 
-        with patch("app.pipeline.translator.AsyncOpenAI") as mock_client_cls:
+        with patch("app.pipeline.translator.get_openai_client") as mock_get_client:
             mock_client = MagicMock()
             mock_client.chat.completions.create = AsyncMock(return_value=response)
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             from app.pipeline.translator import Translator
 
@@ -118,10 +150,10 @@ class TestTranslator:
             content=json.dumps({"translations": translations})
         )
 
-        with patch("app.pipeline.translator.AsyncOpenAI") as mock_client_cls:
+        with patch("app.pipeline.translator.get_openai_client") as mock_get_client:
             mock_client = MagicMock()
             mock_client.chat.completions.create = AsyncMock(return_value=response)
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             from app.pipeline.translator import Translator
 
@@ -142,10 +174,10 @@ class TestTranslator:
     async def test_zero_results_warning(self, mock_openai_response):
         response = mock_openai_response(content='{"translations": []}')
 
-        with patch("app.pipeline.translator.AsyncOpenAI") as mock_client_cls:
+        with patch("app.pipeline.translator.get_openai_client") as mock_get_client:
             mock_client = MagicMock()
             mock_client.chat.completions.create = AsyncMock(return_value=response)
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             from app.pipeline.translator import Translator
 
@@ -161,3 +193,494 @@ class TestTranslator:
 
             warnings = result.metadata.get("warnings", [])
             assert any("returned 0 results" in w for w in warnings)
+
+
+class TestChunkedTranslation:
+    @staticmethod
+    def _ctx(texts: list[str]) -> PipelineContext:
+        from app.pipeline.translation_prep import build_user_prompt
+
+        entries = [{"id": i, "text": t} for i, t in enumerate(texts)]
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.translation_prompt = build_user_prompt(entries)
+        ctx.metadata["translation_entries"] = entries
+        ctx.metadata["translation_entry_count"] = len(entries)
+        return ctx
+
+    @staticmethod
+    def _echo(mock_openai_response, fail_ids=()):
+        """Fake create() translating each requested id; ids in ``fail_ids`` fail once."""
+        failed = set()
+
+        async def create(messages, **kwargs):
+            entries = messages[1]["content"].split("Output")[0]
+            ids = [int(i) for i in re.findall(r'"id": (\d+)', entries)]
+            for i in ids:
+                if i in fail_ids and i not in failed:
+                    failed.add(i)
+                    return mock_openai_response(content="truncated {")
+            translations = [{"id": i, "text": f"번역{i}"} for i in ids]
+            return mock_openai_response(content=json.dumps({"translations": translations}))
+
+        return AsyncMock(side_effect=create)
+
+    @pytest.mark.asyncio
+    async def test_dense_page_is_split_and_merged(self, mock_openai_response):
+        from app.pipeline.translator import Translator
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = self._echo(mock_openai_response)
+
+        ctx = self._ctx(["あいうえお", "かきくけこ", "さしすせそ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 10),
+            patch.object(settings, "translation_streaming", False),
+        ):
+            result = await translator.process(ctx)
+
+        assert translator.client.chat.completions.create.await_count == 2
+        assert [t["id"] for t in result.metadata["raw_translations"]] == [0, 1, 2]
+        assert result.metadata["translator_tokens"] == 300
+        assert json.loads(result.metadata["translator_details"])["chunks"] == 2
+
+    @pytest.mark.asyncio
+    async def test_dense_page_skips_chapter_batch(self, mock_openai_response):
+        from app.pipeline.translator import Translator
+
+        batcher = MagicMock()
+        batcher.translate = AsyncMock()
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"), batcher=batcher)
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = self._echo(mock_openai_response)
+
+        ctx = self._ctx(["あいうえお", "かきくけこ", "さしすせそ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 10),
+            patch.object(settings, "translation_streaming", False),
+        ):
+            result = await translator.process(ctx)
+
+        batcher.translate.assert_not_awaited()
+        assert translator.client.chat.completions.create.await_count == 2
+        assert [t["id"] for t in result.metadata["raw_translations"]] == [0, 1, 2]
+        assert json.loads(result.metadata["translator_details"])["chunks"] == 2
+
+    @pytest.mark.asyncio
+    async def test_only_unparsable_chunk_is_retried(self, mock_openai_response):
+        from app.pipeline.translator import Translator
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = self._echo(
+            mock_openai_response, fail_ids={2}
+        )
+
+        ctx = self._ctx(["あいうえお", "かきくけこ", "さしすせそ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 5),
+            patch.object(settings, "translation_streaming", False),
+        ):
+            result = await translator.process(ctx)
+
+        # Three chunks plus one retry of the chunk holding id 2
+        assert translator.client.chat.completions.create.await_count == 4
+        assert len(result.metadata["raw_translations"]) == 3
+        assert "warnings" not in result.metadata
+
+    @pytest.mark.asyncio
+    async def test_missing_ids_are_reasked_once(self, mock_openai_response):
+        from app.pipeline.translator import CHUNK_REASKS, Translator
+
+        lazy = mock_openai_response(
+            content=json.dumps({"translations": [{"id": 0, "text": "번역"}]})
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(return_value=lazy)
+
+        ctx = self._ctx(["あいうえお", "かきくけこ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 5),
+            patch.object(settings, "translation_streaming", False),
+        ):
+            result = await translator.process(ctx)
+
+        # The chunk holding id 1 never gets it back
+        assert translator.client.chat.completions.create.await_count == 2 + CHUNK_REASKS
+        assert result.metadata["raw_translations"] == [{"id": 0, "text": "번역"}]
+
+    @pytest.mark.asyncio
+    async def test_unparsable_chunk_is_reasked_once(self):
+        from app.pipeline.translator import CHUNK_REASKS, Translator
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(
+            return_value=_FakeStream([_stream_event('{"translations": [{"id": 0, ')])
+        )
+
+        ctx = self._ctx(["あいうえお"])
+        with patch.object(settings, "translation_streaming", True):
+            result = await translator.process(ctx)
+
+        assert translator.client.chat.completions.create.await_count == 1 + CHUNK_REASKS
+        assert any("could not be parsed" in w for w in result.metadata["warnings"])
+
+    @pytest.mark.asyncio
+    async def test_transport_errors_are_not_retried_twice(self):
+        import httpx
+        from openai import APITimeoutError
+
+        from app.pipeline.translator import Translator
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(
+                circuit_breaker=CircuitBreaker("test", failure_threshold=100)
+            )
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(
+            side_effect=APITimeoutError(httpx.Request("POST", "https://api.openai.com"))
+        )
+
+        ctx = self._ctx(["あいうえお", "かきくけこ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 5),
+            patch.object(settings, "translation_streaming", False),
+            patch("app.pipeline.translator.asyncio.sleep", AsyncMock()),
+            pytest.raises(APITimeoutError),
+        ):
+            await translator.process(ctx)
+
+        # Each chunk's request retries on its own, not once more per re-ask
+        assert translator.client.chat.completions.create.await_count == 2 * (
+            translator.max_retries + 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_keeps_other_chunks(self, mock_openai_response):
+        from app.pipeline.translator import Translator
+
+        good = mock_openai_response(
+            content=json.dumps({"translations": [{"id": 0, "text": "번역"}]})
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(
+            side_effect=[good, ValueError("bad request")]
+        )
+
+        ctx = self._ctx(["あいうえお", "かきくけこ"])
+        with (
+            patch.object(settings, "translation_chunk_max_tokens", 5),
+            patch.object(settings, "translation_streaming", False),
+        ):
+            result = await translator.process(ctx)
+
+        assert result.metadata["raw_translations"] == [{"id": 0, "text": "번역"}]
+        assert any("Partial translation" in w for w in result.metadata["warnings"])
+
+
+class TestChapterBatcher:
+    @staticmethod
+    def _complete(mock_openai_response, content, input_tokens=300, output_tokens=90):
+        response = mock_openai_response(
+            content=json.dumps(content), input_tokens=input_tokens, output_tokens=output_tokens
+        )
+        return AsyncMock(return_value=response)
+
+    @pytest.mark.asyncio
+    async def test_packs_pages_into_one_request(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import ChapterBatcher
+
+        complete = self._complete(
+            mock_openai_response,
+            {
+                "translations": [
+                    {"page": 0, "id": 0, "text": "안녕"},
+                    {"page": 1, "id": 0, "text": "고마워"},
+                    {"page": 1, "id": 1, "text": "잘가"},
+                ]
+            },
+        )
+        batcher = ChapterBatcher(complete, max_tokens=1000, max_pages=4, max_wait_ms=50)
+
+        first, second = await asyncio.gather(
+            batcher.translate([{"id": 0, "text": "こんにちは"}]),
+            batcher.translate(
+                [{"id": 0, "text": "ありがとう"}, {"id": 1, "text": "さよなら"}]
+            ),
+        )
+
+        assert complete.await_count == 1
+        prompt = complete.await_args.args[1]
+        assert '"page": 1' in prompt
+        assert first.translations == [{"id": 0, "text": "안녕"}]
+        assert [t["text"] for t in second.translations] == ["고마워", "잘가"]
+        assert first.pages == second.pages == 2
+        # Tokens are split by each page's share of the source text (5 vs 9)
+        assert first.input_tokens + second.input_tokens == 300
+        assert first.input_tokens < second.input_tokens
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_only_fails_its_pages(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import ChapterBatcher
+
+        response = mock_openai_response(
+            content=json.dumps({"translations": [{"page": 0, "id": 0, "text": "안녕"}]})
+        )
+        complete = AsyncMock(side_effect=[RuntimeError("boom"), response])
+        batcher = ChapterBatcher(complete, max_tokens=1000, max_pages=1, max_wait_ms=50)
+
+        first, second = await asyncio.gather(
+            batcher.translate([{"id": 0, "text": "一"}]),
+            batcher.translate([{"id": 0, "text": "二"}]),
+            return_exceptions=True,
+        )
+
+        assert complete.await_count == 2
+        assert isinstance(first, RuntimeError)
+        assert second.translations == [{"id": 0, "text": "안녕"}]
+
+    @pytest.mark.asyncio
+    async def test_token_budget_starts_new_request(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import ChapterBatcher
+
+        complete = self._complete(mock_openai_response, {"translations": []})
+        batcher = ChapterBatcher(complete, max_tokens=6, max_pages=4, max_wait_ms=50)
+
+        await asyncio.gather(
+            batcher.translate([{"id": 0, "text": "こんにちは"}]),
+            batcher.translate([{"id": 0, "text": "ありがとう"}]),
+        )
+
+        assert complete.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_translator_uses_batcher(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import BatchResult
+        from app.pipeline.translator import Translator
+
+        batcher = MagicMock()
+        batcher.translate = AsyncMock(
+            return_value=BatchResult(
+                translations=[{"id": 0, "text": "안녕"}],
+                input_tokens=150,
+                output_tokens=40,
+                pages=3,
+            )
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"), batcher=batcher)
+
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.translation_prompt = "Translate."
+        ctx.metadata["translation_entries"] = [{"id": 0, "text": "こんにちは"}]
+        ctx.metadata["translation_entry_count"] = 1
+
+        result = await translator.process(ctx)
+
+        batcher.translate.assert_awaited_once_with([{"id": 0, "text": "こんにちは"}])
+        assert result.metadata["raw_translations"] == [{"id": 0, "text": "안녕"}]
+        assert result.metadata["translator_tokens"] == 190
+        assert result.metadata["translator_tokens_saved"] > 0
+        assert json.loads(result.metadata["translator_details"]) == {"batch_pages": 3}
+
+    @pytest.mark.asyncio
+    async def test_entries_missing_from_batch_are_reasked(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import ChapterBatcher
+        from app.pipeline.translator import Translator
+
+        batched = mock_openai_response(
+            content=json.dumps({"translations": [{"page": 0, "id": 0, "text": "안녕"}]}),
+            input_tokens=300,
+            output_tokens=90,
+        )
+        reasked = mock_openai_response(
+            content=json.dumps({"translations": [{"id": 1, "text": "잘가"}]}),
+            input_tokens=100,
+            output_tokens=20,
+        )
+        batcher = ChapterBatcher(
+            AsyncMock(return_value=batched), max_tokens=1000, max_pages=1, max_wait_ms=50
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"), batcher=batcher)
+        translator.complete = AsyncMock(return_value=reasked)
+
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.translation_prompt = "Translate."
+        ctx.metadata["translation_entries"] = [
+            {"id": 0, "text": "こんにちは"},
+            {"id": 1, "text": "さよなら"},
+        ]
+        ctx.metadata["translation_entry_count"] = 2
+
+        result = await translator.process(ctx)
+
+        prompt = translator.complete.await_args.args[1].split("Output")[0]
+        assert "さよなら" in prompt and "こんにちは" not in prompt
+        assert [t["text"] for t in result.metadata["raw_translations"]] == ["안녕", "잘가"]
+        assert result.metadata["translator_tokens"] == 510
+        assert "warnings" not in result.metadata
+        details = json.loads(result.metadata["translator_details"])
+        assert details["reasked_entries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reasked_string_ids_are_kept(self, mock_openai_response):
+        from app.pipeline.chapter_batcher import ChapterBatcher
+        from app.pipeline.translator import Translator
+
+        batched = mock_openai_response(
+            content=json.dumps({"translations": [{"page": 0, "id": 0, "text": "안녕"}]})
+        )
+        reasked = mock_openai_response(
+            content=json.dumps({"translations": [{"id": "1", "text": "잘가"}]})
+        )
+        batcher = ChapterBatcher(
+            AsyncMock(return_value=batched), max_tokens=1000, max_pages=1, max_wait_ms=50
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"), batcher=batcher)
+        translator.complete = AsyncMock(return_value=reasked)
+
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.translation_prompt = "Translate."
+        ctx.metadata["translation_entries"] = [
+            {"id": 0, "text": "こんにちは"},
+            {"id": 1, "text": "さよなら"},
+        ]
+        ctx.metadata["translation_entry_count"] = 2
+
+        result = await translator.process(ctx)
+
+        assert result.metadata["raw_translations"] == [
+            {"id": 0, "text": "안녕"},
+            {"id": 1, "text": "잘가"},
+        ]
+        assert "warnings" not in result.metadata
+
+
+def _stream_event(content: str | None = None, usage=None):
+    delta = SimpleNamespace(content=content)
+    choices = [SimpleNamespace(delta=delta)] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _FakeStream:
+    """Async iterator over stream events; raises ``error`` after ``fail_after`` events."""
+
+    def __init__(self, events, fail_after: int | None = None, error: Exception | None = None):
+        self.events = events
+        self.fail_after = fail_after
+        self.error = error
+
+    async def __aiter__(self):
+        for i, event in enumerate(self.events):
+            if i == self.fail_after:
+                raise self.error
+            yield event
+
+
+class TestStreamingTranslation:
+    @pytest.mark.asyncio
+    async def test_mid_stream_failure_retries_missing_ids_only(self):
+        from openai.types import CompletionUsage
+
+        from app.pipeline.regions import RegionTable
+        from app.pipeline.translation_prep import build_user_prompt
+        from app.pipeline.translator import Translator
+        from app.services.cost_tracker import estimate_tokens
+        from app.services.openai_client import RateLimiter
+
+        body = json.dumps(
+            {"translations": [{"id": 0, "text": "안녕하세요"}, {"id": 1, "text": "고마워"}]},
+            ensure_ascii=False,
+        )
+        cut = body.index('{"id": 1')
+        usage = CompletionUsage(prompt_tokens=80, completion_tokens=20, total_tokens=100)
+        retry_body = json.dumps({"translations": [{"id": 1, "text": "고마워"}]})
+        streams = [
+            # First entry completes, then the connection times out
+            _FakeStream(
+                [_stream_event(body[:cut]), _stream_event(body[cut:])],
+                fail_after=1,
+                error=asyncio.TimeoutError(),
+            ),
+            _FakeStream([_stream_event(retry_body), _stream_event(usage=usage)]),
+        ]
+
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(side_effect=streams)
+        # A frozen clock keeps the token bucket from refilling during the test
+        translator.limiter = RateLimiter(1000, 1_000_000, max_concurrency=4, clock=lambda: 0.0)
+
+        entries = [{"id": 0, "text": "こんにちは"}, {"id": 1, "text": "ありがとう"}]
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.regions = RegionTable.from_boxes([[0, 0, 300, 120], [0, 200, 300, 320]])
+        ctx.translation_prompt = build_user_prompt(entries)
+        ctx.metadata["translation_entries"] = entries
+        ctx.metadata["translation_entry_count"] = 2
+
+        with (
+            patch.object(settings, "translation_streaming", True),
+            patch("app.pipeline.translator.asyncio.sleep", AsyncMock()),
+        ):
+            result = await translator.process(ctx)
+
+        calls = translator.client.chat.completions.create.await_args_list
+        assert len(calls) == 2
+        retry_prompt = calls[1].kwargs["messages"][1]["content"]
+        assert "ありがとう" in retry_prompt and "こんにちは" not in retry_prompt
+        assert [t["id"] for t in result.metadata["raw_translations"]] == [0, 1]
+        # The failed attempt is billed for its prompt and the text it streamed
+        partial = (
+            estimate_tokens(calls[0].kwargs["messages"][0]["content"])
+            + estimate_tokens(calls[0].kwargs["messages"][1]["content"])
+            + estimate_tokens(body[:cut])
+        )
+        assert result.metadata["translator_tokens"] == 100 + partial
+        bucket = translator.limiter.tokens
+        assert bucket.capacity - bucket.level == 100 + partial
+        # Both regions were laid out while the response streamed in
+        premapped = result.metadata["premapped_translations"]
+        assert premapped[0][0].translated == "안녕하세요"
+        assert set(premapped) == {0, 1}
+
+    @pytest.mark.asyncio
+    async def test_string_ids_are_not_reasked(self):
+        from app.pipeline.regions import RegionTable
+        from app.pipeline.translation_prep import build_user_prompt
+        from app.pipeline.translator import Translator
+
+        body = json.dumps(
+            {"translations": [{"id": "0", "text": "안녕하세요"}, {"id": "1", "text": "고마워"}]}
+        )
+        with patch("app.pipeline.translator.get_openai_client"):
+            translator = Translator(circuit_breaker=CircuitBreaker("test"))
+        translator.client = MagicMock()
+        translator.client.chat.completions.create = AsyncMock(
+            return_value=_FakeStream([_stream_event(body)])
+        )
+
+        entries = [{"id": 0, "text": "こんにちは"}, {"id": 1, "text": "ありがとう"}]
+        ctx = PipelineContext(job_id=uuid.uuid4())
+        ctx.regions = RegionTable.from_boxes([[0, 0, 300, 120], [0, 200, 300, 320]])
+        ctx.translation_prompt = build_user_prompt(entries)
+        ctx.metadata["translation_entries"] = entries
+        ctx.metadata["translation_entry_count"] = 2
+
+        with patch.object(settings, "translation_streaming", True):
+            result = await translator.process(ctx)
+
+        assert translator.client.chat.completions.create.await_count == 1
+        assert [t["id"] for t in result.metadata["raw_translations"]] == [0, 1]
+        assert set(result.metadata["premapped_translations"]) == {0, 1}
@@ -1,14 +1,16 @@
 import os
 import uuid
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import numpy as np
 import pytest
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
 
 from app.pipeline.base import PipelineContext
+from app.pipeline.regions import MappedTranslation, RegionTable
+from app.pipeline.text_layout import layout_text, line_height, wrap_lines
+from app.pipeline.translation_mapper import TranslationMapper
 from app.pipeline.typesetter import MIN_FONT_SIZE, Typesetter
-from app.schemas.pipeline import MappedTranslation
 
 
 @pytest.fixture
@@ -68,36 +70,28 @@ class TestTypesetter:
             await typesetter.process(ctx)
 
     def test_text_wrapping(self):
-        typesetter = Typesetter()
-        img = Image.new("RGB", (200, 200), "white")
-        draw = ImageDraw.Draw(img)
         font = ImageFont.load_default()
+        advances = lambda text: [font.getlength(c) for c in text]  # noqa: E731
 
-        lines = typesetter._wrap_text(draw, "abcdefghijklmnopqrstuvwxyz", font, 50)
+        lines = wrap_lines("abcdefghijklmnopqrstuvwxyz", advances, 50)
         assert len(lines) > 1
         for line in lines:
             assert len(line) > 0
+            assert font.getlength(line) <= 50
 
     def test_wrap_text_empty(self):
-        typesetter = Typesetter()
-        img = Image.new("RGB", (200, 200), "white")
-        draw = ImageDraw.Draw(img)
-        font = ImageFont.load_default()
-
-        lines = typesetter._wrap_text(draw, "", font, 100)
-        assert lines == []
+        assert wrap_lines("", lambda text: [10.0] * len(text), 100) == []
 
     def test_wrap_text_newlines(self):
-        typesetter = Typesetter()
-        img = Image.new("RGB", (200, 200), "white")
-        draw = ImageDraw.Draw(img)
-        font = ImageFont.load_default()
-
-        lines = typesetter._wrap_text(draw, "line1\nline2", font, 1000)
+        lines = wrap_lines("line1\nline2", lambda text: [10.0] * len(text), 1000)
         assert len(lines) == 2
         assert lines[0] == "line1"
         assert lines[1] == "line2"
 
+    def test_wrap_keeps_oversized_glyph_on_its_own_line(self):
+        lines = wrap_lines("abc", lambda text: [30.0] * len(text), 20)
+        assert lines == ["a", "b", "c"]
+
     def test_minimum_font_size_consistent(self):
         assert MIN_FONT_SIZE == 12
 
@@ -121,3 +115,90 @@ class TestTypesetter:
         # Should not crash
         result = await typesetter.process(ctx)
         assert result.result_image is not None
+
+
+class TestTextLayout:
+    def test_picks_largest_fitting_size(self, truetype_font):
+        path, _ = truetype_font
+        text = "이것은 매우 긴 텍스트입니다 번역 테스트"
+
+        layout = layout_text(text, 120, 80, font_path=path)
+
+        assert layout.fits
+        assert layout.height <= 80
+        bigger = layout_text(text, 120, 80, font_path=path, min_size=layout.font_size + 1)
+        assert not bigger.fits
+
+    def test_overflow_returns_min_size(self, truetype_font):
+        path, _ = truetype_font
+        layout = layout_text("가" * 200, 30, 20, font_path=path)
+
+        assert layout.font_size == MIN_FONT_SIZE
+        assert not layout.fits
+
+    def test_lines_measure_within_box(self, truetype_font):
+        path, _ = truetype_font
+        layout = layout_text("hello world, this wraps", 80, 200, font_path=path, max_size=18)
+
+        font = ImageFont.load_default(layout.font_size)
+        assert all(font.getlength(line) <= 80 for line in layout.lines)
+        assert "".join(layout.lines) == "hello world, this wraps"
+        assert layout.line_height == line_height(layout.font_size)
+
+    @pytest.mark.asyncio
+    async def test_typesetter_draws_mapper_lines(self, truetype_font, job_id):
+        path, _ = truetype_font
+        ctx = PipelineContext(job_id=job_id)
+        ctx.regions = RegionTable.from_boxes([(10, 10, 150, 90)])
+        ctx.metadata["raw_translations"] = [{"id": 0, "text": "hello world again"}]
+        ctx.preprocessed_image = np.full((120, 200, 3), 255, dtype=np.uint8)
+
+        ctx = await TranslationMapper(font_path=path).process(ctx)
+        mapped = ctx.translations[0]
+        assert mapped.lines
+        assert "".join(mapped.lines) == "hello world again"
+
+        typesetter = Typesetter(font_path=path)
+        assert typesetter._layout(mapped) == (mapped.lines, mapped.font_size)
+        ctx = await typesetter.process(ctx)
+        assert (ctx.result_image < 128).any()
+
+
+class TestPatchRendering:
+    def _translations(self, count=4):
+        origins = [(20 + (i % 2) * 150, 20 + (i // 2) * 100) for i in range(count)]
+        return [
+            MappedTranslation(
+                region_id=i,
+                bbox=(x, y, x + 130, y + 80),
+                translated="hello world",
+                font_size=20,
+                lines=["hello", "world"],
+            )
+            for i, (x, y) in enumerate(origins)
+        ]
+
+    def test_draws_black_text_with_white_outline_inside_bbox(self, truetype_font):
+        path, _ = truetype_font
+        image = np.full((300, 400, 3), 128, dtype=np.uint8)
+        t = self._translations(1)[0]
+
+        result = Typesetter(font_path=path)._render(image, [t])
+
+        assert np.all(image == 128)  # input is left untouched
+        x1, y1, x2, y2 = t.bbox
+        inside = result[y1 - 1:y2 + 1, x1 - 1:x2 + 1]
+        assert (inside == 0).all(axis=2).any()
+        assert (inside == 255).all(axis=2).any()
+        outside = result.copy()
+        outside[y1 - 1:y2 + 1, x1 - 1:x2 + 1] = 128
+        assert np.all(outside == 128)
+
+    def test_one_draw_call_per_line(self, truetype_font):
+        path, _ = truetype_font
+        image = np.full((300, 400, 3), 255, dtype=np.uint8)
+
+        with patch("app.pipeline.typesetter.ImageDraw.ImageDraw.text", autospec=True) as draw_text:
+            Typesetter(font_path=path)._render(image, self._translations(4))
+
+        assert draw_text.call_count == 4 * 2
@@ -21,6 +21,7 @@ const PIPELINE_STAGES = [
 const STAGE_MAP: Record<string, string> = {
   preprocessor: "preprocessing",
   detector: "detection",
+  panel_segmenter: "detection",
   balloon_parser: "detection",
   ocr_engine: "ocr",
   translation_prep: "translation",
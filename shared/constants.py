@@ -1,6 +1,7 @@
 # Pipeline stage names
 STAGE_PREPROCESSOR = "preprocessor"
 STAGE_DETECTOR = "detector"
+STAGE_PANEL_SEGMENTER = "panel_segmenter"
 STAGE_BALLOON_PARSER = "balloon_parser"
 STAGE_OCR_ENGINE = "ocr_engine"
 STAGE_TRANSLATION_PREP = "translation_prep"
@@ -13,6 +14,7 @@ STAGE_POSTPROCESSOR = "postprocessor"
 PIPELINE_STAGES = [
     STAGE_PREPROCESSOR,
     STAGE_DETECTOR,
+    STAGE_PANEL_SEGMENTER,
     STAGE_BALLOON_PARSER,
     STAGE_OCR_ENGINE,
     STAGE_TRANSLATION_PREP,